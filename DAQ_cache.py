@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+# Bump whenever the layout of the cache directories changes
+CACHE_VERSION = 1
+
+CACHE_SUFFIX = '.daqcache'
+KEY_FILE_NAME = 'key.json'
+
+# Names of the cached columns, in DAQRaw constructor order
+COLUMN_NAMES = ('time_s', 'tank_pressure_psig',
+                'recorded_mass_lb', 'thrust_lb')
+
+# How many bytes at each end of the csv file go into the content hash
+HASH_SAMPLE_BYTES = 1 << 16
+
+
+class DAQCache:
+    '''
+    Store parsed DAQ columns as sidecar .npy files and reload them memory-mapped.
+    '''
+
+    def __init__(self, cache_dir=None):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+
+        cache_dir: str
+            The directory in which cache entries are placed. Default is None, in which case
+            every entry is placed right next to its csv file.
+        '''
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def file_key(file_path):
+        '''
+        Compute the key identifying the current contents of a csv file.
+
+        The key is made of the size and modification time of the file, along with a hash of
+        its first and last HASH_SAMPLE_BYTES bytes. Hashing only the ends of the file keeps
+        the lookup cheap for very large recordings while still catching rewritten files
+        whose size and modification time happen to match.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+
+        Returns
+        -------
+
+        dict:
+            The key of the file.
+        '''
+        stat = os.stat(file_path)
+
+        hasher = hashlib.sha1()
+        with open(file_path, 'rb') as file:
+            hasher.update(file.read(HASH_SAMPLE_BYTES))
+            if stat.st_size > HASH_SAMPLE_BYTES:
+                file.seek(
+                    max(stat.st_size - HASH_SAMPLE_BYTES, HASH_SAMPLE_BYTES))
+                hasher.update(file.read())
+
+        return {'version': CACHE_VERSION,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha1': hasher.hexdigest()}
+
+    def entry_path(self, file_path):
+        '''
+        Return the directory holding the cache entry of a csv file.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+        '''
+        if self.cache_dir is None:
+            return file_path + CACHE_SUFFIX
+
+        abs_path = os.path.abspath(file_path)
+        path_hash = hashlib.sha1(abs_path.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir,
+                            os.path.basename(file_path) + '-' + path_hash + CACHE_SUFFIX)
+
+    def load(self, file_path):
+        '''
+        Load the cached columns of a csv file.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+
+        Returns
+        -------
+
+        list of numpy.memmap:
+            The read-only, memory-mapped columns in COLUMN_NAMES order, or None if there is
+            no up-to-date entry for the file.
+        '''
+        entry_path = self.entry_path(file_path)
+        try:
+            with open(os.path.join(entry_path, KEY_FILE_NAME)) as key_file:
+                stored_key = json.load(key_file)
+        except (OSError, ValueError):
+            return None
+
+        if stored_key != self.file_key(file_path):
+            return None
+
+        try:
+            return [np.load(os.path.join(entry_path, name + '.npy'), mmap_mode='r')
+                    for name in COLUMN_NAMES]
+        except (OSError, ValueError):
+            return None
+
+    def save(self, file_path, columns):
+        '''
+        Save the parsed columns of a csv file, replacing any stale entry.
+
+        The entry is written to a temporary directory first and then moved into place, so
+        that concurrent readers never see a partially written entry.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file the columns were parsed from.
+        columns: list of numpy.ndarray
+            The full resolution columns, in COLUMN_NAMES order.
+
+        Returns
+        -------
+
+        bool:
+            Whether the entry was saved. It is not when the cache directory is not writable,
+            e.g. next to a csv file on a read-only share, or when the disk is full.
+        '''
+        entry_path = self.entry_path(file_path)
+        tmp_path = f'{entry_path}.tmp-{os.getpid()}'
+        try:
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+
+            for name, column in zip(COLUMN_NAMES, columns):
+                np.save(os.path.join(tmp_path, name + '.npy'),
+                        np.asarray(column, dtype=np.float64))
+
+            # The key is written last, an entry without one is never loaded
+            with open(os.path.join(tmp_path, KEY_FILE_NAME), 'w') as key_file:
+                json.dump(self.file_key(file_path), key_file)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+
+        shutil.rmtree(entry_path, ignore_errors=True)
+        try:
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            # Another process moved its own entry into place first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+        return True
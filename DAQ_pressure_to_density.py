@@ -1,7 +1,6 @@
-from math import e
 import numpy as np
 
-from vapour_pressure_calculations import VapourPressureCalculations
+from equation_of_state import CorrelationEOS, eos_backend_for
 
 
 class DAQPressureToDensity:
@@ -22,61 +21,29 @@ class DAQPressureToDensity:
 
         self.debug = mode
 
-    @staticmethod
-    def eqn4_2(curr_one_minus_t_reduced, eqn4_2_constants, critical_density):
-        '''
-        Implement Equation 4.2 to solve liquid NOS density in kg / m^3.
+    # The density equations belong to the correlation equation of state. They are kept on this
+    # class for the code that already calls them from here.
+    eqn4_2 = staticmethod(CorrelationEOS.eqn4_2)
+    eqn4_3 = staticmethod(CorrelationEOS.eqn4_3)
+    scaled_exp_of_cbrt_polynomial = staticmethod(
+        CorrelationEOS.scaled_exp_of_cbrt_polynomial)
+    calculate_densities = staticmethod(CorrelationEOS.calculate_densities)
 
-        Parameters
-        ----------
-        curr_one_minus_t_reduced: float
-            Equal to one minus the reduced temperature.
-        eqn4_2_constants: list of float
-            The constants related to this equation.
-        critical_density: float
-            The value of the critical density for nitrous oxide, a constant.
-
-        Returns
-        -------
-        float:
-            The result of the calculation.
-        '''
-        result = (critical_density *
-                  e**(eqn4_2_constants[0] *
-                      curr_one_minus_t_reduced**(1/3) + eqn4_2_constants[1] *
-                      curr_one_minus_t_reduced**(2/3) + eqn4_2_constants[2] *
-                      curr_one_minus_t_reduced + eqn4_2_constants[3] *
-                      curr_one_minus_t_reduced**(4/3)))
-        return result
-
-    @staticmethod
-    def eqn4_3(curr_recip_t_reduced_minus_one, eqn4_3_constants, critical_density):
+    def calculate_temperature_kelvin(self, tank_pressure_psia):
         '''
-        Implement Equation 4.3 to solve for vapour NOS density in kg / m^3.
+        Find the NOS temperature at each tank pressure, with the equation of state backend.
 
         Parameters
         ----------
-        curr_recip_t_reduced_minus_one: float
-            Equal to the reciprocal of reduced temperature minus one.
-        eqn4_3_constants: list of float
-            The constants related to this equation.
-        critical_density: float
-            The value of the critical density for nitrous oxide, a constant.
+        tank_pressure_psia: numpy.ndarray
+            The absolute tank pressures, in psi.
 
         Returns
         -------
-        float:
-            The result of the calculation.
+        numpy.ndarray:
+            The temperature at each pressure, in kelvin.
         '''
-        result = (critical_density *
-                  e**(eqn4_3_constants[0] *
-                      curr_recip_t_reduced_minus_one**(1/3) + eqn4_3_constants[1] *
-                      curr_recip_t_reduced_minus_one**(2/3) + eqn4_3_constants[2] *
-                      curr_recip_t_reduced_minus_one + eqn4_3_constants[3] *
-                      curr_recip_t_reduced_minus_one**(4/3) + eqn4_3_constants[4] *
-                      curr_recip_t_reduced_minus_one**(5/3)))
-
-        return result
+        return self.eos.temperature_kelvin(tank_pressure_psia)
 
     def __init__(self, DAQ_data, i_constants=None):
         '''
@@ -97,28 +64,63 @@ class DAQPressureToDensity:
             self.consts_m = i_constants
 
         self.debug = False
-        self.vapour_pressure_data = VapourPressureCalculations()
+        self.eos = eos_backend_for(self.consts_m)
+        # The vapour pressure table of the correlation backend, None for the other backends
+        self.vapour_pressure_data = getattr(
+            self.eos, 'vapour_pressure_data', None)
+
+        tank_pressure_psia = DAQ_data.tank_pressure_psia
+        self.unique_pressure_stats = None
+
+        inverse = None
+        if self.consts_m.solver_options['unique_pressures']:
+            # Quantised pressure data repeats the same few values, so only those are solved
+            tank_pressure_psia, inverse = np.unique(
+                tank_pressure_psia, return_inverse=True)
+            n_samples = len(inverse)
+            n_unique = len(tank_pressure_psia)
+            self.unique_pressure_stats = {
+                'samples': n_samples,
+                'unique_pressures': n_unique,
+                'work_saved': 1 - n_unique / n_samples if n_samples else 0.0,
+            }
+
+        thermo_values = self.calculate_thermo_values(tank_pressure_psia)
+        if inverse is not None:
+            thermo_values = [values[inverse] for values in thermo_values]
+
+        (self.t_reduced, self.one_minus_t_reduced, self.reciprocal_t_reduced_minus_one,
+         self.density_liquid_kg_m3, self.gas_density_kg_m3) = thermo_values
+
+    def calculate_thermo_values(self, tank_pressure_psia):
+        '''
+        Calculate the reduced temperature values and densities for the given tank pressures.
 
-        # Define and calculate reduced temperatures using numpy interpolate
-        self.t_reduced = ((np.interp(DAQ_data.tank_pressure_psia,
-                                     self.vapour_pressure_data.pressure_psi,
-                                     self.vapour_pressure_data.t_kelvin)) /
-                          self.consts_m.nitrous_oxide_properties['critical_temp'])
+        Parameters
+        ----------
+        tank_pressure_psia: numpy.ndarray
+            The absolute tank pressures, in psi.
+
+        Returns
+        -------
+        tuple of numpy.ndarray:
+            The reduced temperature, one minus the reduced temperature, the reciprocal of the
+            reduced temperature minus one, the liquid density and the vapour density.
+        '''
+        t_kelvin, density_liquid_kg_m3, gas_density_kg_m3 = \
+            self.eos.saturation_properties(tank_pressure_psia,
+                                           self.consts_m.solver_options['density_dtype'])
+
+        # Define and calculate reduced temperatures
+        t_reduced = t_kelvin / \
+            self.consts_m.nitrous_oxide_properties['critical_temp']
 
         # Intermediate math
-        self.one_minus_t_reduced = 1 - self.t_reduced
-        self.reciprocal_t_reduced_minus_one = (1 / self.t_reduced) - 1
-
-        # Lists of liquid and gaseous densities
-        self.density_liquid_kg_m3 = \
-            self.eqn4_2(self.one_minus_t_reduced,
-                        self.consts_m.equation_constants['eqn4_2'],
-                        self.consts_m.nitrous_oxide_properties['critical_density'])
-
-        self.gas_density_kg_m3 = \
-            self.eqn4_3(self.reciprocal_t_reduced_minus_one,
-                        self.consts_m.equation_constants['eqn4_3'],
-                        self.consts_m.nitrous_oxide_properties['critical_density'])
+        one_minus_t_reduced = 1 - t_reduced
+        reciprocal_t_reduced_minus_one = (1 / t_reduced) - 1
+
+        return (t_reduced, one_minus_t_reduced, reciprocal_t_reduced_minus_one,
+                density_liquid_kg_m3, gas_density_kg_m3)
 
 
 def create_output_file(path='DAQ_pressure_to_density_test.csv',
@@ -14,16 +14,16 @@ class DAQRaw:
         Parameters
         ----------
 
-        i_time: python list of float
+        i_time: array-like of float
             The timestamps for the test data.
 
-        i_tank_pressure_psig: python list of float
+        i_tank_pressure_psig: array-like of float
             The tank pressure at each timestamp.
 
-        i_recorded_mass: python list of float
+        i_recorded_mass: array-like of float
             The recorded mass at each timestamp.
 
-        i_thrust: python list of float
+        i_thrust: array-like of float
             The recorded thrust at each timestamp.
 
         i_test_cond: dict of float
@@ -40,12 +40,19 @@ class DAQRaw:
 
         self.data_size = len(i_time_s)
 
-        self.time_s = np.array(i_time_s).astype(float)
-        self.tank_pressure_psig = np.array(i_tank_pressure_psig).astype(float)
+        # Float arrays are wrapped as they are, anything else is converted
+        self.time_s = np.asarray(i_time_s, dtype=float)
+        self.tank_pressure_psig = np.asarray(i_tank_pressure_psig, dtype=float)
         self.tank_pressure_psia = None
-        self.recorded_mass_lb = np.array(i_recorded_mass_lb).astype(float)
+        self.recorded_mass_lb = np.asarray(i_recorded_mass_lb, dtype=float)
         self.adjusted_mass_lb = None
-        self.thrust_lb = np.array(i_thrust_lb).astype(float)
+        self.thrust_lb = np.asarray(i_thrust_lb, dtype=float)
+
+        # When this data is a chunk of a longer recording, these refer to the whole recording:
+        # the time of its first data point, and the index of the end of burn within it (None
+        # means it is looked up in this data)
+        self.start_time_s = self.time_s[0] if self.data_size else None
+        self.end_of_burn_index = None
 
         self.tank_pressure_psia = self.tank_pressure_psig + \
             self.test_cond['local_atmos_pressure']
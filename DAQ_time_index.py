@@ -0,0 +1,216 @@
+import json
+import os
+
+import numpy as np
+
+from DAQ_cache import DAQCache
+
+INDEX_SUFFIX = '.tidx.npz'
+
+# Default number of data rows between two indexed rows
+DEFAULT_STRIDE = 1024
+
+
+class DAQTimeIndex:
+    '''
+    Sparse index mapping the time stamps of a DAQ csv file to byte offsets of its rows.
+
+    Every `stride`-th data row is indexed with its row number (counted from 1, like the
+    downsampling of CSVExtractor), the byte offset at which it starts and its time stamp.
+    Blank lines are not data rows, and are not counted. Time stamps are expected to be
+    non-decreasing down the file.
+    '''
+
+    def __init__(self, row_numbers, offsets, times, key=None):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+
+        row_numbers: numpy.ndarray of int
+            The row numbers of the indexed rows.
+        offsets: numpy.ndarray of int
+            The byte offsets at which the indexed rows start.
+        times: numpy.ndarray of float
+            The time stamps of the indexed rows.
+        key: dict
+            The DAQ_cache.DAQCache.file_key of the file when it was indexed.
+        '''
+        self.row_numbers = row_numbers
+        self.offsets = offsets
+        self.times = times
+        self.key = key
+
+    @classmethod
+    def build(cls, file_path, time_col_idx, stride=DEFAULT_STRIDE):
+        '''
+        Index a csv file by scanning it once.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+        time_col_idx: int
+            The index of the time column.
+        stride: int
+            How many data rows there are between two indexed rows.
+
+        Returns
+        -------
+
+        DAQTimeIndex:
+            The index of the file.
+        '''
+        key = DAQCache.file_key(file_path)
+        row_numbers = []
+        offsets = []
+        times = []
+
+        with open(file_path, 'rb') as file:
+            offset = len(file.readline())  # Skip the header
+            row_idx = 0
+            for line in file:
+                if line.strip(b'\r\n'):
+                    if row_idx % stride == 0:
+                        row_numbers.append(row_idx + 1)
+                        offsets.append(offset)
+                        times.append(float(line.split(b',')[time_col_idx]))
+                    row_idx += 1
+                offset += len(line)
+
+        return cls(np.array(row_numbers, dtype=np.int64), np.array(offsets, dtype=np.int64),
+                   np.array(times, dtype=np.float64), key)
+
+    @staticmethod
+    def index_path(file_path, index_dir=None):
+        '''
+        Return the location of the persisted index of a csv file.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+        index_dir: str
+            The directory in which indices are placed. Default is None, in which case the index
+            is placed right next to its csv file.
+        '''
+        if index_dir is None:
+            return file_path + INDEX_SUFFIX
+        return DAQCache(index_dir).entry_path(file_path) + INDEX_SUFFIX
+
+    def save(self, path):
+        '''
+        Persist the index.
+
+        Parameters
+        ----------
+
+        path: str
+            The location of the index file.
+
+        Returns
+        -------
+
+        bool:
+            Whether the index was saved. It is not when its directory is not writable, e.g.
+            next to a csv file on a read-only share.
+        '''
+        tmp_path = f'{path}.tmp-{os.getpid()}.npz'
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            np.savez(tmp_path, row_numbers=self.row_numbers, offsets=self.offsets,
+                     times=self.times, key=np.array(json.dumps(self.key)))
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
+
+    @classmethod
+    def load(cls, path, file_path):
+        '''
+        Load a persisted index, if it is still up to date.
+
+        Parameters
+        ----------
+
+        path: str
+            The location of the index file.
+        file_path: str
+            The location of the indexed .csv file.
+
+        Returns
+        -------
+
+        DAQTimeIndex:
+            The index, or None if it is missing or the file changed since it was built.
+        '''
+        try:
+            with np.load(path) as data:
+                key = json.loads(str(data['key']))
+                index = cls(data['row_numbers'],
+                            data['offsets'], data['times'], key)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if key != DAQCache.file_key(file_path):
+            return None
+        return index
+
+    @classmethod
+    def for_file(cls, file_path, time_col_idx, index_dir=None, stride=DEFAULT_STRIDE):
+        '''
+        Load the persisted index of a csv file, building and persisting it if needed.
+
+        An index that cannot be persisted is only used for this call.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+        time_col_idx: int
+            The index of the time column.
+        index_dir: str
+            The directory in which indices are placed. Default is None, in which case the index
+            is placed right next to its csv file.
+        stride: int
+            How many data rows there are between two indexed rows, if the index is built.
+        '''
+        path = cls.index_path(file_path, index_dir)
+        index = cls.load(path, file_path)
+        if index is None:
+            index = cls.build(file_path, time_col_idx, stride)
+            index.save(path)
+        return index
+
+    def locate(self, t_start):
+        '''
+        Find where to start reading to get every row at or after a given time.
+
+        Parameters
+        ----------
+
+        t_start: float
+            The earliest time of interest.
+
+        Returns
+        -------
+
+        tuple of int:
+            The row number and byte offset of the last indexed row strictly before t_start,
+            or of the first data row if there is none.
+        '''
+        if len(self.offsets) == 0:
+            return 1, None
+
+        pos = max(np.searchsorted(self.times, t_start, side='left') - 1, 0)
+        return int(self.row_numbers[pos]), int(self.offsets[pos])
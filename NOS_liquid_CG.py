@@ -1,9 +1,7 @@
-from math import pi
 import numpy as np
 
-from constants import kg_to_pounds
-from constants import metres_to_inches
-from NOS_mass_and_volume import NOSMassAndVolume
+from tank_geometry import TankGeometry
+from tank_state import TankState
 
 
 class NOSLiquidCG:
@@ -17,10 +15,11 @@ class NOSLiquidCG:
         '''
         Calculate case values based on what volume of the tank is filled.
 
-        Case 1: volume less than v1
-        Case 2: volume less than v2
-        Case 3: volume less than v3
-        Case 4: volume less than v4
+        Case 0: volume up to v1
+        Case 1: volume up to v1 + v2
+        Case 2: volume up to v1 + v2 + v3
+        Case 3: volume up to the total volume
+        Case 4: volume above the total volume
 
         Parameters
         ----------
@@ -31,26 +30,11 @@ class NOSLiquidCG:
 
         Returns
         -------
-        list of int:[]
+        numpy.ndarray of int8:
             The case for each moment in time.
         '''
-        cases = []
-
-        for curr_vol in nos_volumes:
-            if curr_vol <= tank_volumes[0]:
-                cases.append(0)
-            elif tank_volumes[0] < curr_vol <= sum(tank_volumes[:2]):
-                cases.append(1)
-            elif sum(tank_volumes[:2]) < curr_vol <= sum(tank_volumes[:3]):
-                cases.append(2)
-            elif sum(tank_volumes[:3]) < curr_vol <= sum(tank_volumes[:4]):
-                cases.append(3)
-            elif sum(tank_volumes[:4]) < curr_vol <= sum(tank_volumes):
-                cases.append(3)
-            else:
-                cases.append(4)
-
-        return cases
+        return TankGeometry.classify_cases(nos_volumes,
+                                           TankGeometry.liquid_case_boundaries(tank_volumes))
 
     @staticmethod
     def calculate_liquid_heights(liquid_volume_m3, cases, tank_dimensions_m):
@@ -68,21 +52,11 @@ class NOSLiquidCG:
 
         Returns
         -------
-        list of float:
+        numpy.ndarray:
             The liquid height for each moment in time.
         '''
-        liquid_heights_m = []
-        # Iterate through every time step
-        for vol, case in zip(liquid_volume_m3, cases):
-            curr_liq_height = 0
-
-            curr_liq_height = sum(tank_dimensions_m['length'][:case]) +\
-                (vol - sum(tank_dimensions_m['volume'][:case])) / \
-                (pi*tank_dimensions_m['radius'][case]**2)
-
-            liquid_heights_m.append(curr_liq_height)
-
-        return liquid_heights_m
+        return TankGeometry(tank_dimensions_m).liquid_heights(
+            np.asarray(liquid_volume_m3, dtype=float), np.asarray(cases, dtype=np.intp))
 
     @staticmethod
     def calculate_liquid_cg(cases, liquid_height, tank_dimensions_m,
@@ -117,31 +91,11 @@ class NOSLiquidCG:
             liquid_volume_m3 = NOS_data_full.liquid_volume_m3
             liquid_density_kg_m3 = NOS_data_full.DAQ_pressure_to_density_data.density_liquid_kg_m3
 
-        liquid_cg_m = []
-        for vol, case, liq_height, density in zip(liquid_volume_m3,
-                                                  cases, liquid_height, liquid_density_kg_m3):
-
-            numerator = 0
-
-            # Case 0 is special (no filled cylinders)
-            if case == 0:
-                numerator = tank_dimensions_m['volume'][0] * density * liq_height / 2 *\
-                    vol
-
-            # General case
-            else:
-                # Adding filled cylinders
-                for idx in range(case):
-                    numerator += tank_dimensions_m['volume'][idx] *\
-                        tank_dimensions_m['length'][idx]/2
-
-                # Accounting for partially filled cylinder
-                numerator += (liq_height + sum(tank_dimensions_m['length'][:case]))/2 *\
-                    (vol-sum(tank_dimensions_m['volume'][:case]))
-
-            liquid_cg_m = np.append(liquid_cg_m, numerator/(vol))
-
-        return liquid_cg_m
+        return TankGeometry(tank_dimensions_m).liquid_cg(
+            np.asarray(cases, dtype=np.intp), np.asarray(
+                liquid_height, dtype=float),
+            np.asarray(liquid_volume_m3, dtype=float),
+            np.asarray(liquid_density_kg_m3, dtype=float))
 
     def __init__(self, i_NOS_mass_and_volume, i_constants=None):
         '''
@@ -164,25 +118,18 @@ class NOSLiquidCG:
 
         self.NOS_mass_and_volume_data = i_NOS_mass_and_volume
 
-        # Remaining spreadsheet values are direct copies of columns from other sheets
-        self.case = []
-        self.case = self.calculate_cases(self.NOS_mass_and_volume_data.liquid_volume_m3,
-                                         self.consts_m.tank_dimensions_meters['volume'])
+        # The liquid and vapour states are calculated together, this class is a view over the
+        # liquid half
+        self.tank_state = TankState(
+            self.NOS_mass_and_volume_data, self.consts_m)
+        self.tank_geometry = self.tank_state.geometry
 
-        self.liquid_height_m = np.array(
-            self.calculate_liquid_heights(self.NOS_mass_and_volume_data.liquid_volume_m3,
-                                          self.case, self.consts_m.tank_dimensions_meters))
-
-        self.liquid_cg_m = \
-            self.calculate_liquid_cg(self.case, self.liquid_height_m,
-                                     self.consts_m.tank_dimensions_meters,
-                                     self.NOS_mass_and_volume_data.liquid_volume_m3,
-                                     self.NOS_mass_and_volume_data.
-                                     DAQ_pressure_to_density_data.density_liquid_kg_m3)
-
-        self.liquid_mass_lb = kg_to_pounds(
-            self.NOS_mass_and_volume_data.liquid_mass_kg)
-        self.liquid_cg_in = metres_to_inches(self.liquid_cg_m)
+        # Remaining spreadsheet values are direct copies of columns from other sheets
+        self.case = self.tank_state.data['liquid_case']
+        self.liquid_height_m = self.tank_state.data['liquid_height_m']
+        self.liquid_cg_m = self.tank_state.data['liquid_cg_m']
+        self.liquid_mass_lb = self.tank_state.data['liquid_mass_lb']
+        self.liquid_cg_in = self.tank_state.data['liquid_cg_in']
 
 
 def create_output_file(target_path='NOS_liquid_CG_test.csv',
@@ -200,11 +147,11 @@ def create_output_file(target_path='NOS_liquid_CG_test.csv',
         How much the output needs to be downsampled by. Default value is 1 (no downsampling).
     '''
     from csv_extractor import CSVExtractor
+    from pipeline import Pipeline
 
     ext = CSVExtractor()
     raw_dat = ext.extract_data_to_raw_DAQ(daq_source_path)
-    extracted_mv = NOSMassAndVolume(raw_dat)
-    test_data = NOSLiquidCG(extracted_mv)
+    test_data = Pipeline(raw_dat).get('NOS_liquid_CG')
 
     with open(target_path, 'w') as test_file:
         i = 0
@@ -41,7 +41,7 @@ class NOSMassAndVolume:
             result = total_v_m3
         return result
 
-    def __init__(self, DAQ_data, i_constants=None):
+    def __init__(self, DAQ_data, i_constants=None, i_pressure_to_density=None):
         '''
         Initialize all base values.
 
@@ -52,6 +52,9 @@ class NOSMassAndVolume:
         i_constants: constants.ConstantsManager
             Object containing all the constants for the program. Default is None, in which case
             a default object will be imported and created.
+        i_pressure_to_density: DAQPressureToDensity
+            The densities already calculated for DAQ_data with the same constants. Default is
+            None, in which case they are calculated here.
         '''
         self.consts_m = None
         if i_constants is None:
@@ -60,8 +63,10 @@ class NOSMassAndVolume:
             self.consts_m = i_constants
 
         # Data from pressure_to_density calculations
-        self.DAQ_pressure_to_density_data = \
-            DAQPressureToDensity(DAQ_data, i_constants=self.consts_m)
+        if i_pressure_to_density is None:
+            i_pressure_to_density = DAQPressureToDensity(
+                DAQ_data, i_constants=self.consts_m)
+        self.DAQ_pressure_to_density_data = i_pressure_to_density
         # Mass of NOS converted to kg
         self.NOS_mass_kg = pounds_to_kg(DAQ_data.adjusted_mass_lb)
 
@@ -103,10 +108,11 @@ def create_output_file(target_path='NOS_mass_and_volume_test.csv',
     '''
 
     from csv_extractor import CSVExtractor
+    from pipeline import Pipeline
 
     ext = CSVExtractor()
     raw_dat = ext.extract_data_to_raw_DAQ(daq_source_path)
-    test_data = NOSMassAndVolume(raw_dat)
+    test_data = Pipeline(raw_dat).get('NOS_mass_and_volume')
     pressure_to_density = test_data.DAQ_pressure_to_density_data
 
     with open(target_path, 'w') as test_file:
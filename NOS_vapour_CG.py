@@ -1,10 +1,8 @@
 import numpy as np
 
-from NOS_mass_and_volume import NOSMassAndVolume
-from NOS_liquid_CG import NOSLiquidCG
-from constants import kg_to_pounds
-from constants import metres_to_inches
 from constants import ConstantsManager as ConstsM
+from tank_geometry import TankGeometry
+from tank_state import TankState
 
 
 class NOSVapourCG:
@@ -18,10 +16,11 @@ class NOSVapourCG:
         '''
         Calculate case values based on what volume of the tank is filled.
 
-        Case 1: volume less than v1
-        Case 2: volume less than v2
-        Case 3: volume less than v3
-        Case 4: volume less than v4
+        Case 0: volume up to v5
+        Case 1: volume up to v5 + v4
+        Case 2: volume up to v5 + v4 + v3
+        Case 3: volume up to the total volume
+        Case 4: volume above the total volume
 
         Parameters
         ----------
@@ -32,26 +31,11 @@ class NOSVapourCG:
 
         Returns
         -------
-        list of int:
+        numpy.ndarray of int8:
             The case for each moment in time.
         '''
-        cases = []
-
-        for curr_vol in nos_vapour_volumes:
-            if curr_vol <= tank_volumes[4]:
-                cases.append(0)
-            elif tank_volumes[4] < curr_vol <= sum(tank_volumes[3:]):
-                cases.append(1)
-            elif sum(tank_volumes[3:]) < curr_vol <= sum(tank_volumes[2:]):
-                cases.append(2)
-            elif sum(tank_volumes[2:]) < curr_vol <= sum(tank_volumes[1:]):
-                cases.append(3)
-            elif sum(tank_volumes[1:]) < curr_vol <= sum(tank_volumes):
-                cases.append(3)
-            else:
-                cases.append(4)
-
-        return cases
+        return TankGeometry.classify_cases(nos_vapour_volumes,
+                                           TankGeometry.vapour_case_boundaries(tank_volumes))
 
     @staticmethod
     def calculate_vapour_cg(vapour_volume_m3, gas_density_kg_m3, cases, vapour_height,
@@ -85,35 +69,10 @@ class NOSVapourCG:
             vapour_volume_m3 = NOS_data_full.vapour_volume_m3
             gas_density_kg_m3 = NOS_data_full.DAQ_pressure_to_density_data.gas_density_kg_m3
 
-        vapour_cg_m = np.array([])
-
-        # TODO: Optimize cases here
-        for vol, case, height, density in zip(vapour_volume_m3,
-                                              cases, vapour_height,
-                                              gas_density_kg_m3):
-
-            numerator = 0
-
-            # Case 0 is special (no filled cylinders)
-            if case == 0:
-                numerator = tank_dimensions_m['volume'][4] * density * height / 2 *\
-                    vol
-
-            # General case
-            else:
-                # Adding filled cylinders
-                for idx in range(case):
-                    numerator += (tank_dimensions_m['volume'][4 - idx] *
-                                  tank_dimensions_m['length'][4 - idx]/2)
-
-                # Accounting for partially filled cylinder
-                numerator += (height + sum(tank_dimensions_m['length'][-case:]))/2 *\
-                    (vol-sum(tank_dimensions_m['volume'][-case:]))
-
-            vapour_cg_m = np.append(vapour_cg_m,
-                                    tank_dimensions_m['total_length'] - numerator/(vol))
-
-        return vapour_cg_m
+        return TankGeometry(tank_dimensions_m).vapour_cg(
+            np.asarray(cases, dtype=np.intp), np.asarray(
+                vapour_height, dtype=float),
+            np.asarray(vapour_volume_m3, dtype=float), np.asarray(gas_density_kg_m3, dtype=float))
 
     def __init__(self, i_NOS_mass_and_volume, i_NOS_liquid_CG, i_constants=None):
         '''
@@ -138,21 +97,20 @@ class NOSVapourCG:
         self.NOS_mass_and_volume_data = i_NOS_mass_and_volume
         self.NOS_liquid_CG_data = i_NOS_liquid_CG
 
-        # Remaining spreadsheet values are direct copies of columns from other sheets
-        self.case = self.calculate_cases(self.NOS_mass_and_volume_data.vapour_volume_m3,
-                                         self.consts_m.tank_dimensions_meters['volume'])
-
-        self.vapour_height_m = (self.consts_m.tank_dimensions_meters['total_length']
-                                - self.NOS_liquid_CG_data.liquid_height_m)
+        # The liquid and vapour states are calculated together, this class is a view over the
+        # vapour half of the state already calculated for the liquid
+        self.tank_state = self.NOS_liquid_CG_data.tank_state
+        if not self.tank_state.describes(self.NOS_mass_and_volume_data, self.consts_m):
+            self.tank_state = TankState(
+                self.NOS_mass_and_volume_data, self.consts_m)
+        self.tank_geometry = self.tank_state.geometry
 
-        self.vapour_cg_m = self.calculate_vapour_cg(
-            self.NOS_mass_and_volume_data.vapour_volume_m3,
-            self.NOS_mass_and_volume_data.DAQ_pressure_to_density_data.gas_density_kg_m3,
-            self.case, self.vapour_height_m, self.consts_m.tank_dimensions_meters)
-
-        self.vapour_mass_lb = kg_to_pounds(
-            self.NOS_mass_and_volume_data.vapour_mass_kg)
-        self.vapour_cg_in = metres_to_inches(self.vapour_cg_m)
+        # Remaining spreadsheet values are direct copies of columns from other sheets
+        self.case = self.tank_state.data['vapour_case']
+        self.vapour_height_m = self.tank_state.data['vapour_height_m']
+        self.vapour_cg_m = self.tank_state.data['vapour_cg_m']
+        self.vapour_mass_lb = self.tank_state.data['vapour_mass_lb']
+        self.vapour_cg_in = self.tank_state.data['vapour_cg_in']
 
 
 def create_output_file(target_path='NOS_vapour_CG_test.csv',
@@ -170,12 +128,13 @@ def create_output_file(target_path='NOS_vapour_CG_test.csv',
         how much the output needs to be downsampled by. Default value is 1 (no downsampling).
     '''
     from csv_extractor import CSVExtractor
+    from pipeline import Pipeline
 
     ext = CSVExtractor()
     raw_dat = ext.extract_data_to_raw_DAQ(daq_source_path)
-    test_nmv = NOSMassAndVolume(raw_dat)
-    test_nlc = NOSLiquidCG(test_nmv)
-    test_data = NOSVapourCG(test_nmv, test_nlc)
+    pipeline = Pipeline(raw_dat)
+    test_nmv = pipeline.get('NOS_mass_and_volume')
+    test_data = pipeline.get('NOS_vapour_CG')
 
     with open(target_path, 'w') as test_file:
         i = 0
@@ -0,0 +1,272 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import traceback
+
+from calculator_main import execute_calculation
+
+OUTPUT_SUFFIX = '.xml'
+# How many times a file is calculated again after the worker calculating it died, before it
+# is reported as failed
+MAX_WORKER_CRASHES = 2
+
+
+def find_DAQ_files(inputs):
+    '''
+    Expand directories and glob patterns into a sorted list of DAQ files.
+
+    Parameters
+    ----------
+    inputs: list of str
+        Paths to DAQ files, directories containing .csv DAQ files, or glob patterns.
+
+    Returns
+    -------
+    list of str:
+        The DAQ files, without duplicates.
+    '''
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, '*.csv')))
+        elif glob.has_magic(item):
+            paths.extend(glob.glob(item))
+        else:
+            paths.append(item)
+
+    return sorted(set(paths))
+
+
+def target_path_for(data_file_path, output_dir=None):
+    '''
+    Return where the xml of a DAQ file is saved.
+
+    Parameters
+    ----------
+    data_file_path: str
+        The path of the DAQ file.
+    output_dir: str
+        The directory the xml is saved to. Defaults to None, in which case it is saved next to
+        the DAQ file.
+    '''
+    stem = os.path.splitext(os.path.basename(data_file_path))[0]
+    if output_dir is None:
+        output_dir = os.path.dirname(data_file_path)
+    return os.path.join(output_dir, stem + OUTPUT_SUFFIX)
+
+
+def pool_context():
+    '''
+    Return the multiprocessing context the pools of worker processes are started with.
+
+    Forking a process once it runs threads, such as those of a pool being replaced, can leave
+    a worker deadlocked, so workers are started from a fork server where the platform has one,
+    as on Linux and macOS, and spawned otherwise, as on Windows.
+
+    Returns
+    -------
+    multiprocessing.context.BaseContext:
+        The context.
+    '''
+    import multiprocessing
+
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def process_file(data_file_path, target_path, constants_file_path=None, use_cache=False):
+    '''
+    Run the full calculation for one DAQ file, catching any failure.
+
+    Parameters
+    ----------
+    data_file_path: str
+        The path of the DAQ file.
+    target_path: str
+        The path where the xml is to be saved to.
+    constants_file_path: str
+        The path to the constants yaml file. Defaults to none, in which case a default one will
+        be used.
+    use_cache: bool
+        Whether the parsed DAQ data should be cached. Default to false.
+
+    Returns
+    -------
+    dict:
+        The status of the run: the paths, whether it succeeded, the error if it did not and
+        how many seconds it took.
+    '''
+    start = time.perf_counter()
+    result = {'data_file_path': data_file_path, 'target_path': target_path,
+              'status': 'ok', 'error': None}
+    try:
+        execute_calculation(data_file_path, target_path, constants_file_path,
+                            suppress_printout=True, use_cache=use_cache)
+    except Exception:
+        result['status'] = 'failed'
+        result['error'] = traceback.format_exc()
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def print_result(result):
+    '''
+    Print a one line report of a finished run.
+
+    Parameters
+    ----------
+    result: dict
+        The status of the run, as returned by process_file.
+    '''
+    print(f"[{result['status']}] {result['data_file_path']} -> {result['target_path']} "
+          f"({result['seconds']:.2f} s)")
+    if result['error']:
+        print(result['error'], file=sys.stderr)
+
+
+def execute_batch(data_file_paths, constants_file_path=None, output_dir=None, jobs=None,
+                  use_cache=False, report=print_result):
+    '''
+    Execute all calculations for many DAQ files across a process pool.
+
+    A failure in one file is reported and does not stop the others. If a worker dies, e.g.
+    because it ran out of memory, the pool is replaced and the files it was calculating are
+    calculated again, up to MAX_WORKER_CRASHES times. Files that would be saved to the same
+    xml, such as runs/a/test.csv and runs/b/test.csv with the same output_dir, are rejected
+    before any of them is processed.
+
+    Parameters
+    ----------
+    data_file_paths: list of str
+        The paths of the DAQ files.
+    constants_file_path: str
+        The path to the constants yaml file shared by all files. Defaults to none, in which
+        case a default one will be used.
+    output_dir: str
+        The directory the xml files are saved to. Defaults to None, in which case each is saved
+        next to its DAQ file.
+    jobs: int
+        How many processes to use. Defaults to None, which uses one per CPU. With 1, files are
+        processed in this process.
+    use_cache: bool
+        Whether the parsed DAQ data should be cached. Default to false.
+    report: callable
+        Called with the status of each run as soon as it finishes. Default prints it.
+
+    Returns
+    -------
+    list of dict:
+        The status of every run, in the order of data_file_paths.
+    '''
+    tasks = [(path, target_path_for(path, output_dir), constants_file_path, use_cache)
+             for path in data_file_paths]
+
+    sources = {}
+    for path, target_path, _, _ in tasks:
+        sources.setdefault(os.path.abspath(target_path), []).append(path)
+    collisions = [paths for paths in sources.values() if len(paths) > 1]
+    if collisions:
+        raise ValueError('several DAQ files would be saved to the same xml: ' +
+                         '; '.join(', '.join(paths) for paths in collisions))
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    results = [None] * len(tasks)
+
+    if jobs == 1:
+        for idx, task in enumerate(tasks):
+            results[idx] = process_file(*task)
+            report(results[idx])
+        return results
+
+    # Only imported for parallel runs, as it pulls in multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    crashes = [0] * len(tasks)
+    executor = ProcessPoolExecutor(max_workers=jobs, mp_context=pool_context())
+    try:
+        # Index of the file and pool, by future
+        futures = {executor.submit(process_file, *task): (idx, executor)
+                   for idx, task in enumerate(tasks)}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, pool = futures.pop(future)
+                try:
+                    results[idx] = future.result()
+                except Exception as error:
+                    if isinstance(error, BrokenProcessPool) and \
+                            crashes[idx] < MAX_WORKER_CRASHES:
+                        # The worker itself died, and the pool with it
+                        crashes[idx] += 1
+                        if pool is executor:
+                            executor.shutdown(wait=False)
+                            executor = ProcessPoolExecutor(max_workers=jobs,
+                                                           mp_context=pool_context())
+                        futures[executor.submit(
+                            process_file, *tasks[idx])] = (idx, executor)
+                        continue
+                    results[idx] = {'data_file_path': tasks[idx][0],
+                                    'target_path': tasks[idx][1], 'status': 'failed',
+                                    'error': traceback.format_exc(), 'seconds': 0.0}
+                report(results[idx])
+    finally:
+        executor.shutdown()
+
+    return results
+
+
+def main(argv=None):
+    '''
+    Run the batch command line interface.
+
+    Parameters
+    ----------
+    argv: list of str
+        The command line arguments. Defaults to None, in which case sys.argv is used.
+
+    Returns
+    -------
+    int:
+        The exit code: 0 if every file succeeded, 1 otherwise.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Run the RSE calculation for many DAQ files in parallel.')
+    parser.add_argument('inputs', nargs='+',
+                        help='DAQ .csv files, directories containing them, or glob patterns')
+    parser.add_argument('-c', '--constants', default=None,
+                        help='constants yaml file shared by all files')
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help='directory for the xml files (default: next to each input)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--cache', action='store_true',
+                        help='cache parsed DAQ data next to each input')
+    args = parser.parse_args(argv)
+
+    data_file_paths = find_DAQ_files(args.inputs)
+    if not data_file_paths:
+        print('no DAQ files found', file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    try:
+        results = execute_batch(data_file_paths, args.constants, args.output_dir, args.jobs,
+                                args.cache)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    failed = sum(result['status'] != 'ok' for result in results)
+
+    print(f'{len(results) - failed}/{len(results)} files succeeded '
+          f'in {time.perf_counter() - start:.2f} s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
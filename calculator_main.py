@@ -1,49 +1,373 @@
-from csv_extractor import CSVExtractor
-from NOS_mass_and_volume import NOSMassAndVolume
-from NOS_vapour_CG import NOSVapourCG
-from NOS_liquid_CG import NOSLiquidCG
-from engine_CG import EngineCG
-from engine_XML import EngineXML
-from constants import ConstantsManager
+import io
+import sys
+from contextlib import nullcontext
+
+import profiling
+from pipeline import STAGES
+
+# Path standing for stdin as the data file, or stdout as the target
+STDIO_PATH = '-'
+
+# Columns written when the calculation stops after a stage other than engine_XML. The time of
+# each data point always comes first.
+STAGE_COLUMNS = {
+    'DAQ_raw': ('tank_pressure_psig', 'tank_pressure_psia', 'recorded_mass_lb',
+                'adjusted_mass_lb', 'thrust_lb'),
+    'DAQ_pressure_to_density': ('t_reduced', 'density_liquid_kg_m3', 'gas_density_kg_m3'),
+    'NOS_mass_and_volume': ('NOS_mass_kg', 'liquid_volume_m3', 'vapour_volume_m3',
+                            'liquid_mass_kg', 'vapour_mass_kg'),
+    'NOS_liquid_CG': ('liquid_height_m', 'liquid_cg_in', 'liquid_mass_lb'),
+    'NOS_vapour_CG': ('vapour_height_m', 'vapour_cg_in', 'vapour_mass_lb'),
+    'engine_CG': ('NOS_CG_in', 'fuel_mass_lb', 'propellant_mass_lb', 'propellant_CG_in'),
+}
+
+
+def run_stages(DAQ_data, constants=None, stop_after=STAGES[-1], cache=None):
+    '''
+    Run the calculation stages on DAQ data, skipping those after stop_after.
+
+    Parameters
+    ----------
+    DAQ_data: DAQRaw
+        The data the calculation is run on.
+    constants: constants.ConstantsManager
+        The constants used by every stage. Default is None, in which case the default
+        constants file is used.
+    stop_after: str
+        The last stage run, one of STAGES. Default is the last stage, engine_XML.
+    cache: stage_cache.StageCache
+        The cache the stages are loaded from and saved to. Default is None, in which case
+        every stage is calculated.
+
+    Returns
+    -------
+    object:
+        The object calculated by the last stage run.
+    '''
+    from pipeline import Pipeline
+
+    return Pipeline(DAQ_data, constants, cache).get(stop_after)
+
+
+def write_stage_columns(file, DAQ_data, stage_data, columns, header=True):
+    '''
+    Write the columns of a stage as csv, after a header row.
+
+    Parameters
+    ----------
+    file: file object
+        Where the csv is written.
+    DAQ_data: DAQRaw
+        The data the stage was calculated from, for the time column.
+    stage_data: object
+        The object calculated by the stage.
+    columns: tuple of str
+        The names of the attributes of stage_data that are written.
+    header: bool
+        Whether the header row is written. Default to true.
+    '''
+    if header:
+        file.write(','.join(('time_s',) + columns) + '\n')
+    values = [DAQ_data.time_s.tolist()] + [getattr(stage_data, column).tolist()
+                                           for column in columns]
+    for row in zip(*values):
+        file.write(','.join(map(str, row)) + '\n')
+
+
+def write_stage_output(file, DAQ_data, stage_data, stop_after, header=True):
+    '''
+    Write the output of the last stage calculated: the XML for engine_XML, csv otherwise.
+
+    Parameters
+    ----------
+    file: file object
+        Where the output is written.
+    DAQ_data: DAQRaw
+        The data the stage was calculated from.
+    stage_data: object
+        The object calculated by the stage.
+    stop_after: str
+        The name of the stage.
+    header: bool
+        Whether the header row of csv output is written. Default to true.
+    '''
+    if stop_after == 'engine_XML':
+        for tag in stage_data.XML_tags:
+            file.write(tag)
+            file.write('\n')
+    else:
+        write_stage_columns(file, DAQ_data, stage_data,
+                            STAGE_COLUMNS[stop_after], header)
 
 
 def execute_calculation(data_file_path, target_path,
-                        constants_file_path=None, suppress_printout=False):
+                        constants_file_path=None, suppress_printout=False, use_cache=False,
+                        downsample=1, t_start=None, t_end=None, stop_after=STAGES[-1],
+                        use_stage_cache=False, stage_cache_dir=None):
     '''
     Execute all calculations and save the results to an output file.
 
     Parameters
     ----------
     data_file_path: str
-        This is the path pointing to the file where the DAQ data.
+        This is the path pointing to the file where the DAQ data. STDIO_PATH reads the data
+        from stdin.
     target_path: str
-        This is the path where the output is to be saved to.
+        This is the path where the output is to be saved to. STDIO_PATH writes the output to
+        stdout.
     constants_file_path: str
         The path to the constants yaml file. Defaults to none, in which case a default one will
         be used.
     suppress_printout: bool
-        Whether the 'calculation successful' printout needs to be supressed or not. Default to 
-        false, which means it will print. 
+        Whether the 'calculation successful' printout needs to be supressed or not. Default to
+        false, which means it will print. The printout goes to stderr when the output goes
+        to stdout.
+    use_cache: bool
+        Whether the parsed DAQ data should be cached next to the data file and reloaded from
+        there on later runs. Default to false. Data read from stdin is never cached.
+    downsample: int
+        Only every downsample-th data row is used. Default value is 1 (no downsampling).
+    t_start: float
+        If given, only the data at or after this time is used, in s. Default is None. The time
+        in the output and the fuel mass still refer to the start of the whole recording, so a
+        window needs the data point at the end of burn to be in the file, though not in the
+        window.
+    t_end: float
+        If given, only the data at or before this time is used, in s. Default is None.
+    stop_after: str
+        The last stage calculated, one of STAGES. Default is engine_XML, which saves the XML.
+        Any other stage saves its columns (see STAGE_COLUMNS) as csv instead.
+    use_stage_cache: bool
+        Whether the stages are loaded from an on-disk cache when their inputs and constants
+        did not change since they were last calculated, and saved to it otherwise. Unlike
+        use_cache, which only caches the parsed DAQ data. Default to false.
+    stage_cache_dir: str
+        The directory of the stage cache. Default is None, in which case
+        stage_cache.DEFAULT_CACHE_DIR is used.
     '''
+    # Imported here rather than at the top, so that importing this module (and numpy with
+    # it) costs nothing until a calculation is actually run
+    from csv_extractor import CSVExtractor
+    from constants import ConstantsManager
+
+    if stop_after not in STAGES:
+        raise ValueError(f'unknown stage: {stop_after}')
 
     constants = None
     if constants_file_path:
         constants = ConstantsManager(constants_file_path)
+    windowed = t_start is not None or t_end is not None
 
     extractor = CSVExtractor()
-    DAQ_data = extractor.extract_data_to_raw_DAQ(data_file_path)
-    NOS_mass_volume = NOSMassAndVolume(DAQ_data, i_constants=constants)
-    NOS_liquid_CG = NOSLiquidCG(NOS_mass_volume, i_constants=constants)
-    NOS_vapour_CG = NOSVapourCG(
-        NOS_mass_volume, NOS_liquid_CG, i_constants=constants)
-    engine_CG = EngineCG(DAQ_data, NOS_vapour_CG,
-                         NOS_liquid_CG, i_constants=constants)
-    engine_XML = EngineXML(DAQ_data, engine_CG, i_constants=constants)
-
-    with open(target_path, 'w') as file:
-        for tag in engine_XML.XML_tags:
-            file.write(tag)
-            file.write('\n')
+    with profiling.measure('CSV_extractor'):
+        if data_file_path == STDIO_PATH:
+            stream = sys.stdin
+            if windowed:
+                # The time references are found in the whole data, so stdin is read twice
+                stream = io.StringIO(sys.stdin.read(), newline='')
+            DAQ_data = extractor.extract_stream_to_raw_DAQ(
+                stream, downsample, t_start, t_end)
+        else:
+            extractor.set_cache_mode(use_cache)
+            DAQ_data = extractor.extract_data_to_raw_DAQ(data_file_path, downsample,
+                                                         t_start, t_end)
+
+        if windowed:
+            defaults = constants or ConstantsManager()
+            end_of_burn_s = defaults.test_conditions['end_of_burn']
+            if data_file_path == STDIO_PATH:
+                stream.seek(0)
+                references = find_stream_time_references(stream, end_of_burn_s,
+                                                         downsample=downsample)
+            else:
+                # Only the rows next to the references are read, through the cache or the
+                # time index the window was read with
+                references = extractor.find_time_references(data_file_path, end_of_burn_s,
+                                                            downsample)
+            DAQ_data.start_time_s, DAQ_data.end_of_burn_index = references
+    profiling.record_output('CSV_extractor', DAQ_data)
+
+    cache = None
+    if use_stage_cache:
+        from stage_cache import StageCache
+        cache = StageCache(stage_cache_dir)
+
+    stage_data = run_stages(DAQ_data, constants, stop_after, cache)
+
+    if target_path == STDIO_PATH:
+        output = nullcontext(sys.stdout)
+    else:
+        output = open(target_path, 'w')
+
+    with output as file, profiling.measure('file_write'):
+        write_stage_output(file, DAQ_data, stage_data, stop_after)
+
+    if not suppress_printout:
+        print('calculation successful',
+              file=sys.stderr if target_path == STDIO_PATH else sys.stdout)
+
+
+def find_stream_time_references(csvfile, end_of_burn_s, chunk_rows=None, downsample=1):
+    '''
+    Find the time of the first data point and the index of the end of burn in csv data.
+
+    Only the time column is converted to floats, one chunk at a time. Every data row is
+    looked at, so the references are those of the whole recording even when the calculation
+    only uses a time window of it.
+
+    Parameters
+    ----------
+    csvfile: file object
+        The csv data, opened in text mode, positioned at its header row.
+    end_of_burn_s: float
+        The time at which the burn is over.
+    chunk_rows: int
+        How many rows are read at once. Default is None, in which case
+        csv_extractor.DEFAULT_CHUNK_ROWS is used.
+    downsample: int
+        Only every downsample-th data row is used. Default value is 1 (no downsampling).
+
+    Returns
+    -------
+    tuple:
+        The time of the first data point, and the index of the data point at end_of_burn_s.
+    '''
+    import numpy as np
+    from csv_extractor import CSVExtractor, DEFAULT_CHUNK_ROWS
+
+    start_time_s = None
+    end_of_burn_index = None
+    n_rows = 0
+    for (time_s,) in CSVExtractor().iter_stream_chunks(
+            csvfile, chunk_rows or DEFAULT_CHUNK_ROWS, downsample, time_only=True):
+        if start_time_s is None:
+            start_time_s = time_s[0]
+        if end_of_burn_index is None:
+            matches = np.flatnonzero(time_s == end_of_burn_s)
+            if len(matches):
+                end_of_burn_index = n_rows + int(matches[0])
+        n_rows += len(time_s)
+
+    if end_of_burn_index is None:
+        raise ValueError(
+            f'no data point at the end of burn time, {end_of_burn_s} s')
+    return start_time_s, end_of_burn_index
+
+
+def find_time_references(data_file_path, end_of_burn_s, chunk_rows=None, downsample=1):
+    '''
+    Find the time of the first data point and the index of the end of burn in a csv file.
+
+    Parameters
+    ----------
+    data_file_path: str
+        The path of the DAQ file.
+    end_of_burn_s: float
+        The time at which the burn is over.
+    chunk_rows: int
+        How many rows are read at once. Default is None, in which case
+        csv_extractor.DEFAULT_CHUNK_ROWS is used.
+    downsample: int
+        Only every downsample-th data row is used. Default value is 1 (no downsampling).
+
+    Returns
+    -------
+    tuple:
+        The time of the first data point, and the index of the data point at end_of_burn_s,
+        as returned by find_stream_time_references.
+    '''
+    with open(data_file_path, newline='') as csvfile:
+        try:
+            return find_stream_time_references(csvfile, end_of_burn_s, chunk_rows, downsample)
+        except ValueError as error:
+            raise ValueError(f'{data_file_path}: {error}') from None
+
+
+def execute_chunked_calculation(data_file_path, target_path, constants_file_path=None,
+                                suppress_printout=False, chunk_rows=None, downsample=1,
+                                t_start=None, t_end=None, stop_after=STAGES[-1]):
+    '''
+    Execute all calculations a fixed number of rows at a time, appending to the output file.
+
+    The memory used does not depend on the length of the DAQ file. A first pass over its time
+    column finds the start and end of burn of the whole recording, which every chunk refers to
+    even with a time window. Then each chunk goes through every stage and is written out
+    before the next one is read. The output is the same as the one of execute_calculation.
+
+    Parameters
+    ----------
+    data_file_path: str
+        The path of the DAQ file. It is read twice, so it cannot be STDIO_PATH.
+    target_path: str
+        This is the path where the output is to be saved to. STDIO_PATH writes the output to
+        stdout.
+    constants_file_path: str
+        The path to the constants yaml file. Defaults to none, in which case a default one will
+        be used.
+    suppress_printout: bool
+        Whether the 'calculation successful' printout needs to be supressed or not. Default to
+        false, which means it will print.
+    chunk_rows: int
+        How many data rows are calculated at once. Default is None, in which case
+        csv_extractor.DEFAULT_CHUNK_ROWS is used.
+    downsample: int
+        Only every downsample-th data row is used. Default value is 1 (no downsampling).
+    t_start: float
+        If given, only the data at or after this time is used, in s. Default is None.
+    t_end: float
+        If given, only the data at or before this time is used, in s. Default is None.
+    stop_after: str
+        The last stage calculated, one of STAGES, as in execute_calculation. Default is
+        engine_XML.
+    '''
+    import numpy as np
+    from csv_extractor import CSVExtractor, DEFAULT_CHUNK_ROWS
+    from constants import ConstantsManager
+    from DAQ_raw import DAQRaw
+    from pipeline import Pipeline
+
+    if stop_after not in STAGES:
+        raise ValueError(f'unknown stage: {stop_after}')
+    if data_file_path == STDIO_PATH:
+        raise ValueError(
+            'the chunked calculation reads the DAQ file twice, it cannot be stdin')
+    if chunk_rows is None:
+        chunk_rows = DEFAULT_CHUNK_ROWS
+
+    if constants_file_path:
+        constants = ConstantsManager(constants_file_path)
+    else:
+        constants = ConstantsManager()
+
+    start_time_s, end_of_burn_index = find_time_references(
+        data_file_path, constants.test_conditions['end_of_burn'], chunk_rows, downsample)
+
+    if target_path == STDIO_PATH:
+        output = nullcontext(sys.stdout)
+    else:
+        output = open(target_path, 'w')
+
+    with output as file, open(data_file_path, newline='') as csvfile:
+        chunks = CSVExtractor().iter_stream_chunks(
+            csvfile, chunk_rows, downsample, -np.inf if t_start is None else t_start,
+            np.inf if t_end is None else t_end)
+        chunk_idx = 0
+        while True:
+            with profiling.measure('CSV_extractor'):
+                columns = next(chunks, None)
+            if columns is None:
+                break
+            DAQ_data = DAQRaw(*columns)
+            DAQ_data.start_time_s = start_time_s
+            DAQ_data.end_of_burn_index = end_of_burn_index
+            profiling.record_output('CSV_extractor', DAQ_data)
+
+            stage_data = Pipeline(DAQ_data, constants).get(stop_after)
+            with profiling.measure('file_write'):
+                write_stage_output(file, DAQ_data, stage_data, stop_after,
+                                   header=chunk_idx == 0)
+            chunk_idx += 1
 
     if not suppress_printout:
-        print('calculation successful')
+        print('calculation successful',
+              file=sys.stderr if target_path == STDIO_PATH else sys.stdout)
@@ -1,9 +1,25 @@
 #!/usr/bin/env/python
 from math import pi
+from types import MappingProxyType
 import copy
-import yaml
+import hashlib
+import json
+import os
 import numpy as np
 
+# Compiled configurations are saved as JSON in this directory, which is not next to the YAML
+# files so that compiling never writes into a project or a read-only install
+DEFAULT_COMPILED_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'),
+    'rse_calculator', 'config')
+COMPILED_VERSION = 2
+# Most compiled configurations kept, the least recently used ones are removed past it
+MAX_COMPILED_FILES = 32
+
+# Frozen configurations shared by the whole process, keyed on file path and modification time
+_shared_configs = {}
+
 
 def find_volume_cylinder(r, l):
     '''
@@ -106,21 +122,149 @@ def pounds_to_N(pounds):
     return 4.44822 * pounds
 
 
+def freeze(value):
+    '''
+    Return a read-only version of some configuration data, to be shared between users.
+
+    Parameters
+    ----------
+    value: object
+        A configuration value: a dict, list, numpy array or scalar, possibly nested.
+
+    Returns
+    -------
+    object:
+        Dicts become read-only mappings, lists become tuples and arrays become read-only
+        copies. Scalars are returned as they are.
+    '''
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, np.ndarray):
+        value = value.copy()
+        value.flags.writeable = False
+    return value
+
+
+def thaw(value):
+    '''
+    Return a mutable copy of frozen configuration data, the inverse of freeze.
+
+    Parameters
+    ----------
+    value: object
+        Configuration data, as returned by freeze.
+    '''
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return value
+
+
 class ConstantsManager:
     '''
     Manage constants by loading configuration files.
+
+    Each configuration file is parsed once per process, and parsed again only if it was
+    modified. Every manager of the same file shares the same read-only data, so replacing a
+    field (for example `consts.solver_options = dict(consts.solver_options, ...)`) only
+    affects that manager.
     '''
     DEFAULT_PATH = 'constant_config.yaml'  # Default path of the configuration settings
 
+    # Directory in which configuration files are compiled to JSON, so that later processes can
+    # skip importing and running the YAML parser. None to always parse the YAML.
+    compiled_cache_dir = DEFAULT_COMPILED_DIR
+
+    # Numerical options used when the configuration file has no SolverOptions section
+    DEFAULT_SOLVER_OPTIONS = {
+        # How temperature is found from pressure: 'interp' (table) or 'newton' (Eq. 4.1)
+        'temperature_solver': 'interp',
+        'newton_tolerance_k': 1e-9,
+        'newton_max_iterations': 20,
+        # Precision of the density calculations: 'float64' or 'float32'
+        'density_dtype': 'float64',
+        # Whether densities are only calculated once per distinct tank pressure
+        'unique_pressures': False,
+        # Source of the saturated NOS properties: 'correlation' (Eq. 4.1 to 4.3) or
+        # 'tabulated', read from the CSV file at eos_table_path
+        'eos_backend': 'correlation',
+        'eos_table_path': None,
+    }
+
+    # Fields whose constants can be replaced by with_overrides, by their key in the field
+    OVERRIDABLE_FIELDS = ('tank_dimensions_inches', 'nitrous_oxide_properties',
+                          'equation_constants', 'engine_info', 'test_conditions',
+                          'solver_options')
+    # The tank dimensions that can be replaced, in inches. Every other tank dimension, and the
+    # ones in meters, are derived from them again.
+    OVERRIDABLE_TANK_DIMENSIONS = ('diameter', 'length')
+
     def __init__(self, path=DEFAULT_PATH):
         self.tank_dimensions_inches = {}
         self.tank_dimensions_meters = {}
         self.nitrous_oxide_properties = {}
+        self.equation_constants = {}
         self.engine_info = {}
         self.test_conditions = {}
+        self.solver_options = {}
 
         self.load_config(path)
 
+    def __getstate__(self):
+        # Read-only mappings cannot be pickled, so they are sent as plain data
+        return {name: thaw(value) for name, value in self.__dict__.items()}
+
+    def __setstate__(self, state):
+        self.__dict__.update({name: freeze(value)
+                             for name, value in state.items()})
+
+    def with_overrides(self, **overrides):
+        '''
+        Return a copy of this manager with some constants replaced.
+
+        Only the fields in which a constant actually changes are replaced, every other field
+        is shared with this manager.
+
+        Parameters
+        ----------
+        overrides: dict
+            The new value of each constant, by its key in its field, for example
+            end_of_burn=... or fuel_grain_final_mass=... . Tank dimensions are given in inches,
+            as 'diameter' or 'length'.
+
+        Returns
+        -------
+        ConstantsManager:
+            The new manager.
+        '''
+        field_overrides = {}
+        for key, value in overrides.items():
+            fields = [field for field in self.OVERRIDABLE_FIELDS if key in getattr(self, field)
+                      and (field != 'tank_dimensions_inches' or
+                           key in self.OVERRIDABLE_TANK_DIMENSIONS)]
+            if len(fields) != 1:
+                raise ValueError(f'unknown or ambiguous constant: {key}')
+            current = getattr(self, fields[0])[key]
+            if not np.array_equal(current, value) or np.shape(current) != np.shape(value):
+                field_overrides.setdefault(fields[0], {})[key] = value
+
+        new_manager = object.__new__(type(self))
+        new_manager.__dict__.update(self.__dict__)
+        for field, values in field_overrides.items():
+            data = dict(thaw(getattr(self, field)), **values)
+            if field == 'tank_dimensions_inches':
+                data = self.load_tank_dims_inches({key: data[key] for key
+                                                   in self.OVERRIDABLE_TANK_DIMENSIONS})
+                new_manager.tank_dimensions_meters = freeze(
+                    self.load_tank_dims_meters(data))
+            setattr(new_manager, field, freeze(data))
+        return new_manager
+
     def load_config(self, path):
         '''
         Load the configuration at the target path into local fields.
@@ -131,18 +275,236 @@ class ConstantsManager:
             The path at which the configuration file is.
 
         '''
+        self.__dict__.update(self.shared_config(path))
 
-        with open(path) as file:
-            data = yaml.load(file, Loader=yaml.FullLoader)
+    @classmethod
+    def shared_config(cls, path):
+        '''
+        Return the frozen fields of a configuration file, parsing it only if needed.
+
+        Parameters
+        ----------
+        path: str
+            The path at which the configuration file is.
+
+        Returns
+        -------
+        dict:
+            The value of every configuration field of ConstantsManager. The values must not
+            be modified.
+        '''
+        real_path = os.path.realpath(path)
+        stat = os.stat(real_path)
+        key = (real_path, stat.st_mtime_ns, stat.st_size)
 
-        self.tank_dimensions_inches = self.load_tank_dims_inches(
+        config = _shared_configs.get(key)
+        if config is None:
+            config = {name: freeze(value) for name,
+                      value in cls.parse_config(real_path).items()}
+            _shared_configs[key] = config
+        return config
+
+    @staticmethod
+    def clear_cache():
+        '''
+        Forget every parsed configuration file.
+        '''
+        _shared_configs.clear()
+
+    @classmethod
+    def parse_config(cls, path):
+        '''
+        Parse a configuration file and complete its data.
+
+        Parameters
+        ----------
+        path: str
+            The path at which the configuration file is.
+
+        Returns
+        -------
+        dict:
+            The value of every configuration field of ConstantsManager.
+        '''
+        data = cls.read_config_data(path)
+
+        tank_dimensions_inches = cls.load_tank_dims_inches(
             data['TankDimensionsInches'])
-        self.tank_dimensions_meters = self.load_tank_dims_meters(
-            self.tank_dimensions_inches)
-        self.nitrous_oxide_properties = data['NitrousOxideProperties']
-        self.equation_constants = data['EquationConstants']
-        self.engine_info = data['EngineInfo']
-        self.test_conditions = data['TestConditions']
+        solver_options = cls.load_solver_options(data.get('SolverOptions'))
+
+        # Table files are found relative to the configuration file
+        table_path = solver_options['eos_table_path']
+        if table_path:
+            solver_options['eos_table_path'] = os.path.join(
+                os.path.dirname(path), table_path)
+
+        return {
+            'tank_dimensions_inches': tank_dimensions_inches,
+            'tank_dimensions_meters': cls.load_tank_dims_meters(tank_dimensions_inches),
+            'nitrous_oxide_properties': data['NitrousOxideProperties'],
+            'equation_constants': data['EquationConstants'],
+            'engine_info': data['EngineInfo'],
+            'test_conditions': data['TestConditions'],
+            'solver_options': solver_options,
+        }
+
+    @classmethod
+    def read_config_data(cls, path):
+        '''
+        Read the raw data of a configuration file, from its compiled copy if it is up to date.
+
+        A file is only compiled if its data comes back from JSON unchanged, so tuples and keys
+        that are not strings, which JSON cannot hold, are always read from the YAML.
+
+        Parameters
+        ----------
+        path: str
+            The path at which the configuration file is.
+
+        Returns
+        -------
+        dict:
+            The data of the YAML file, as parsed.
+        '''
+        stat = os.stat(path)
+        source = {'version': COMPILED_VERSION, 'path': os.path.abspath(path),
+                  'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+        compiled_path = cls.compiled_path(path)
+
+        if compiled_path is not None:
+            try:
+                with open(compiled_path) as compiled_file:
+                    compiled = json.load(compiled_file)
+                if compiled.get('source') == source:
+                    # Marks it as used, so that it is not the next one evicted
+                    os.utime(compiled_path)
+                    return compiled['data']
+            except (OSError, ValueError):
+                pass
+
+        import yaml
+
+        with open(path) as file:
+            # The C-accelerated loader is used when PyYAML was built with libyaml
+            data = yaml.load(file, Loader=getattr(
+                yaml, 'CFullLoader', yaml.FullLoader))
+
+        if compiled_path is not None:
+            cls.save_compiled(compiled_path, source, data)
+        return data
+
+    @classmethod
+    def compiled_path(cls, path):
+        '''
+        Return where the compiled copy of a configuration file is saved, or None if compiling
+        is off.
+
+        Parameters
+        ----------
+        path: str
+            The path at which the configuration file is.
+        '''
+        if cls.compiled_cache_dir is None:
+            return None
+        digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(cls.compiled_cache_dir, f'{name}-{digest}.json')
+
+    @classmethod
+    def save_compiled(cls, compiled_path, source, data):
+        '''
+        Save the compiled copy of a configuration file, if JSON holds its data exactly.
+
+        Only the MAX_COMPILED_FILES most recently used copies are kept, so that the copies of
+        temporary configuration files do not pile up.
+
+        Parameters
+        ----------
+        compiled_path: str
+            Where the compiled copy is saved.
+        source: dict
+            Identifies the state of the configuration file that was parsed.
+        data: dict
+            The data of the YAML file, as parsed.
+
+        Returns
+        -------
+        bool:
+            Whether the compiled copy was saved. A read-only directory, or data that JSON
+            cannot hold or would change, only skips the compilation.
+        '''
+        try:
+            text = json.dumps({'source': source, 'data': data})
+        except (TypeError, ValueError):
+            return False
+        # Tuples would come back as lists and non-string keys as strings
+        if json.loads(text)['data'] != data:
+            return False
+
+        # Written under a temporary name first, so that readers never see a partial file
+        temp_path = f'{compiled_path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+            with open(temp_path, 'w') as compiled_file:
+                compiled_file.write(text)
+            os.replace(temp_path, compiled_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+        cls.evict_compiled(os.path.dirname(compiled_path))
+        return True
+
+    @staticmethod
+    def evict_compiled(compiled_dir, max_files=MAX_COMPILED_FILES):
+        '''
+        Remove the least recently used compiled copies until at most max_files are left.
+
+        Parameters
+        ----------
+        compiled_dir: str
+            The directory of the compiled copies.
+        max_files: int
+            The number of copies kept. Default is MAX_COMPILED_FILES.
+        '''
+        try:
+            with os.scandir(compiled_dir) as entries:
+                last_used = sorted((entry.stat().st_mtime_ns, entry.path) for entry in entries
+                                   if entry.name.endswith('.json'))
+        except OSError:
+            return
+
+        for _, path in last_used[:max(len(last_used) - max_files, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @classmethod
+    def load_solver_options(cls, yaml_data):
+        '''
+        Complete the numerical options with their defaults.
+
+        Parameters
+        ----------
+        yaml_data: dict
+            The SolverOptions section of the configuration file, or None if it is missing.
+
+        Returns
+        -------
+
+        dict:
+            Every option in DEFAULT_SOLVER_OPTIONS, overridden by the configuration file.
+        '''
+        options = dict(cls.DEFAULT_SOLVER_OPTIONS)
+        if yaml_data:
+            unknown = set(yaml_data) - set(options)
+            if unknown:
+                raise ValueError('unknown SolverOptions: ' +
+                                 ', '.join(sorted(unknown)))
+            options.update(yaml_data)
+        return options
 
     @staticmethod
     def load_tank_dims_inches(yaml_data):
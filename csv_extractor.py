@@ -1,7 +1,165 @@
 import csv
+import io
 import os
+from itertools import islice
+from operator import itemgetter
+
+import numpy as np
+
 from DAQ_raw import DAQRaw
 
+# Number of rows converted to floats at once while streaming a csv file
+DEFAULT_CHUNK_ROWS = 65536
+
+# Largest number of bytes read from a followed file at once
+TAIL_READ_BYTES = 1 << 20
+
+# Headers of the columns that make up a DAQRaw object, in constructor order
+DAQ_COLUMN_LABELS = ('TIME (S)', 'TANK PRESSURE (PSIG)',
+                     'RECORDED MASS (LB)', 'THRUST (LB)')
+
+
+class ColumnBuffer:
+    '''
+    Hold a fixed number of growable float64 columns.
+
+    Each column is its own contiguous array which is grown in place, so that filling the buffer
+    never keeps more than one copy of the data around.
+    '''
+
+    def __init__(self, n_columns, initial_capacity=DEFAULT_CHUNK_ROWS):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+
+        n_columns: int
+            The number of columns held by the buffer.
+        initial_capacity: int
+            How many rows can be held before the columns need to be grown.
+        '''
+        self.size = 0
+        self.capacity = max(int(initial_capacity), 1)
+        self.columns = [np.empty(self.capacity) for _ in range(n_columns)]
+
+    def append_block(self, block):
+        '''
+        Append a block of rows to the end of the columns.
+
+        Parameters
+        ----------
+
+        block: numpy.ndarray
+            A 2D array of shape (rows, n_columns).
+        '''
+        n_rows = len(block)
+        if self.size + n_rows > self.capacity:
+            self.capacity = max(2*self.capacity, self.size + n_rows)
+            for column in self.columns:
+                column.resize(self.capacity, refcheck=False)
+
+        for col_idx, column in enumerate(self.columns):
+            column[self.size:self.size + n_rows] = block[:, col_idx]
+        self.size += n_rows
+
+    def finalize(self):
+        '''
+        Shrink the columns down to the number of rows appended and return them.
+
+        Returns
+        -------
+
+        list of numpy.ndarray:
+            The filled columns.
+        '''
+        for column in self.columns:
+            column.resize(self.size, refcheck=False)
+        self.capacity = self.size
+        return self.columns
+
+
+class CSVTail:
+    '''
+    Follow a csv file that is still being written, reading only the rows appended to it.
+
+    A row is only read once its line is complete, that is once its newline is written, so a
+    row the writer is halfway through is left for a later read.
+    '''
+
+    def __init__(self, file_path, max_rows=None):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file. It does not have to exist yet.
+        max_rows: int
+            The most data rows returned by one read, the others being left for the next reads.
+            Default is None, in which case every complete row is returned.
+        '''
+        self.file_path = file_path
+        self.max_rows = max_rows
+        # Position in the file of the first byte not read yet
+        self.offset = 0
+        # Indices of the time, tank pressure, recorded mass and thrust columns, once the
+        # header row is read
+        self.col_indices = None
+
+    def read_new_lines(self):
+        '''
+        Read the complete lines appended to the file since the last read.
+
+        Returns
+        -------
+
+        list of bytes:
+            The lines, without their newline. Empty if the file does not exist yet.
+        '''
+        try:
+            tailed_file = open(self.file_path, 'rb')
+        except FileNotFoundError:
+            return []
+
+        with tailed_file:
+            if os.fstat(tailed_file.fileno()).st_size < self.offset:
+                raise ValueError(
+                    f'{self.file_path} was truncated while being followed')
+            tailed_file.seek(self.offset)
+            data = tailed_file.read(TAIL_READ_BYTES)
+
+        lines = data.split(b'\n')[:-1]
+        if self.max_rows is not None:
+            lines = lines[:self.max_rows + (self.col_indices is None)]
+        self.offset += sum(len(line) + 1 for line in lines)
+        return lines
+
+    def read_new_columns(self):
+        '''
+        Read the data rows appended to the file since the last read.
+
+        Returns
+        -------
+
+        list of numpy.ndarray:
+            The time, tank pressure, recorded mass and thrust columns of the new rows, in
+            DAQRaw constructor order, or None if no complete row was appended.
+        '''
+        reader = csv.reader(line.decode() for line in self.read_new_lines())
+        if self.col_indices is None:
+            label_table = next(reader, None)
+            if label_table is None:
+                return None
+            self.col_indices = CSVExtractor.find_column_indices(label_table)
+
+        columns = CSVExtractor.parse_rows(
+            (row for row in reader if row), self.col_indices)
+        if not len(columns[0]):
+            return None
+        return columns
+
 
 class CSVExtractor:
     '''
@@ -10,6 +168,7 @@ class CSVExtractor:
 
     def __init__(self):
         self.debug_mode = False
+        self.cache = None
 
     def set_debug_mode(self, mode):
         '''
@@ -24,9 +183,99 @@ class CSVExtractor:
 
         self.debug_mode = mode
 
-    def extract_data_to_raw_DAQ(self, file_path, downsample=1):
+    def set_cache_mode(self, mode, cache_dir=None):
         '''
-        Create a DAQRaw object from the contents of the provided csv file.
+        Set whether parsed files are cached as memory-mappable binary columns.
+
+        When enabled, the first extraction of a file writes its columns to a sidecar cache
+        entry (see DAQ_cache.DAQCache), and later extractions of the unchanged file reload
+        them without parsing any text.
+
+        Parameters
+        ----------
+
+        mode: bool
+            The desired state of the cache for the extractor.
+        cache_dir: str
+            The directory in which cache entries are placed. Default is None, in which case
+            every entry is placed right next to its csv file.
+        '''
+
+        if mode:
+            from DAQ_cache import DAQCache
+            self.cache = DAQCache(cache_dir)
+        else:
+            self.cache = None
+
+    @staticmethod
+    def find_column_indices(label_table):
+        '''
+        Find the indices of the time, tank pressure, recorded mass and thrust columns.
+
+        Parameters
+        ----------
+
+        label_table: list of str
+            The header row of the csv file.
+
+        Returns
+        -------
+
+        tuple of int:
+            The column indices, in the order of DAQ_COLUMN_LABELS. If any of the labels is
+            missing, the first four columns are assumed to hold the data in that order.
+        '''
+        col_indices = [-1] * len(DAQ_COLUMN_LABELS)
+
+        for idx, itm in enumerate(label_table):
+            p_itm = itm.strip().upper()
+            if p_itm in DAQ_COLUMN_LABELS:
+                col_indices[DAQ_COLUMN_LABELS.index(p_itm)] = idx
+
+        if -1 in col_indices:
+            return tuple(range(len(DAQ_COLUMN_LABELS)))
+
+        return tuple(col_indices)
+
+    @staticmethod
+    def parse_rows(rows, col_indices, chunk_rows=DEFAULT_CHUNK_ROWS):
+        '''
+        Convert the selected columns of the given rows to float64 arrays, one chunk at a time.
+
+        Parameters
+        ----------
+
+        rows: iterable of list of str
+            The data rows, as produced by a csv reader.
+        col_indices: tuple of int
+            The indices of the columns to keep.
+        chunk_rows: int
+            How many rows are converted at once. This bounds the number of python objects
+            alive at any point of the parse.
+
+        Returns
+        -------
+
+        list of numpy.ndarray:
+            One array per selected column.
+        '''
+        select = itemgetter(*col_indices)
+        buffer = ColumnBuffer(len(col_indices), chunk_rows)
+
+        while True:
+            cells = [select(row) for row in islice(rows, chunk_rows)]
+            if not cells:
+                break
+            buffer.append_block(np.array(cells, dtype=np.float64))
+
+        return buffer.finalize()
+
+    def read_columns(self, file_path, downsample=1):
+        '''
+        Read the time, tank pressure, recorded mass and thrust columns of a csv file.
+
+        The file is streamed: only the four columns are kept, and they are converted to
+        floats in fixed-size chunks.
 
         Parameters
         ----------
@@ -35,54 +284,417 @@ class CSVExtractor:
             The location of the .csv file.
         downsample: int
             How much the output needs to be downsampled by. Default value is 1 (no downsampling).
+
+        Returns
+        -------
+
+        list of numpy.ndarray:
+            The columns, in DAQRaw constructor order.
+        '''
+        with open(file_path, newline='') as csvfile:
+            return self.read_stream_columns(csvfile, downsample)
+
+    def read_stream_columns(self, csvfile, downsample=1, t_start=-np.inf, t_end=np.inf):
+        '''
+        Read the time, tank pressure, recorded mass and thrust columns of an open csv file.
+
+        The file is only read forwards, once, so this also works on pipes such as stdin.
+
+        Parameters
+        ----------
+
+        csvfile: file object
+            The csv file, opened in text mode, positioned at its header row.
+        downsample: int
+            How much the output needs to be downsampled by. Default value is 1 (no downsampling).
+        t_start: float
+            The earliest time kept. Default is to keep every row from the start.
+        t_end: float
+            The latest time kept. Default is to keep every row up to the end.
+
+        Returns
+        -------
+
+        list of numpy.ndarray:
+            The columns, in DAQRaw constructor order.
+        '''
+        return self.parse_rows(*self.select_stream_rows(csvfile, downsample, t_start, t_end))
+
+    def select_stream_rows(self, csvfile, downsample=1, t_start=-np.inf, t_end=np.inf):
         '''
-        csvfile = open(file_path, newline='')
-        reader = list(csv.reader(csvfile))
+        Read the header of an open csv file, and select the data rows to be kept.
 
-        label_table = reader[0]
+        Parameters
+        ----------
+
+        csvfile: file object
+            The csv file, opened in text mode, positioned at its header row.
+        downsample: int
+            How much the output needs to be downsampled by. Default value is 1 (no downsampling).
+        t_start: float
+            The earliest time kept. Default is to keep every row from the start.
+        t_end: float
+            The latest time kept. Default is to keep every row up to the end.
+
+        Returns
+        -------
+
+        tuple:
+            An iterator over the kept rows, and the indices of the time, tank pressure,
+            recorded mass and thrust columns.
+        '''
+        reader = csv.reader(csvfile)
+
+        label_table = next(reader, [])
         if self.debug_mode:
             print(label_table)
 
-        time_col_idx = -1
-        tank_pressure_col_idx = -1
-        recorded_mass_col_idx = -1
-        thrust_col_idx = -1
+        col_indices = self.find_column_indices(label_table)
+        reader = self.skip_blank_rows(reader)
 
-        for idx, itm in enumerate(label_table):
-            p_itm = itm.strip().upper()
-            if p_itm == 'TIME (S)':
-                time_col_idx = idx
-            if p_itm == 'TANK PRESSURE (PSIG)':
-                tank_pressure_col_idx = idx
-            if p_itm == 'RECORDED MASS (LB)':
-                recorded_mass_col_idx = idx
-            if p_itm == 'THRUST (LB)':
-                thrust_col_idx = idx
-
-        if (time_col_idx == -1 or tank_pressure_col_idx == -1
-                or recorded_mass_col_idx == -1 or thrust_col_idx == -1):
-            time_col_idx = 0
-            tank_pressure_col_idx = 1
-            recorded_mass_col_idx = 2
-            thrust_col_idx = 3
-
-        DAQ_times = []
-        DAQ_tank_pressures = []
-        DAQ_recorded_masses = []
-        DAQ_thrust_values = []
-
-        for row_idx in range(1, len(reader)):
-            if row_idx % downsample == 0:
-                DAQ_times.append(reader[row_idx][time_col_idx])
-                DAQ_tank_pressures.append(
-                    reader[row_idx][tank_pressure_col_idx])
-                DAQ_recorded_masses.append(
-                    reader[row_idx][recorded_mass_col_idx])
-                DAQ_thrust_values.append(reader[row_idx][thrust_col_idx])
-
-        csvfile.close()
-
-        return DAQRaw(DAQ_times, DAQ_tank_pressures, DAQ_recorded_masses, DAQ_thrust_values)
+        if t_start > -np.inf or t_end < np.inf:
+            rows = self.window_rows(
+                reader, 1, col_indices[0], t_start, t_end, downsample)
+        else:
+            # Data rows are counted from 1, and every row whose count is a multiple of
+            # downsample is kept
+            rows = islice(reader, downsample - 1, None, downsample)
+        return rows, col_indices
+
+    def iter_stream_chunks(self, csvfile, chunk_rows=DEFAULT_CHUNK_ROWS, downsample=1,
+                           t_start=-np.inf, t_end=np.inf, time_only=False):
+        '''
+        Read the columns of an open csv file a fixed number of rows at a time.
+
+        Only one chunk is held in memory at once, however long the file is.
+
+        Parameters
+        ----------
+
+        csvfile: file object
+            The csv file, opened in text mode, positioned at its header row.
+        chunk_rows: int
+            How many rows each chunk holds, except for the last one which may hold fewer.
+        downsample: int
+            How much the output needs to be downsampled by. Default value is 1 (no downsampling).
+        t_start: float
+            The earliest time kept. Default is to keep every row from the start.
+        t_end: float
+            The latest time kept. Default is to keep every row up to the end.
+        time_only: bool
+            Whether only the time column is converted to floats. Default to false.
+
+        Yields
+        ------
+
+        list of numpy.ndarray:
+            The columns of each chunk, in DAQRaw constructor order, or only the time column.
+        '''
+        rows, col_indices = self.select_stream_rows(
+            csvfile, downsample, t_start, t_end)
+        if time_only:
+            col_indices = col_indices[:1]
+        select = itemgetter(*col_indices)
+
+        while True:
+            cells = [select(row) for row in islice(rows, chunk_rows)]
+            if not cells:
+                return
+            block = np.array(cells, dtype=np.float64).reshape(
+                len(cells), len(col_indices))
+            yield [np.ascontiguousarray(block[:, col_idx])
+                   for col_idx in range(len(col_indices))]
+
+    @staticmethod
+    def skip_blank_rows(rows):
+        '''
+        Drop the blank lines of a csv file, which are not counted as data rows.
+
+        Parameters
+        ----------
+
+        rows: iterable of list of str
+            The rows, as produced by a csv reader.
+
+        Yields
+        ------
+
+        list of str:
+            The rows that are not empty.
+        '''
+        return (row for row in rows if row)
+
+    @staticmethod
+    def window_rows(rows, first_row_number, time_col_idx, t_start, t_end, downsample=1):
+        '''
+        Filter csv rows down to a time window.
+
+        Parameters
+        ----------
+
+        rows: iterable of list of str
+            The data rows, as produced by a csv reader.
+        first_row_number: int
+            The row number of the first row, counted from 1 at the first data row of the file.
+        time_col_idx: int
+            The index of the time column.
+        t_start: float
+            The earliest time kept.
+        t_end: float
+            The latest time kept. Rows are expected in non-decreasing time order, so the
+            iteration stops at the first row past t_end.
+        downsample: int
+            Only rows whose row number is a multiple of this are kept.
+
+        Yields
+        ------
+
+        list of str:
+            The rows inside the window.
+        '''
+        for row_number, row in enumerate(rows, start=first_row_number):
+            time = float(row[time_col_idx])
+            if time > t_end:
+                return
+            if time >= t_start and row_number % downsample == 0:
+                yield row
+
+    def read_window_columns(self, file_path, t_start, t_end, downsample=1):
+        '''
+        Read the columns of the rows of a csv file that fall inside a time window.
+
+        A persisted DAQ_time_index.DAQTimeIndex of the file is used to seek close to t_start,
+        so that only the rows of the window (plus at most one index stride) are parsed.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+        t_start: float
+            The earliest time kept.
+        t_end: float
+            The latest time kept.
+        downsample: int
+            How much the output needs to be downsampled by. Downsampling is aligned with the
+            whole file rather than with the start of the window.
+
+        Returns
+        -------
+
+        list of numpy.ndarray:
+            The columns, in DAQRaw constructor order.
+        '''
+        with open(file_path, newline='') as csvfile:
+            col_indices = self.find_column_indices(
+                next(csv.reader(csvfile), []))
+
+        from DAQ_time_index import DAQTimeIndex
+
+        index_dir = self.cache.cache_dir if self.cache is not None else None
+        index = DAQTimeIndex.for_file(file_path, col_indices[0], index_dir)
+        first_row_number, offset = index.locate(t_start)
+
+        with open(file_path, 'rb') as raw_file:
+            if offset is None:
+                return self.parse_rows(iter([]), col_indices)
+
+            raw_file.seek(offset)
+            reader = self.skip_blank_rows(csv.reader(
+                io.TextIOWrapper(raw_file, newline='')))
+            rows = self.window_rows(reader, first_row_number, col_indices[0],
+                                    t_start, t_end, downsample)
+            return self.parse_rows(rows, col_indices)
+
+    @staticmethod
+    def slice_window(columns, t_start, t_end, downsample=1):
+        '''
+        Slice full resolution columns down to a time window, as views.
+
+        Parameters
+        ----------
+
+        columns: list of numpy.ndarray
+            The full resolution columns, time first.
+        t_start: float
+            The earliest time kept.
+        t_end: float
+            The latest time kept.
+        downsample: int
+            How much the output needs to be downsampled by.
+
+        Returns
+        -------
+
+        list of numpy.ndarray:
+            The sliced columns.
+        '''
+        low = np.searchsorted(columns[0], t_start, side='left')
+        high = np.searchsorted(columns[0], t_end, side='right')
+        # Keep rows whose row number (idx + 1) is a multiple of downsample
+        low += (-(low + 1)) % downsample
+        return [column[low:high:downsample] for column in columns]
+
+    def find_time_references(self, file_path, end_of_burn_s, downsample=1):
+        '''
+        Find the time of the first data point and the index of the end of burn in a csv file.
+
+        The references are those of the whole recording, as found by scanning it with
+        calculator_main.find_time_references, but only the rows next to them are looked at:
+        the time column is searched in the cache entry of the file when caching is enabled,
+        and the rows are sought to through the persisted DAQ_time_index.DAQTimeIndex of the
+        file otherwise.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+        end_of_burn_s: float
+            The time at which the burn is over.
+        downsample: int
+            How much the output needs to be downsampled by. Default value is 1 (no downsampling).
+
+        Returns
+        -------
+
+        tuple:
+            The time of the first data point, and the index of the data point at end_of_burn_s.
+        '''
+        columns = self.cache.load(
+            file_path) if self.cache is not None else None
+        if columns is not None:
+            time_s = columns[0][downsample - 1::downsample]
+            start_time_s = time_s[0] if len(time_s) else None
+            end_of_burn_index = int(np.searchsorted(
+                time_s, end_of_burn_s, side='left'))
+            if end_of_burn_index == len(time_s) or time_s[end_of_burn_index] != end_of_burn_s:
+                end_of_burn_index = None
+        else:
+            start_time_s, end_of_burn_index = self.find_indexed_time_references(
+                file_path, end_of_burn_s, downsample)
+
+        if end_of_burn_index is None:
+            raise ValueError(f'{file_path}: no data point at the end of burn time, '
+                             f'{end_of_burn_s} s')
+        return start_time_s, end_of_burn_index
+
+    def find_indexed_time_references(self, file_path, end_of_burn_s, downsample=1):
+        '''
+        Find the time references of a csv file through its DAQ_time_index.DAQTimeIndex.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+        end_of_burn_s: float
+            The time at which the burn is over.
+        downsample: int
+            How much the output needs to be downsampled by. Default value is 1 (no downsampling).
+
+        Returns
+        -------
+
+        tuple:
+            The time of the first data point and the index of the data point at end_of_burn_s,
+            each None if there is no such data point.
+        '''
+        with open(file_path, newline='') as csvfile:
+            time_col_idx = self.find_column_indices(
+                next(csv.reader(csvfile), []))[0]
+
+        from DAQ_time_index import DAQTimeIndex
+
+        index_dir = self.cache.cache_dir if self.cache is not None else None
+        index = DAQTimeIndex.for_file(file_path, time_col_idx, index_dir)
+        if len(index.offsets) == 0:
+            return None, None
+
+        def iter_row_times(first_row_number, offset):
+            # Time of every kept row from an indexed one on, with its row number
+            with open(file_path, 'rb') as raw_file:
+                raw_file.seek(offset)
+                reader = self.skip_blank_rows(
+                    csv.reader(io.TextIOWrapper(raw_file, newline='')))
+                for row_number, row in enumerate(reader, start=first_row_number):
+                    if row_number % downsample == 0:
+                        yield row_number, np.float64(row[time_col_idx])
+
+        start_time_s = next((time for _, time in iter_row_times(
+            int(index.row_numbers[0]), int(index.offsets[0]))), None)
+
+        end_of_burn_index = None
+        for row_number, time in iter_row_times(*index.locate(end_of_burn_s)):
+            if time >= end_of_burn_s:
+                if time == end_of_burn_s:
+                    end_of_burn_index = row_number // downsample - 1
+                break
+
+        return start_time_s, end_of_burn_index
+
+    def extract_data_to_raw_DAQ(self, file_path, downsample=1, t_start=None, t_end=None):
+        '''
+        Create a DAQRaw object from the contents of the provided csv file.
+
+        Parameters
+        ----------
+
+        file_path: str
+            The location of the .csv file.
+        downsample: int
+            How much the output needs to be downsampled by. Default value is 1 (no downsampling).
+        t_start: float
+            If given along with or instead of t_end, only the rows whose time is at or after
+            this are loaded. Default is None.
+        t_end: float
+            If given along with or instead of t_start, only the rows whose time is at or
+            before this are loaded. Default is None.
+        '''
+        windowed = t_start is not None or t_end is not None
+        t_start = -np.inf if t_start is None else t_start
+        t_end = np.inf if t_end is None else t_end
+
+        if self.cache is None:
+            if windowed:
+                return DAQRaw(*self.read_window_columns(file_path, t_start, t_end, downsample))
+            return DAQRaw(*self.read_columns(file_path, downsample))
+
+        columns = self.cache.load(file_path)
+        if columns is None:
+            columns = self.read_columns(file_path)
+            self.cache.save(file_path, columns)
+        elif self.debug_mode:
+            print('loaded cached columns for ' + file_path)
+
+        # Slicing keeps memory-mapped columns as views
+        if windowed:
+            columns = self.slice_window(columns, t_start, t_end, downsample)
+        else:
+            columns = [column[downsample - 1::downsample]
+                       for column in columns]
+
+        return DAQRaw(*columns)
+
+    def extract_stream_to_raw_DAQ(self, csvfile, downsample=1, t_start=None, t_end=None):
+        '''
+        Create a DAQRaw object from the contents of an open csv file, such as stdin.
+
+        Parameters
+        ----------
+
+        csvfile: file object
+            The csv file, opened in text mode, positioned at its header row.
+        downsample: int
+            How much the output needs to be downsampled by. Default value is 1 (no downsampling).
+        t_start: float
+            If given, only the rows whose time is at or after this are loaded. Default is None.
+        t_end: float
+            If given, only the rows whose time is at or before this are loaded. Default is None.
+        '''
+        t_start = -np.inf if t_start is None else t_start
+        t_end = np.inf if t_end is None else t_end
+        return DAQRaw(*self.read_stream_columns(csvfile, downsample, t_start, t_end))
 
     @staticmethod
     def downsample_file(target_file_path, new_file_path=None, downsample=10,
@@ -1,9 +1,6 @@
 import numpy as np
 
 from constants import ConstantsManager as ConstsM
-from NOS_mass_and_volume import NOSMassAndVolume
-from NOS_liquid_CG import NOSLiquidCG
-from NOS_vapour_CG import NOSVapourCG
 
 
 class EngineCG:
@@ -71,12 +68,17 @@ class EngineCG:
         self.NOS_CG_in = np.array(self.calculate_NOS_CG_values(0, 0, 0, 0,
                                                                self.NOS_liq_CG, self.NOS_vap_CG))
 
-        # Double dereference has to occur because of how numpy arrays indexing works
-        self.set_end_of_burn(
-            np.where(self.DAQ_data.time_s == self.consts_m.test_conditions['end_of_burn'])[0][0])
+        end_of_burn_s = self.consts_m.test_conditions['end_of_burn']
+        if self.DAQ_data.end_of_burn_index is None:
+            # Double dereference has to occur because of how numpy arrays indexing works
+            self.set_end_of_burn(
+                np.where(self.DAQ_data.time_s == end_of_burn_s)[0][0])
+        else:
+            # A chunk of a longer recording, whose end of burn may be in another chunk
+            self.set_end_of_burn(self.DAQ_data.end_of_burn_index)
         self.fuel_mass_lb = np.array(
-            self.calculate_fuel_mass_values(self.DAQ_data.time_s,
-                                            self.consts_m.engine_info, self.end_of_burn))
+            self.calculate_fuel_mass_between(self.DAQ_data.time_s, self.consts_m.engine_info,
+                                             self.DAQ_data.start_time_s, end_of_burn_s))
 
         self.propellant_mass_lb = self.fuel_mass_lb + self.DAQ_data.adjusted_mass_lb
 
@@ -153,11 +155,37 @@ class EngineCG:
             The fuel mass value for all time stamps.
         '''
 
+        return EngineCG.calculate_fuel_mass_between(time, engine_info, time[0],
+                                                    time[end_of_burn])
+
+    @staticmethod
+    def calculate_fuel_mass_between(time, engine_info, start_time, end_of_burn_time):
+        '''
+        Calculate the fuel mass values for data points, given the start and end of burn times.
+
+        Parameters
+        ----------
+
+        time: numpy.ndarray
+            The times stamps of the data points.
+        engine_info: dict of float
+            Data regarding the engine - constants.
+        start_time: float
+            The time of the first data point of the recording.
+        end_of_burn_time: float
+            The time at which the burn is manually determined to be over.
+
+        Returns
+        -------
+
+        numpy.ndarray:
+            The fuel mass value for all time stamps.
+        '''
         m_FI = engine_info['fuel_grain_init_mass']
         m_FF = engine_info['fuel_grain_final_mass']
 
         values = m_FI - \
-            ((m_FI-m_FF)/(time[end_of_burn] - time[0])) * (time - time[0])
+            ((m_FI-m_FF)/(end_of_burn_time - start_time)) * (time - start_time)
 
         return values
 
@@ -178,12 +206,14 @@ def create_output_file(target_path='Engine_CG_test.csv',
     '''
 
     from csv_extractor import CSVExtractor
+    from pipeline import Pipeline
     ext = CSVExtractor()
     raw_dat = ext.extract_data_to_raw_DAQ(daq_source_path)
-    test_nmv = NOSMassAndVolume(raw_dat)
-    test_nlc = NOSLiquidCG(test_nmv)
-    test_nvc = NOSVapourCG(test_nmv, test_nlc)
-    test_data = EngineCG(raw_dat, test_nvc, test_nlc)
+    pipeline = Pipeline(raw_dat)
+    test_data = pipeline.get('engine_CG')
+    test_nmv = pipeline.get('NOS_mass_and_volume')
+    test_nlc = pipeline.get('NOS_liquid_CG')
+    test_nvc = pipeline.get('NOS_vapour_CG')
 
     with open(target_path, 'w') as test_file:
         i = 0
@@ -48,8 +48,8 @@ class EngineXML:
         '''
         Calculate the remaining values that were not given during initialization.
         '''
-        time = self.DAQ_data.time_s
-        self.zeroed_time = time - time[0]
+        # Zeroed on the start of the whole recording, even when the data is only a chunk of it
+        self.zeroed_time = self.DAQ_data.time_s - self.DAQ_data.start_time_s
 
         self.thrust_N = consts.pounds_to_N(self.DAQ_data.thrust_lb)
 
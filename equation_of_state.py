@@ -0,0 +1,470 @@
+import os
+from math import e
+
+import numpy as np
+
+from vapour_pressure_calculations import VapourPressureCalculations
+from vapour_pressure_calculations import DEFAULT_T_MIN_DEG_C
+from vapour_pressure_calculations import DEFAULT_T_MAX_DEG_C
+from vapour_pressure_calculations import DEFAULT_T_STEP_DEG_C
+
+# Equation of state backends, by the name used in the 'eos_backend' solver option
+EOS_BACKENDS = {}
+
+# Columns of a saturation table file, in the order they are stored in SaturationTable
+SATURATION_TABLE_COLUMNS = ('pressure_psia', 'temperature_k', 'density_liquid_kg_m3',
+                            'density_vapour_kg_m3')
+
+# Saturation tables loaded in this process, keyed on their path and modification time
+_shared_saturation_tables = {}
+
+
+def register_eos_backend(name):
+    '''
+    Register an equation of state backend class under a name.
+
+    Parameters
+    ----------
+    name: str
+        The value of the 'eos_backend' solver option that selects the backend.
+    '''
+    def register(backend_class):
+        EOS_BACKENDS[name] = backend_class
+        return backend_class
+    return register
+
+
+def eos_backend_for(consts_m):
+    '''
+    Create the equation of state backend selected by the solver options.
+
+    Parameters
+    ----------
+    consts_m: constants.ConstantsManager
+        The constants manager that contains all of the constants loaded from file.
+
+    Returns
+    -------
+    object:
+        An instance of the registered backend class.
+    '''
+    name = consts_m.solver_options['eos_backend']
+    if name not in EOS_BACKENDS:
+        raise ValueError(f'unknown eos_backend: {name}')
+    return EOS_BACKENDS[name](consts_m)
+
+
+@register_eos_backend('correlation')
+class CorrelationEOS:
+    '''
+    Saturated NOS properties from the Equation 4.1 to 4.3 correlations.
+
+    Every backend has the same attributes and methods as this one: p_min_psi, p_max_psi,
+    nodes_psi, key, temperature_kelvin and saturation_properties.
+    '''
+
+    def __init__(self, consts_m):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        consts_m: constants.ConstantsManager
+            The constants manager that contains all of the constants loaded from file.
+        '''
+        self.consts_m = consts_m
+        self.vapour_pressure_data = VapourPressureCalculations.shared(consts_m)
+
+        # Pressures beyond the table are clamped to it, and its nodes are where the
+        # interpolated temperature is not smooth
+        self.p_min_psi = self.vapour_pressure_data.pressure_psi[0]
+        self.p_max_psi = self.vapour_pressure_data.pressure_psi[-1]
+        self.nodes_psi = self.vapour_pressure_data.pressure_psi
+
+    @staticmethod
+    def eqn4_2(curr_one_minus_t_reduced, eqn4_2_constants, critical_density):
+        '''
+        Implement Equation 4.2 to solve liquid NOS density in kg / m^3.
+
+        Parameters
+        ----------
+        curr_one_minus_t_reduced: float
+            Equal to one minus the reduced temperature.
+        eqn4_2_constants: list of float
+            The constants related to this equation.
+        critical_density: float
+            The value of the critical density for nitrous oxide, a constant.
+
+        Returns
+        -------
+        float:
+            The result of the calculation.
+        '''
+        result = (critical_density *
+                  e**(eqn4_2_constants[0] *
+                      curr_one_minus_t_reduced**(1/3) + eqn4_2_constants[1] *
+                      curr_one_minus_t_reduced**(2/3) + eqn4_2_constants[2] *
+                      curr_one_minus_t_reduced + eqn4_2_constants[3] *
+                      curr_one_minus_t_reduced**(4/3)))
+        return result
+
+    @staticmethod
+    def eqn4_3(curr_recip_t_reduced_minus_one, eqn4_3_constants, critical_density):
+        '''
+        Implement Equation 4.3 to solve for vapour NOS density in kg / m^3.
+
+        Parameters
+        ----------
+        curr_recip_t_reduced_minus_one: float
+            Equal to the reciprocal of reduced temperature minus one.
+        eqn4_3_constants: list of float
+            The constants related to this equation.
+        critical_density: float
+            The value of the critical density for nitrous oxide, a constant.
+
+        Returns
+        -------
+        float:
+            The result of the calculation.
+        '''
+        result = (critical_density *
+                  e**(eqn4_3_constants[0] *
+                      curr_recip_t_reduced_minus_one**(1/3) + eqn4_3_constants[1] *
+                      curr_recip_t_reduced_minus_one**(2/3) + eqn4_3_constants[2] *
+                      curr_recip_t_reduced_minus_one + eqn4_3_constants[3] *
+                      curr_recip_t_reduced_minus_one**(4/3) + eqn4_3_constants[4] *
+                      curr_recip_t_reduced_minus_one**(5/3)))
+
+        return result
+
+    @staticmethod
+    def scaled_exp_of_cbrt_polynomial(base, coefficients, scale, out, work):
+        '''
+        Evaluate scale * e**(sum of coefficients[i] * base**((i + 1)/3)) in place.
+
+        The cube root of base is taken once and the polynomial in it is evaluated with
+        Horner's scheme, so no other temporary array is allocated.
+
+        Parameters
+        ----------
+        base: numpy.ndarray
+            The value raised to the powers of one third.
+        coefficients: list of float
+            The coefficient of each power of one third, starting with base**(1/3).
+        scale: float
+            The factor applied to the exponential.
+        out: numpy.ndarray
+            Where the result is written.
+        work: numpy.ndarray
+            A buffer of the same shape as out, overwritten with the cube root of base.
+
+        Returns
+        -------
+        numpy.ndarray:
+            out.
+        '''
+        cube_root = np.cbrt(base, out=work)
+
+        out.fill(coefficients[-1])
+        for coefficient in reversed(coefficients[:-1]):
+            out *= cube_root
+            out += coefficient
+        out *= cube_root
+
+        np.exp(out, out=out)
+        out *= scale
+        return out
+
+    @classmethod
+    def calculate_densities(cls, curr_one_minus_t_reduced, curr_recip_t_reduced_minus_one,
+                            eqn4_2_constants, eqn4_3_constants, critical_density,
+                            dtype=np.float64):
+        '''
+        Evaluate Equations 4.2 and 4.3 together to get liquid and vapour NOS densities.
+
+        This gives the same results as eqn4_2 and eqn4_3, but needs one cube root per sample
+        and equation instead of four or five powers, and only three arrays in total.
+
+        Parameters
+        ----------
+        curr_one_minus_t_reduced: numpy.ndarray
+            Equal to one minus the reduced temperature.
+        curr_recip_t_reduced_minus_one: numpy.ndarray
+            Equal to the reciprocal of reduced temperature minus one.
+        eqn4_2_constants: list of float
+            The constants related to Equation 4.2.
+        eqn4_3_constants: list of float
+            The constants related to Equation 4.3.
+        critical_density: float
+            The value of the critical density for nitrous oxide, a constant.
+        dtype: numpy.dtype
+            The precision the densities are calculated and returned in. Default is float64.
+
+        Returns
+        -------
+        tuple of numpy.ndarray:
+            The liquid and vapour densities, in kg / m^3.
+        '''
+        curr_one_minus_t_reduced = np.asarray(
+            curr_one_minus_t_reduced, dtype=dtype)
+        curr_recip_t_reduced_minus_one = np.asarray(
+            curr_recip_t_reduced_minus_one, dtype=dtype)
+
+        work = np.empty_like(curr_one_minus_t_reduced)
+        density_liquid = cls.scaled_exp_of_cbrt_polynomial(
+            curr_one_minus_t_reduced, eqn4_2_constants, critical_density,
+            np.empty_like(work), work)
+        density_gas = cls.scaled_exp_of_cbrt_polynomial(
+            curr_recip_t_reduced_minus_one, eqn4_3_constants, critical_density,
+            np.empty_like(work), work)
+
+        return density_liquid, density_gas
+
+    def key(self):
+        '''
+        Return the values the saturated properties depend on.
+
+        Returns
+        -------
+        tuple:
+            The key of the backend.
+        '''
+        options = self.consts_m.solver_options
+        nos_props = self.consts_m.nitrous_oxide_properties
+        return (('correlation',) +
+                VapourPressureCalculations.table_key(self.consts_m, DEFAULT_T_MIN_DEG_C,
+                                                     DEFAULT_T_MAX_DEG_C, DEFAULT_T_STEP_DEG_C) +
+                (float(nos_props['critical_density']),) +
+                tuple(float(const) for const in self.consts_m.equation_constants['eqn4_2']) +
+                tuple(float(const) for const in self.consts_m.equation_constants['eqn4_3']) +
+                (options['temperature_solver'], float(options['newton_tolerance_k']),
+                 int(options['newton_max_iterations'])))
+
+    def temperature_kelvin(self, tank_pressure_psia):
+        '''
+        Find the NOS temperature at each tank pressure.
+
+        Depending on the 'temperature_solver' solver option, this either interpolates the
+        vapour pressure table ('interp') or inverts Equation 4.1 directly ('newton').
+
+        Parameters
+        ----------
+        tank_pressure_psia: numpy.ndarray
+            The absolute tank pressures, in psi.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The temperature at each pressure, in kelvin.
+        '''
+        options = self.consts_m.solver_options
+        solver = options['temperature_solver']
+
+        if solver == 'interp':
+            return np.interp(tank_pressure_psia, self.vapour_pressure_data.pressure_psi,
+                             self.vapour_pressure_data.t_kelvin)
+        if solver == 'newton':
+            return VapourPressureCalculations.solve_temperature_kelvin(
+                np.asarray(tank_pressure_psia, dtype=float), self.consts_m,
+                options['newton_tolerance_k'], options['newton_max_iterations'])
+
+        raise ValueError(f'unknown temperature_solver: {solver}')
+
+    def saturation_properties(self, tank_pressure_psia, dtype=np.float64):
+        '''
+        Find the temperature, liquid density and vapour density at each tank pressure.
+
+        Parameters
+        ----------
+        tank_pressure_psia: numpy.ndarray
+            The absolute tank pressures, in psi.
+        dtype: numpy.dtype
+            The precision the densities are calculated and returned in. Default is float64.
+
+        Returns
+        -------
+        tuple of numpy.ndarray:
+            The temperature in kelvin, then the liquid and vapour densities in kg / m^3.
+        '''
+        nos_props = self.consts_m.nitrous_oxide_properties
+        t_kelvin = self.temperature_kelvin(tank_pressure_psia)
+        t_reduced = t_kelvin / nos_props['critical_temp']
+
+        density_liquid_kg_m3, gas_density_kg_m3 = \
+            self.calculate_densities(1 - t_reduced, (1 / t_reduced) - 1,
+                                     self.consts_m.equation_constants['eqn4_2'],
+                                     self.consts_m.equation_constants['eqn4_3'],
+                                     nos_props['critical_density'], dtype)
+        return t_kelvin, density_liquid_kg_m3, gas_density_kg_m3
+
+
+class SaturationTable:
+    '''
+    Saturated NOS properties tabulated against pressure, loaded from a CSV file.
+
+    The file has a header row naming the columns in SATURATION_TABLE_COLUMNS, in any order,
+    followed by one row per pressure.
+    '''
+
+    def __init__(self, pressure_psia, temperature_k, density_liquid_kg_m3,
+                 density_vapour_kg_m3):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        pressure_psia: numpy.ndarray
+            The absolute pressures of the table, in psi, strictly increasing.
+        temperature_k: numpy.ndarray
+            The saturation temperature at each pressure, in kelvin.
+        density_liquid_kg_m3: numpy.ndarray
+            The saturated liquid density at each pressure, in kg / m^3.
+        density_vapour_kg_m3: numpy.ndarray
+            The saturated vapour density at each pressure, in kg / m^3.
+        '''
+        self.pressure_psia = pressure_psia
+        self.temperature_k = temperature_k
+        self.density_liquid_kg_m3 = density_liquid_kg_m3
+        self.density_vapour_kg_m3 = density_vapour_kg_m3
+        self.key = None  # Identifies the file of a shared table
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Load a saturation table file into contiguous arrays sorted by pressure.
+
+        Parameters
+        ----------
+        path: str
+            The path of the CSV file.
+
+        Returns
+        -------
+        SaturationTable:
+            The loaded table.
+        '''
+        with open(path) as table_file:
+            header = [label.strip()
+                      for label in table_file.readline().split(',')]
+            missing = [
+                column for column in SATURATION_TABLE_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f'{path}: missing saturation table columns: ' +
+                                 ', '.join(missing))
+            data = np.loadtxt(table_file, delimiter=',', ndmin=2,
+                              usecols=[header.index(column)
+                                       for column in SATURATION_TABLE_COLUMNS])
+
+        data = data[np.argsort(data[:, 0], kind='stable')]
+        if len(data) < 2 or np.any(np.diff(data[:, 0]) <= 0):
+            raise ValueError(f'{path}: saturation table pressures must be distinct, ' +
+                             'with at least two rows')
+
+        return cls(*(np.ascontiguousarray(column) for column in data.T))
+
+    @classmethod
+    def shared(cls, path):
+        '''
+        Return the read-only table loaded in this process for a file, loading it if needed.
+
+        The file is loaded again if it was modified since.
+
+        Parameters
+        ----------
+        path: str
+            The path of the CSV file.
+
+        Returns
+        -------
+        SaturationTable:
+            The shared table. Its arrays must not be modified.
+        '''
+        stat = os.stat(path)
+        key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+        table = _shared_saturation_tables.get(key)
+        if table is None:
+            table = cls.load(path)
+            table.key = key
+            for column in SATURATION_TABLE_COLUMNS:
+                getattr(table, column).flags.writeable = False
+            _shared_saturation_tables[key] = table
+        return table
+
+
+@register_eos_backend('tabulated')
+class TabulatedEOS:
+    '''
+    Saturated NOS properties interpolated from the table file in the 'eos_table_path' solver
+    option. Pressures beyond the table are clamped to it.
+    '''
+
+    def __init__(self, consts_m):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        consts_m: constants.ConstantsManager
+            The constants manager that contains all of the constants loaded from file.
+        '''
+        table_path = consts_m.solver_options['eos_table_path']
+        if not table_path:
+            raise ValueError(
+                'the tabulated eos_backend needs an eos_table_path')
+
+        self.consts_m = consts_m
+        self.table = SaturationTable.shared(table_path)
+
+        self.p_min_psi = self.table.pressure_psia[0]
+        self.p_max_psi = self.table.pressure_psia[-1]
+        self.nodes_psi = self.table.pressure_psia
+
+    def key(self):
+        '''
+        Return the values the saturated properties depend on.
+
+        Returns
+        -------
+        tuple:
+            The key of the backend.
+        '''
+        return ('tabulated',) + self.table.key
+
+    def temperature_kelvin(self, tank_pressure_psia):
+        '''
+        Interpolate the NOS temperature at each tank pressure.
+
+        Parameters
+        ----------
+        tank_pressure_psia: numpy.ndarray
+            The absolute tank pressures, in psi.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The temperature at each pressure, in kelvin.
+        '''
+        return np.interp(tank_pressure_psia, self.table.pressure_psia, self.table.temperature_k)
+
+    def saturation_properties(self, tank_pressure_psia, dtype=np.float64):
+        '''
+        Interpolate the temperature, liquid density and vapour density at each tank pressure.
+
+        Parameters
+        ----------
+        tank_pressure_psia: numpy.ndarray
+            The absolute tank pressures, in psi.
+        dtype: numpy.dtype
+            The precision the densities are returned in. Default is float64.
+
+        Returns
+        -------
+        tuple of numpy.ndarray:
+            The temperature in kelvin, then the liquid and vapour densities in kg / m^3.
+        '''
+        table = self.table
+        return (self.temperature_kelvin(tank_pressure_psia),
+                np.interp(tank_pressure_psia, table.pressure_psia,
+                          table.density_liquid_kg_m3).astype(dtype, copy=False),
+                np.interp(tank_pressure_psia, table.pressure_psia,
+                          table.density_vapour_kg_m3).astype(dtype, copy=False))
@@ -0,0 +1,197 @@
+'''
+Calculate the NOS masses and CGs of a DAQ file while it is still being recorded.
+
+The file is followed with csv_extractor.CSVTail: each time new rows are appended, only those
+rows are parsed and run through the stages up to engine_CG, which all calculate each data point
+on its own. The fuel mass, and with it the propellant mass and CG, also depends on the end of
+burn: the rows are provisional until the data point at the end of burn is recorded.
+'''
+import time
+from collections import deque
+
+import numpy as np
+
+from constants import ConstantsManager
+from csv_extractor import CSVTail
+from DAQ_raw import DAQRaw
+from pipeline import Pipeline
+
+# Columns calculated for each row, by stage and attribute. The time of each data point always
+# comes first.
+LIVE_COLUMNS = (
+    ('NOS_mass_and_volume', 'NOS_mass_kg'),
+    ('NOS_liquid_CG', 'liquid_cg_in'),
+    ('NOS_vapour_CG', 'vapour_cg_in'),
+    ('engine_CG', 'NOS_CG_in'),
+    ('engine_CG', 'propellant_mass_lb'),
+    ('engine_CG', 'propellant_CG_in'),
+)
+
+# Most rows calculated in one batch, which bounds how long a batch takes when a lot of rows
+# were appended at once
+DEFAULT_MAX_BATCH_ROWS = 4096
+DEFAULT_POLL_INTERVAL_S = 0.1
+# Number of most recent batches the latency statistics are taken over
+LATENCY_WINDOW = 1000
+
+
+class LiveCalculation:
+    '''
+    Follow a growing DAQ file, and calculate the rows appended to it batch by batch.
+
+    For example:
+
+        live = LiveCalculation('static_fire.csv')
+        live.follow(lambda batch: print(batch['NOS_mass_kg']), idle_timeout_s=10)
+        print(live.latency_stats())
+    '''
+
+    def __init__(self, data_file_path, i_constants=None, max_batch_rows=DEFAULT_MAX_BATCH_ROWS):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        data_file_path: str
+            The path of the DAQ file being recorded.
+        i_constants: constants.ConstantsManager
+            The constants used by every stage. Default is None, in which case a default object
+            will be created.
+        max_batch_rows: int
+            The most rows calculated in one batch. Default is DEFAULT_MAX_BATCH_ROWS.
+        '''
+        if i_constants is None:
+            self.consts_m = ConstantsManager()
+        else:
+            self.consts_m = i_constants
+
+        self.tail = CSVTail(data_file_path, max_batch_rows)
+        self.end_of_burn_s = self.consts_m.test_conditions['end_of_burn']
+
+        # Time of the first data point, and index of the data point at the end of burn once it
+        # is recorded
+        self.start_time_s = None
+        self.end_of_burn_index = None
+        self.n_rows = 0
+        self.n_batches = 0
+        # Seconds taken by the most recent batches, from reading their rows to calculating them
+        self.latencies_s = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def burn_closed(self):
+        '''Whether the data point at the end of burn is recorded.'''
+        return self.end_of_burn_index is not None
+
+    def poll(self):
+        '''
+        Calculate the rows appended to the file since the last poll, if any.
+
+        Returns
+        -------
+        dict:
+            The batch: the index of its first row in the file ('first_row'), the time column
+            and every column of LIVE_COLUMNS by attribute name, whether its values are
+            provisional, and how many seconds it took ('latency_s'). None if no complete row
+            was appended.
+        '''
+        start = time.perf_counter()
+        columns = self.tail.read_new_columns()
+        if columns is None:
+            return None
+
+        DAQ_data = DAQRaw(*columns, self.consts_m.test_conditions)
+        if self.start_time_s is None:
+            self.start_time_s = DAQ_data.start_time_s
+        DAQ_data.start_time_s = self.start_time_s
+
+        if self.end_of_burn_index is None:
+            matches = np.flatnonzero(DAQ_data.time_s == self.end_of_burn_s)
+            if len(matches):
+                self.end_of_burn_index = self.n_rows + int(matches[0])
+        # engine_CG does not look the end of burn up in a batch it is not part of; until it is
+        # recorded, -1 stands for its index
+        DAQ_data.end_of_burn_index = -1 if self.end_of_burn_index is None \
+            else self.end_of_burn_index
+
+        calculation = Pipeline(DAQ_data, self.consts_m)
+        batch = {'first_row': self.n_rows, 'time_s': DAQ_data.time_s}
+        for stage_name, column in LIVE_COLUMNS:
+            batch[column] = getattr(calculation[stage_name], column)
+        batch['provisional'] = not self.burn_closed
+
+        self.n_rows += DAQ_data.data_size
+        self.n_batches += 1
+        batch['latency_s'] = time.perf_counter() - start
+        self.latencies_s.append(batch['latency_s'])
+        return batch
+
+    def follow(self, on_batch, poll_interval_s=DEFAULT_POLL_INTERVAL_S, idle_timeout_s=None):
+        '''
+        Poll the file until nothing is appended to it for a while.
+
+        A row is calculated at most poll_interval_s plus the latency of its batch after it is
+        written.
+
+        Parameters
+        ----------
+        on_batch: callable
+            Called with each batch, as returned by poll.
+        poll_interval_s: float
+            How long to wait before polling again once every appended row is calculated.
+            Default is DEFAULT_POLL_INTERVAL_S.
+        idle_timeout_s: float
+            How long nothing has to be appended to the file for this to return. Default is
+            None, in which case the file is followed until interrupted.
+        '''
+        last_batch_time = time.monotonic()
+        while True:
+            batch = self.poll()
+            if batch is not None:
+                on_batch(batch)
+                last_batch_time = time.monotonic()
+                continue
+
+            if idle_timeout_s is not None and \
+                    time.monotonic() - last_batch_time >= idle_timeout_s:
+                return
+            time.sleep(poll_interval_s)
+
+    def latency_stats(self):
+        '''
+        Summarize how long the most recent batches took.
+
+        Returns
+        -------
+        dict:
+            The number of batches and rows calculated so far, and the mean, median, 95th
+            percentile and largest latency of the last LATENCY_WINDOW batches, in s.
+        '''
+        stats = {'batches': self.n_batches, 'rows': self.n_rows}
+        if self.latencies_s:
+            latencies_s = np.array(self.latencies_s)
+            stats.update(mean_s=float(latencies_s.mean()),
+                         p50_s=float(np.percentile(latencies_s, 50)),
+                         p95_s=float(np.percentile(latencies_s, 95)),
+                         max_s=float(latencies_s.max()))
+        return stats
+
+
+def write_batch(file, batch, header=False):
+    '''
+    Write the rows of a batch as csv, with a last column set to 1 for provisional rows.
+
+    Parameters
+    ----------
+    file: file object
+        Where the csv is written.
+    batch: dict
+        The batch, as returned by LiveCalculation.poll.
+    header: bool
+        Whether the header row is written first. Default to false.
+    '''
+    columns = ('time_s',) + tuple(column for _, column in LIVE_COLUMNS)
+    if header:
+        file.write(','.join(columns + ('provisional',)) + '\n')
+    provisional = '1' if batch['provisional'] else '0'
+    for row in zip(*(batch[column].tolist() for column in columns)):
+        file.write(','.join(map(str, row)) + ',' + provisional + '\n')
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+from contextlib import nullcontext
+
+# Path standing for stdout as the target
+STDIO_PATH = '-'
+
+
+def parse_args(argv):
+    '''
+    Parse the command line arguments.
+
+    Parameters
+    ----------
+    argv: list of str
+        The arguments, without the program name.
+
+    Returns
+    -------
+    argparse.Namespace:
+        The parsed arguments.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Follow a DAQ csv file while it is being recorded, and write the NOS mass '
+                    'and CGs of each new row as csv as soon as it is written. Rows calculated '
+                    'before the end of burn is recorded are marked as provisional.')
+    parser.add_argument(
+        'input', help='DAQ csv file, which does not have to exist yet')
+    parser.add_argument('output', nargs='?', default=STDIO_PATH,
+                        help='where the csv is written, or - for stdout (default: -)')
+    parser.add_argument('-c', '--constants', help='constants yaml file (default: '
+                                                  'constant_config.yaml)')
+    parser.add_argument('--poll-interval', type=float, default=0.1,
+                        help='seconds between polls of the input once it is caught up '
+                             '(default: 0.1)')
+    parser.add_argument('--idle-timeout', type=float,
+                        help='stop once nothing was appended to the input for this many '
+                             'seconds (default: follow until interrupted)')
+    parser.add_argument('--max-batch-rows', type=int, default=4096,
+                        help='most rows calculated at once (default: 4096)')
+    parser.add_argument('--stats', action='store_true',
+                        help='print the batch latency statistics to stderr when stopping')
+
+    args = parser.parse_args(argv)
+    if args.poll_interval <= 0:
+        parser.error('--poll-interval must be positive')
+    if args.max_batch_rows < 1:
+        parser.error('--max-batch-rows must be at least 1')
+    return args
+
+
+def main(argv=None):
+    '''
+    Run a live calculation from the command line.
+
+    Parameters
+    ----------
+    argv: list of str
+        The arguments, without the program name. Default is None, in which case sys.argv
+        is used.
+
+    Returns
+    -------
+    int:
+        The exit status.
+    '''
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parse_args(argv)
+
+    from constants import ConstantsManager
+    from live_calculation import LiveCalculation, write_batch
+
+    constants = ConstantsManager(args.constants) if args.constants else None
+    live = LiveCalculation(args.input, constants, args.max_batch_rows)
+
+    if args.output == STDIO_PATH:
+        output = nullcontext(sys.stdout)
+    else:
+        output = open(args.output, 'w')
+
+    status = 0
+    with output as file:
+        def on_batch(batch):
+            write_batch(file, batch, header=batch['first_row'] == 0)
+            file.flush()
+
+        try:
+            live.follow(on_batch, args.poll_interval, args.idle_timeout)
+        except KeyboardInterrupt:
+            pass
+        except BrokenPipeError:
+            # Whatever read stdout stopped early. stdout is pointed at devnull so that
+            # flushing it at exit does not fail again.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            status = 1
+
+    if args.stats:
+        stats = live.latency_stats()
+        print(', '.join(f'{name}: {value:.6g}' for name, value in stats.items()),
+              file=sys.stderr)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
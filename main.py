@@ -1,23 +1,192 @@
-from calculator_main import execute_calculation
+import argparse
+import json
+import os
+import sys
+from contextlib import nullcontext
 
-if __name__ == '__main__':
+DEFAULT_TARGET_PATH = 'outputxml.txt'
+
+
+def prompt_for_paths():
+    '''
+    Ask for the DAQ data and target paths on the console.
+
+    Returns
+    -------
+    tuple of str:
+        The DAQ data path and the target path.
+    '''
+    print('Please enter the filepath of the raw DAQ data to be used')
+    daq_path = input()
+
+    print('Please enter the filepath to which the xml will be saved')
+    target_path = input()
+    if target_path == '':
+        target_path = DEFAULT_TARGET_PATH
+
+    return daq_path, target_path
+
+
+def parse_args(argv):
+    '''
+    Parse the command line arguments.
+
+    Parameters
+    ----------
+    argv: list of str
+        The arguments, without the program name.
+
+    Returns
+    -------
+    argparse.Namespace:
+        The parsed arguments.
+    '''
+    from calculator_main import STAGES
+
+    parser = argparse.ArgumentParser(
+        description='Calculate the engine CG and mass over a static fire test, and save them '
+                    'as XML. Without any argument, the paths are asked for interactively.')
+    parser.add_argument(
+        'input', help='DAQ csv file, or - to read it from stdin')
+    parser.add_argument('output', nargs='?', default=DEFAULT_TARGET_PATH,
+                        help='where the output is saved, or - to write it to stdout '
+                             f'(default: {DEFAULT_TARGET_PATH})')
+    parser.add_argument('-c', '--constants', help='constants yaml file (default: '
+                                                  'constant_config.yaml)')
+    parser.add_argument('--downsample', type=int, default=1,
+                        help='only use every DOWNSAMPLE-th data row (default: 1)')
+    parser.add_argument('--t-start', type=float,
+                        help='only use the data at or after this time, in s')
+    parser.add_argument('--t-end', type=float,
+                        help='only use the data at or before this time, in s')
+    parser.add_argument('--stop-after', choices=STAGES, default=STAGES[-1],
+                        help='last stage calculated; stages before engine_XML save their '
+                             'columns as csv (default: engine_XML)')
+    parser.add_argument('--cache', action='store_true',
+                        help='cache the parsed DAQ data next to the input file')
+    parser.add_argument('--no-stage-cache', action='store_true',
+                        help='calculate every stage, instead of loading those whose inputs '
+                             'and constants did not change from the stage cache; unrelated '
+                             'to --cache, which only caches the parsed DAQ data')
+    parser.add_argument('--stage-cache-dir',
+                        help='directory of the stage cache (default: ~/.cache/rse_calculator/'
+                             'stages)')
+    parser.add_argument('--chunk-rows', type=int,
+                        help='calculate CHUNK_ROWS data rows at a time, so that the memory used '
+                             'does not depend on the length of the input; the input cannot be '
+                             'stdin, and neither cache is used')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='save the wall time, CPU time, peak allocated memory and array '
+                             'sizes of each stage as json to FILE, or - to print them to '
+                             'stderr; stages loaded from the stage cache are measured '
+                             'loading, use --no-stage-cache to measure their calculation')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='do not print a message once the calculation is done')
+
+    args = parser.parse_args(argv)
+    if args.downsample < 1:
+        parser.error('--downsample must be at least 1')
+    if args.chunk_rows is not None:
+        if args.chunk_rows < 1:
+            parser.error('--chunk-rows must be at least 1')
+        if args.input == '-':
+            parser.error('--chunk-rows cannot read the input from stdin')
+    return args
+
+
+def main(argv=None):
+    '''
+    Run a calculation from the command line.
+
+    Parameters
+    ----------
+    argv: list of str
+        The arguments, without the program name. Default is None, in which case sys.argv
+        is used.
 
-    # In case someone wants to hard-code a value into this in the future
-    DAQ_PATH = None
-    TARGET_PATH = None
+    Returns
+    -------
+    int:
+        The exit status.
+    '''
+    if argv is None:
+        argv = sys.argv[1:]
 
-    if DAQ_PATH is None:
-        print('Please enter the filepath of the raw DAQ data to be used')
-        daq_path = input()
+    if not argv:
+        daq_path, target_path = prompt_for_paths()
+
+        # Imported once the paths are known, so that the prompts show up without waiting for
+        # numpy
+        from calculator_main import execute_calculation
+
+        execute_calculation(daq_path, target_path)
+        return 0
+
+    args = parse_args(argv)
+
+    profiler = nullcontext()
+    if args.profile:
+        from profiling import StageProfiler
+        profiler = StageProfiler()
+
+    try:
+        with profiler:
+            run_calculation(args)
+    except BrokenPipeError:
+        # Whatever read stdout stopped early (e.g. `| head`). stdout is pointed at devnull so
+        # that flushing it at exit does not fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+    if args.profile:
+        write_profile(profiler.report(), args.profile)
+    return 0
+
+
+def run_calculation(args):
+    '''
+    Run the calculation asked for on the command line.
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        The parsed arguments.
+    '''
+    from calculator_main import execute_calculation, execute_chunked_calculation
+
+    if args.chunk_rows is not None:
+        execute_chunked_calculation(args.input, args.output, args.constants,
+                                    suppress_printout=args.quiet, chunk_rows=args.chunk_rows,
+                                    downsample=args.downsample, t_start=args.t_start,
+                                    t_end=args.t_end, stop_after=args.stop_after)
     else:
-        daq_path = DAQ_PATH
+        execute_calculation(args.input, args.output, args.constants,
+                            suppress_printout=args.quiet, use_cache=args.cache,
+                            downsample=args.downsample, t_start=args.t_start,
+                            t_end=args.t_end, stop_after=args.stop_after,
+                            use_stage_cache=not args.no_stage_cache,
+                            stage_cache_dir=args.stage_cache_dir)
+
 
-    if TARGET_PATH is None:
-        print('Please enter the filepath to which the xml will be saved')
-        target_path = input()
-        if target_path == '':
-            target_path = 'outputxml.txt'
+def write_profile(report, profile_path):
+    '''
+    Save the profile of a calculation as json.
+
+    Parameters
+    ----------
+    report: dict
+        The profile, as returned by profiling.StageProfiler.report.
+    profile_path: str
+        The path of the json file, or - to print it to stderr.
+    '''
+    if profile_path == '-':
+        json.dump(report, sys.stderr, indent=2)
+        sys.stderr.write('\n')
     else:
-        target_path = TARGET_PATH
+        with open(profile_path, 'w') as profile_file:
+            json.dump(report, profile_file, indent=2)
+            profile_file.write('\n')
+
 
-    execute_calculation(daq_path, target_path)
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,401 @@
+'''
+The calculation as a graph of named stages.
+
+Each stage declares the stages it is calculated from and the constants fields it reads. A
+Pipeline calculates a stage only when it is asked for, together with the stages it needs that
+have not been calculated yet, and keeps every stage it calculated for later requests. Given a
+stage_cache.StageCache, it also loads the stages whose inputs did not change from disk instead.
+'''
+import os
+
+import profiling
+
+# Stages by name, in the order they were registered. A stage is always registered after its
+# inputs, so this order is also an order in which they can all be calculated.
+STAGE_DEFINITIONS = {}
+
+
+class Stage:
+    '''
+    One step of the calculation.
+    '''
+
+    def __init__(self, name, inputs, constants_fields, build, key_values=None):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        name: str
+            The name the stage is asked for by.
+        inputs: tuple of str
+            The names of the stages its object is calculated from.
+        constants_fields: tuple of str
+            The ConstantsManager fields the stage reads, e.g. 'tank_dimensions_meters'.
+        build: function
+            Called with the constants and then the object of each input, in order, and returns
+            the object of the stage. None for a stage whose object is given to the Pipeline.
+        key_values: function
+            Called with the constants, and returns any value the object depends on besides its
+            inputs and constants fields, such as the state of a file it reads. Default is None.
+        '''
+        self.name = name
+        self.inputs = inputs
+        self.constants_fields = constants_fields
+        self.build = build
+        self.key_values = key_values
+
+
+def register_stage(name, inputs=(), constants_fields=(), key_values=None):
+    '''
+    Register a function building the object of a stage.
+
+    Parameters
+    ----------
+    name: str
+        The name of the stage.
+    inputs: tuple of str
+        The names of the stages it is calculated from, all already registered.
+    constants_fields: tuple of str
+        The ConstantsManager fields the stage reads.
+    key_values: function
+        Returns the other values the stage depends on, see Stage. Default is None.
+    '''
+    for input_name in inputs:
+        if input_name not in STAGE_DEFINITIONS:
+            raise ValueError(f'stage {name} needs unknown stage {input_name}')
+
+    def register(build):
+        STAGE_DEFINITIONS[name] = Stage(name, tuple(inputs), tuple(constants_fields), build,
+                                        key_values)
+        return build
+    return register
+
+
+# The stage classes are imported by the build functions rather than at the top, so that
+# importing this module does not import numpy with them
+
+register_stage('DAQ_raw')(None)
+
+
+def eos_table_state(constants):
+    '''Return the path, size and modification time of the saturation table in use, if any.'''
+    options = constants.solver_options
+    if options['eos_backend'] != 'tabulated' or not options['eos_table_path']:
+        return None
+    stat = os.stat(options['eos_table_path'])
+    return [os.path.realpath(options['eos_table_path']), stat.st_size, stat.st_mtime_ns]
+
+
+@register_stage('DAQ_pressure_to_density', inputs=('DAQ_raw',),
+                constants_fields=('nitrous_oxide_properties', 'equation_constants',
+                                  'solver_options'),
+                key_values=eos_table_state)
+def build_pressure_to_density(constants, DAQ_data):
+    '''Calculate the NOS temperature and densities from the tank pressure.'''
+    from DAQ_pressure_to_density import DAQPressureToDensity
+    return DAQPressureToDensity(DAQ_data, i_constants=constants)
+
+
+@register_stage('NOS_mass_and_volume', inputs=('DAQ_raw', 'DAQ_pressure_to_density'),
+                constants_fields=('tank_dimensions_meters',))
+def build_NOS_mass_and_volume(constants, DAQ_data, pressure_to_density):
+    '''Split the NOS mass and tank volume between liquid and vapour.'''
+    from NOS_mass_and_volume import NOSMassAndVolume
+    return NOSMassAndVolume(DAQ_data, i_constants=constants,
+                            i_pressure_to_density=pressure_to_density)
+
+
+@register_stage('NOS_liquid_CG', inputs=('NOS_mass_and_volume',),
+                constants_fields=('tank_dimensions_meters',))
+def build_NOS_liquid_CG(constants, NOS_mass_volume):
+    '''Calculate the height, mass and CG of the liquid NOS.'''
+    from NOS_liquid_CG import NOSLiquidCG
+    return NOSLiquidCG(NOS_mass_volume, i_constants=constants)
+
+
+@register_stage('NOS_vapour_CG', inputs=('NOS_mass_and_volume', 'NOS_liquid_CG'),
+                constants_fields=('tank_dimensions_meters',))
+def build_NOS_vapour_CG(constants, NOS_mass_volume, NOS_liquid_CG):
+    '''Calculate the height, mass and CG of the vapour NOS.'''
+    from NOS_vapour_CG import NOSVapourCG
+    return NOSVapourCG(NOS_mass_volume, NOS_liquid_CG, i_constants=constants)
+
+
+@register_stage('engine_CG', inputs=('DAQ_raw', 'NOS_vapour_CG', 'NOS_liquid_CG'),
+                constants_fields=('engine_info', 'test_conditions'))
+def build_engine_CG(constants, DAQ_data, NOS_vapour_CG, NOS_liquid_CG):
+    '''Calculate the NOS, fuel and propellant masses and CGs.'''
+    from engine_CG import EngineCG
+    return EngineCG(DAQ_data, NOS_vapour_CG, NOS_liquid_CG, i_constants=constants)
+
+
+@register_stage('engine_XML', inputs=('DAQ_raw', 'engine_CG'),
+                constants_fields=('engine_info', 'tank_dimensions_meters'))
+def build_engine_XML(constants, DAQ_data, engine_CG):
+    '''Format the engine CG and masses as XML tags.'''
+    from engine_XML import EngineXML
+    return EngineXML(DAQ_data, engine_CG, i_constants=constants)
+
+
+# Every stage, in an order in which they can be calculated
+STAGES = tuple(STAGE_DEFINITIONS)
+
+
+class Pipeline:
+    '''
+    Calculate the stages for one set of DAQ data and constants on demand, each at most once.
+    '''
+
+    def __init__(self, DAQ_data, i_constants=None, cache=None):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        DAQ_data: DAQRaw
+            The data the calculation is run on.
+        i_constants: constants.ConstantsManager
+            The constants used by every stage. Default is None, in which case a default object
+            will be imported and created.
+        cache: stage_cache.StageCache
+            Where the stages are saved once calculated, and loaded from when they were
+            calculated from the same inputs before. Default is None, in which case every stage
+            is calculated.
+        '''
+        if i_constants is None:
+            from constants import ConstantsManager as CM
+            self.consts_m = CM()
+        else:
+            self.consts_m = i_constants
+
+        # Object of each stage calculated so far
+        self.outputs = {'DAQ_raw': DAQ_data}
+        # Names of the stages calculated by this pipeline, in the order they were calculated
+        self.calculated = []
+
+        self.cache = cache
+        # Cache key of each stage whose key was computed
+        self.keys = {}
+        # Names of the stages loaded from the cache, in the order they were loaded
+        self.loaded = []
+
+    def plan(self, name):
+        '''
+        List the stages that still need to be calculated before a stage can be returned.
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage.
+
+        Returns
+        -------
+        list of str:
+            The stages not calculated yet that the stage needs, including itself if it is not
+            calculated yet, in the order they would be calculated.
+        '''
+        if name not in STAGE_DEFINITIONS:
+            raise ValueError(f'unknown stage: {name}')
+
+        order = []
+        pending = [(name, False)]
+        while pending:
+            stage_name, inputs_listed = pending.pop()
+            if stage_name in self.outputs or stage_name in order:
+                continue
+            if inputs_listed:
+                order.append(stage_name)
+                continue
+            pending.append((stage_name, True))
+            for input_name in reversed(STAGE_DEFINITIONS[stage_name].inputs):
+                pending.append((input_name, False))
+        return order
+
+    def calculate_stage(self, name):
+        '''
+        Calculate a stage whose inputs are all calculated, and keep its object.
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage.
+
+        Returns
+        -------
+        object:
+            The object of the stage.
+        '''
+        stage = STAGE_DEFINITIONS[name]
+        if stage.build is None:
+            raise ValueError(
+                f'stage {name} is not calculated, and must be given')
+
+        output = None
+        with profiling.measure(name):
+            if self.cache is not None:
+                key = self.stage_key(name)
+                output = self.cache.load(key, {reference: value for value, reference
+                                               in self.cache_references().values()})
+            calculated = output is None
+            if calculated:
+                output = stage.build(self.consts_m,
+                                     *(self.outputs[input_name] for input_name in stage.inputs))
+                self.calculated.append(name)
+            else:
+                self.loaded.append(name)
+        profiling.record_output(name, output)
+
+        if calculated and self.cache is not None:
+            # Measured on its own, so that the stage only measures its calculation
+            with profiling.measure('stage_cache_save'):
+                self.cache.save(key, output,
+                                {object_id: reference for object_id, (_, reference)
+                                 in self.cache_references().items()})
+
+        self.outputs[name] = output
+        return output
+
+    def invalidate(self, names):
+        '''
+        Forget the objects of some stages and of every stage calculated from them.
+
+        The objects of stages given to the pipeline, such as DAQ_raw, are kept: they are
+        replaced with set_data instead.
+
+        Parameters
+        ----------
+        names: list of str
+            The names of the stages whose inputs changed.
+
+        Returns
+        -------
+        list of str:
+            The names of the stages that had been calculated and were forgotten, in the order
+            they can be calculated again.
+        '''
+        stale = set(names)
+        for name in STAGES:
+            if stale.intersection(STAGE_DEFINITIONS[name].inputs):
+                stale.add(name)
+
+        forgotten = []
+        for name in STAGES:
+            if name in stale:
+                self.keys.pop(name, None)
+                if STAGE_DEFINITIONS[name].build is not None and name in self.outputs:
+                    del self.outputs[name]
+                    forgotten.append(name)
+        return forgotten
+
+    def set_data(self, DAQ_data):
+        '''
+        Replace the DAQ data, forgetting every stage calculated from it.
+
+        Parameters
+        ----------
+        DAQ_data: DAQRaw
+            The new data.
+
+        Returns
+        -------
+        list of str:
+            The names of the stages that were forgotten.
+        '''
+        self.outputs['DAQ_raw'] = DAQ_data
+        return self.invalidate(['DAQ_raw'])
+
+    def set_constants(self, i_constants):
+        '''
+        Replace the constants, forgetting only the stages that read a field that changed.
+
+        A field is considered changed when the new manager does not share it with the current
+        one, as with the managers returned by ConstantsManager.with_overrides.
+
+        Parameters
+        ----------
+        i_constants: constants.ConstantsManager
+            The new constants.
+
+        Returns
+        -------
+        list of str:
+            The names of the stages that were forgotten.
+        '''
+        changed = {field for stage in STAGE_DEFINITIONS.values()
+                   for field in stage.constants_fields
+                   if getattr(self.consts_m, field) is not getattr(i_constants, field)}
+        self.consts_m = i_constants
+        return self.invalidate([name for name, stage in STAGE_DEFINITIONS.items()
+                                if changed.intersection(stage.constants_fields)])
+
+    def cache_references(self):
+        '''
+        List the objects that cached stages refer to rather than contain.
+
+        Returns
+        -------
+        dict:
+            The object and the reference it is saved under, by the id of the object.
+        '''
+        references = {id(output): (output, ('stage', name))
+                      for name, output in self.outputs.items()}
+        references[id(self.consts_m)] = (self.consts_m, ('constants',))
+        return references
+
+    def stage_key(self, name):
+        '''
+        Return the cache key of a stage, computed from its inputs and the constants it reads.
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage.
+
+        Returns
+        -------
+        str:
+            The key.
+        '''
+        from stage_cache import data_digest, stage_key
+
+        if name not in self.keys:
+            stage = STAGE_DEFINITIONS[name]
+            if stage.build is None:
+                self.keys[name] = data_digest(self.outputs[name])
+            else:
+                values = {field: getattr(self.consts_m, field)
+                          for field in stage.constants_fields}
+                if stage.key_values is not None:
+                    values[''] = stage.key_values(self.consts_m)
+                self.keys[name] = stage_key(name, values,
+                                            [self.stage_key(input_name)
+                                             for input_name in stage.inputs])
+        return self.keys[name]
+
+    def get(self, name):
+        '''
+        Return the object of a stage, or one of its attributes, calculating what is missing.
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage, e.g. 'engine_CG', optionally followed by a dot and the name
+            of an attribute of its object, e.g. 'engine_CG.propellant_CG_in'.
+
+        Returns
+        -------
+        object:
+            The object of the stage, or its attribute.
+        '''
+        stage_name, _, attribute = name.partition('.')
+        for missing_name in self.plan(stage_name):
+            self.calculate_stage(missing_name)
+
+        output = self.outputs[stage_name]
+        if attribute:
+            return getattr(output, attribute)
+        return output
+
+    def __getitem__(self, name):
+        return self.get(name)
@@ -0,0 +1,257 @@
+'''
+Measure where the time and memory of a calculation go, stage by stage.
+
+The calculation marks each of its stages with measure and record_output. Those do nothing
+unless a StageProfiler is active, so a calculation that is not profiled pays for one global
+lookup per stage. For example:
+
+    with StageProfiler() as profiler:
+        execute_calculation('static_fire.csv', 'output.xml')
+    print(profiler.report())
+'''
+import time
+from contextlib import contextmanager, nullcontext
+
+# The profiler measuring the stages, None when nothing is measured
+_active_profiler = None
+_NOT_MEASURED = nullcontext()
+
+
+def measure(name):
+    '''
+    Return a context manager measuring a stage with the active profiler, if there is one.
+
+    Parameters
+    ----------
+    name: str
+        The name of the stage.
+    '''
+    if _active_profiler is None:
+        return _NOT_MEASURED
+    return _active_profiler.measure(name)
+
+
+def record_output(name, output):
+    '''
+    Record the size of the arrays calculated by a stage, if a profiler is active.
+
+    Parameters
+    ----------
+    name: str
+        The name of the stage.
+    output: object
+        The object calculated by the stage, or a list of arrays.
+    '''
+    if _active_profiler is not None:
+        _active_profiler.record_output(name, output)
+
+
+def array_sizes(output):
+    '''
+    Count the numpy arrays held by an object, and the bytes they take.
+
+    Parameters
+    ----------
+    output: object
+        An array, a list or tuple of arrays, or an object whose attributes are arrays.
+
+    Returns
+    -------
+    tuple of int:
+        The number of arrays and their total size in bytes.
+    '''
+    if isinstance(output, (list, tuple)):
+        values = output
+    elif hasattr(output, 'nbytes'):
+        values = [output]
+    else:
+        values = vars(output).values() if hasattr(output, '__dict__') else []
+
+    arrays = [value for value in values
+              if hasattr(value, 'nbytes') and hasattr(value, 'dtype')]
+    return len(arrays), sum(int(array.nbytes) for array in arrays)
+
+
+class StageProfiler:
+    '''
+    Record the wall time, CPU time, peak allocated bytes and array sizes of each stage.
+
+    Memory is traced with tracemalloc, which slows the calculation down while it is active.
+    A stage measured while another one is, such as the vapour pressure table built by
+    DAQ_pressure_to_density, is reported on its own and also counted in the enclosing stage.
+    '''
+
+    def __init__(self, trace_memory=True):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        trace_memory: bool
+            Whether the peak allocated bytes are traced. Default to true.
+        '''
+        self.trace_memory = trace_memory
+        # Measurements of each stage, in the order the stages started
+        self.records = []
+        # Measurements of the stages running, innermost last
+        self.stack = []
+        self.started_tracing = False
+        self.start_wall = None
+        self.start_cpu = None
+        self.wall_s = None
+        self.cpu_s = None
+        self.peak_bytes = None
+
+    def __enter__(self):
+        global _active_profiler
+        if _active_profiler is not None:
+            raise RuntimeError('another profiler is already active')
+
+        if self.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+            # Frame of the whole run, which only tracks its peak
+            current = tracemalloc.get_traced_memory()[0]
+            self.stack.append({'start_bytes': current, 'peak': current})
+
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        _active_profiler = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active_profiler
+        _active_profiler = None
+        self.wall_s = time.perf_counter() - self.start_wall
+        self.cpu_s = time.process_time() - self.start_cpu
+
+        if self.trace_memory:
+            import tracemalloc
+            whole_run = self.stack.pop()
+            whole_run['peak'] = max(
+                whole_run['peak'], tracemalloc.get_traced_memory()[1])
+            self.peak_bytes = whole_run['peak'] - whole_run['start_bytes']
+            if self.started_tracing:
+                tracemalloc.stop()
+                self.started_tracing = False
+
+    @contextmanager
+    def measure(self, name):
+        '''
+        Measure the stage run inside the context.
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage.
+        '''
+        # The depth is the number of enclosing stages being measured
+        record = {'name': name, 'depth': sum('record' in frame for frame in self.stack),
+                  'wall_s': None, 'cpu_s': None, 'peak_bytes': None, 'arrays': None,
+                  'array_bytes': None}
+        self.records.append(record)
+
+        frame = {'record': record}
+        if self.trace_memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak is reset for this stage, so the enclosing one keeps its own peak so far
+            if self.stack:
+                self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame.update(start_bytes=current, peak=current)
+        self.stack.append(frame)
+
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - start_wall
+            record['cpu_s'] = time.process_time() - start_cpu
+            self.stack.pop()
+
+            if self.trace_memory:
+                frame['peak'] = max(
+                    frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = frame['peak'] - frame['start_bytes']
+                if self.stack:
+                    self.stack[-1]['peak'] = max(self.stack[-1]
+                                                 ['peak'], frame['peak'])
+                tracemalloc.reset_peak()
+
+    def record_output(self, name, output):
+        '''
+        Record the size of the arrays calculated by the last measurement of a stage.
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage.
+        output: object
+            The object calculated by the stage, or a list of arrays.
+        '''
+        for record in reversed(self.records):
+            if record['name'] == name:
+                record['arrays'], record['array_bytes'] = array_sizes(output)
+                return
+
+    def report(self):
+        '''
+        Summarize the measurements, combining the stages measured several times.
+
+        A stage is measured several times when the calculation runs in chunks, for example.
+
+        Returns
+        -------
+        dict:
+            The measurements of each stage ('stages'), in the order they first started, and
+            the wall time, CPU time and peak allocated bytes of the whole profiled run. Each
+            stage has its number of calls, its depth within other stages, its total wall and
+            CPU times in s, and its largest peak allocated bytes and array sizes. Byte counts
+            are None when they were not measured.
+        '''
+        stages = {}
+        for record in self.records:
+            stage = stages.get(record['name'])
+            if stage is None:
+                stages[record['name']] = dict(record, calls=1)
+                continue
+
+            stage['calls'] += 1
+            for key in ('wall_s', 'cpu_s'):
+                stage[key] += record[key] or 0.0
+            for key in ('peak_bytes', 'arrays', 'array_bytes'):
+                if record[key] is not None:
+                    stage[key] = max(stage[key] or 0, record[key])
+
+        return {'stages': list(stages.values()), 'wall_s': self.wall_s, 'cpu_s': self.cpu_s,
+                'peak_bytes': self.peak_bytes, 'memory_traced': self.trace_memory}
+
+
+def profile_calculation(*args, trace_memory=True, **kwargs):
+    '''
+    Run calculator_main.execute_calculation under a profiler, and return its report.
+
+    Parameters
+    ----------
+    args: tuple
+        The positional arguments of execute_calculation.
+    trace_memory: bool
+        Whether the peak allocated bytes are traced. Default to true.
+    kwargs: dict
+        The keyword arguments of execute_calculation.
+
+    Returns
+    -------
+    dict:
+        The report, as returned by StageProfiler.report.
+    '''
+    from calculator_main import execute_calculation
+
+    with StageProfiler(trace_memory) as profiler:
+        execute_calculation(*args, **kwargs)
+    return profiler.report()
@@ -0,0 +1,691 @@
+import argparse
+import asyncio
+import http
+import io
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 16
+DEFAULT_MAX_BODY_BYTES = 1 << 30
+# Longest line of the head of a request
+MAX_LINE_BYTES = 1 << 16
+# Size of the chunks the output is streamed back in
+STREAM_CHUNK_BYTES = 1 << 16
+# Seconds between the first two checks that a client which closed its side of the connection
+# is still there, doubled after each check up to the last value
+DISCONNECT_CHECK_S = (0.01, 1.0)
+
+# Query parameters that are options of the calculation. Every other parameter replaces a
+# constant, as in ConstantsManager.with_overrides.
+CALCULATION_OPTIONS = ('stop_after', 'downsample', 't_start', 't_end')
+
+# Constants of a worker process, set once by init_worker
+_worker_constants = None
+
+
+def init_worker(constants_file_path=None):
+    '''
+    Load the constants of a worker process, and run a small calculation to warm it up.
+
+    The warm-up fills the tables each process keeps for the equation of state, so that the
+    first request sent to the worker does not pay for them.
+
+    Parameters
+    ----------
+    constants_file_path: str
+        The path to the constants yaml file. Default is None, in which case the default one is
+        used.
+    '''
+    global _worker_constants
+
+    import numpy as np
+    from constants import ConstantsManager
+    from DAQ_raw import DAQRaw
+    from pipeline import Pipeline
+
+    if constants_file_path is None:
+        _worker_constants = ConstantsManager()
+    else:
+        _worker_constants = ConstantsManager(constants_file_path)
+
+    n_points = 64
+    try:
+        DAQ_data = DAQRaw(np.arange(n_points, dtype=float),
+                          np.linspace(900, 100, n_points),
+                          np.linspace(50, 10, n_points), np.zeros(n_points),
+                          _worker_constants.test_conditions)
+        Pipeline(DAQ_data, _worker_constants).get('NOS_vapour_CG')
+    except Exception:
+        # Warming up is only an optimization, any actual problem shows up on the requests
+        pass
+
+
+def worker_ready():
+    '''Return the pid of the worker, once it is initialized.'''
+    return os.getpid()
+
+
+def calculate_payload(payload, overrides, stop_after, downsample=1, t_start=None, t_end=None):
+    '''
+    Run the calculation on a DAQ csv file sent to the service, in a worker process.
+
+    Parameters
+    ----------
+    payload: bytes
+        The contents of the DAQ csv file.
+    overrides: dict
+        The constants replaced for this calculation only, as in
+        ConstantsManager.with_overrides.
+    stop_after: str
+        The last stage calculated, as in calculator_main.execute_calculation.
+    downsample: int
+        Only every downsample-th data row is used. Default value is 1 (no downsampling).
+    t_start: float
+        If given, only the data at or after this time is used, in s. Default is None. As in
+        execute_calculation, the time and fuel mass still refer to the whole recording.
+    t_end: float
+        If given, only the data at or before this time is used, in s. Default is None.
+
+    Returns
+    -------
+    tuple:
+        The output, encoded as utf-8, and the seconds the calculation took.
+    '''
+    from calculator_main import find_stream_time_references, write_stage_output
+    from csv_extractor import CSVExtractor
+    from DAQ_raw import DAQRaw
+    from pipeline import Pipeline
+
+    start = time.perf_counter()
+    constants = _worker_constants
+    if overrides:
+        constants = constants.with_overrides(**overrides)
+
+    csvfile = io.StringIO(payload.decode(), newline='')
+    columns = CSVExtractor().read_stream_columns(
+        csvfile, downsample,
+        float('-inf') if t_start is None else t_start, float('inf') if t_end is None else t_end)
+    DAQ_data = DAQRaw(*columns, constants.test_conditions)
+    if t_start is not None or t_end is not None:
+        csvfile.seek(0)
+        DAQ_data.start_time_s, DAQ_data.end_of_burn_index = find_stream_time_references(
+            csvfile, constants.test_conditions['end_of_burn'], downsample=downsample)
+    stage_data = Pipeline(DAQ_data, constants).get(stop_after)
+
+    output = io.StringIO()
+    write_stage_output(output, DAQ_data, stage_data, stop_after)
+    return output.getvalue().encode(), time.perf_counter() - start
+
+
+class HTTPError(Exception):
+    '''
+    An error answered to the client with its HTTP status.
+    '''
+
+    def __init__(self, status, message, headers=None):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        status: int
+            The HTTP status of the response.
+        message: str
+            The body of the response.
+        headers: dict
+            Extra headers of the response. Default is None.
+        '''
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def parse_query(query):
+    '''
+    Split the query of a calculation request into calculation options and constant overrides.
+
+    Parameters
+    ----------
+    query: str
+        The query string of the request.
+
+    Returns
+    -------
+    tuple of dict:
+        The keyword arguments of calculate_payload besides the payload and overrides, and the
+        overrides. Override values are parsed as json when they can be, so that numbers and
+        lists are not strings.
+    '''
+    from pipeline import STAGES
+
+    options = {'stop_after': STAGES[-1]}
+    overrides = {}
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name not in CALCULATION_OPTIONS:
+            try:
+                overrides[name] = json.loads(value)
+            except ValueError:
+                overrides[name] = value
+            continue
+
+        try:
+            if name == 'downsample':
+                value = int(value)
+                if value < 1:
+                    raise ValueError
+            elif name in ('t_start', 't_end'):
+                value = float(value)
+            elif value not in STAGES:
+                raise ValueError
+        except ValueError:
+            raise HTTPError(400, f'invalid {name}: {value}') from None
+        options[name] = value
+    return options, overrides
+
+
+async def read_line(reader):
+    '''
+    Read a line of the head of an HTTP request.
+
+    Parameters
+    ----------
+    reader: asyncio.StreamReader
+        The connection.
+
+    Returns
+    -------
+    bytes:
+        The line, with its line ending, or an empty one if the connection was closed.
+    '''
+    try:
+        return await reader.readline()
+    except ValueError:
+        # Raised by readline when no line ending is found within the limit of the stream
+        raise HTTPError(400, f'a line of the request head is longer than {MAX_LINE_BYTES} '
+                             'bytes') from None
+
+
+async def wait_disconnected(reader, writer):
+    '''
+    Wait until the client of a request that was read entirely disconnects.
+
+    Anything the client sends afterwards is discarded. A client that closes its side of the
+    connection may still be waiting for the response, so that is only taken as a disconnect
+    once writing to the connection fails. The writes are interim 100 Continue responses, which
+    HTTP/1.1 clients skip.
+
+    Parameters
+    ----------
+    reader: asyncio.StreamReader
+        The connection, to read from.
+    writer: asyncio.StreamWriter
+        The connection, to write to.
+    '''
+    delay_s, max_delay_s = DISCONNECT_CHECK_S
+    try:
+        while await reader.read(STREAM_CHUNK_BYTES):
+            pass
+        while not writer.is_closing():
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            await writer.drain()
+            await asyncio.sleep(delay_s)
+            delay_s = min(2 * delay_s, max_delay_s)
+    except ConnectionError:
+        pass
+
+
+async def read_request_head(reader):
+    '''
+    Read the request line and headers of an HTTP request.
+
+    Parameters
+    ----------
+    reader: asyncio.StreamReader
+        The connection.
+
+    Returns
+    -------
+    tuple:
+        The method, the target and the headers by lower case name, or None if the connection
+        was closed before a request was sent.
+    '''
+    request_line = await read_line(reader)
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, 'malformed request line') from None
+
+    headers = {}
+    while True:
+        line = await read_line(reader)
+        if line in (b'\r\n', b'\n', b''):
+            return method, target, headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+
+async def write_response(writer, status, headers, body):
+    '''
+    Write an HTTP response, streaming its body in chunks.
+
+    Parameters
+    ----------
+    writer: asyncio.StreamWriter
+        The connection.
+    status: int
+        The HTTP status.
+    headers: dict
+        The headers besides those describing the body.
+    body: bytes
+        The body.
+    '''
+    head = [f'HTTP/1.1 {status} {http.HTTPStatus(status).phrase}',
+            'Transfer-Encoding: chunked', 'Connection: close']
+    head.extend(f'{name}: {value}' for name, value in headers.items())
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+
+    view = memoryview(body)
+    for start in range(0, len(body), STREAM_CHUNK_BYTES):
+        chunk = view[start:start + STREAM_CHUNK_BYTES]
+        writer.write(b'%x\r\n' % len(chunk))
+        writer.write(chunk)
+        writer.write(b'\r\n')
+        # Waits for the client to read what was sent so far
+        await writer.drain()
+    writer.write(b'0\r\n\r\n')
+    await writer.drain()
+
+
+class CalculationService:
+    '''
+    Answer calculation requests over HTTP, running them on a pool of warm worker processes.
+
+    POST /calculate with a DAQ csv file as the body answers the XML, or the csv of the stage
+    given as stop_after in the query. Any other query parameter replaces a constant for that
+    request only, e.g. /calculate?fuel_grain_final_mass=2.5. GET /stats answers the counters
+    of the service as json.
+
+    Once as many requests as there are workers plus max_queue are being calculated or waiting,
+    new ones are answered 503. A request whose client disconnects, or which takes longer than
+    timeout_s, is cancelled: dropped if it is still waiting for a worker, and its output
+    discarded otherwise. If a worker process dies, e.g. because it ran out of memory, the
+    requests it broke are answered 500 and the workers are restarted.
+    '''
+
+    def __init__(self, constants_file_path=None, workers=None, max_queue=DEFAULT_MAX_QUEUE,
+                 timeout_s=None, max_body_bytes=DEFAULT_MAX_BODY_BYTES):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        constants_file_path: str
+            The path to the constants yaml file. Default is None, in which case the default
+            one is used.
+        workers: int
+            How many worker processes calculate requests. Default is None, which uses one per
+            CPU.
+        max_queue: int
+            How many requests can wait for a worker. Default is DEFAULT_MAX_QUEUE.
+        timeout_s: float
+            How long a request can wait and be calculated for, in s. Default is None, in
+            which case requests are never timed out.
+        max_body_bytes: int
+            The largest DAQ file accepted. Default is DEFAULT_MAX_BODY_BYTES.
+        '''
+        self.constants_file_path = constants_file_path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = self.workers + max_queue
+        self.timeout_s = timeout_s
+        self.max_body_bytes = max_body_bytes
+
+        self.executor = None
+        # Requests submitted to the workers and not finished yet, including cancelled ones
+        # that a worker already started
+        self.pending = 0
+        self.counters = dict.fromkeys(('completed', 'failed', 'rejected', 'cancelled',
+                                       'timed_out'), 0)
+        self.next_request_id = 1
+
+    def create_executor(self):
+        '''
+        Return a new pool of worker processes, which start as requests are submitted to it.
+        '''
+        from concurrent.futures import ProcessPoolExecutor
+
+        from batch_main import pool_context
+
+        return ProcessPoolExecutor(self.workers, pool_context(),
+                                   initializer=init_worker,
+                                   initargs=(self.constants_file_path,))
+
+    async def start_workers(self):
+        '''
+        Start every worker process, and wait until they are all initialized.
+        '''
+        self.executor = self.create_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, worker_ready)
+                               for _ in range(self.workers)))
+
+    def restart_workers(self, executor):
+        '''
+        Replace a pool of workers that broke, unless another request already replaced it.
+
+        Parameters
+        ----------
+        executor: concurrent.futures.ProcessPoolExecutor
+            The pool that broke.
+        '''
+        if self.executor is executor:
+            executor.shutdown(wait=False)
+            self.executor = self.create_executor()
+
+    def close(self):
+        '''
+        Stop the worker processes, dropping the requests still waiting for one.
+        '''
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        '''
+        Start the workers, then listen for requests.
+
+        Parameters
+        ----------
+        host: str
+            The address listened on. Default is DEFAULT_HOST.
+        port: int
+            The port listened on, 0 picking a free one. Default is DEFAULT_PORT.
+        unix_path: str
+            If given, the unix socket listened on instead of host and port. Default is None.
+
+        Returns
+        -------
+        asyncio.Server:
+            The server, already serving.
+        '''
+        await self.start_workers()
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, unix_path,
+                                                   limit=MAX_LINE_BYTES)
+        return await asyncio.start_server(self.handle_connection, host, port,
+                                          limit=MAX_LINE_BYTES)
+
+    def stats(self):
+        '''
+        Return the counters of the requests answered so far, and the requests in progress.
+        '''
+        return dict(self.counters, pending=self.pending, max_pending=self.max_pending,
+                    workers=self.workers)
+
+    async def handle_connection(self, reader, writer):
+        '''
+        Answer the request sent on a connection, then close it.
+
+        Parameters
+        ----------
+        reader: asyncio.StreamReader
+            The connection, to read from.
+        writer: asyncio.StreamWriter
+            The connection, to write to.
+        '''
+        try:
+            try:
+                response = await self.handle_request(reader, writer)
+            except HTTPError as error:
+                response = (error.status, dict(error.headers, **{
+                    'Content-Type': 'text/plain; charset=utf-8'}),
+                    (error.message + '\n').encode())
+            if response is not None:
+                await write_response(writer, *response)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def handle_request(self, reader, writer):
+        '''
+        Route a request to its handler.
+
+        Parameters
+        ----------
+        reader: asyncio.StreamReader
+            The connection, to read from.
+        writer: asyncio.StreamWriter
+            The connection, to write to.
+
+        Returns
+        -------
+        tuple:
+            The status, headers and body of the response, or None if there is nothing to
+            answer.
+        '''
+        request_head = await read_request_head(reader)
+        if request_head is None:
+            return None
+        method, target, headers = request_head
+        url = urlsplit(target)
+
+        if url.path == '/stats':
+            if method != 'GET':
+                raise HTTPError(405, 'use GET', {'Allow': 'GET'})
+            return 200, {'Content-Type': 'application/json'}, json.dumps(self.stats()).encode()
+        if url.path != '/calculate':
+            raise HTTPError(404, f'unknown path: {url.path}')
+        if method != 'POST':
+            raise HTTPError(405, 'use POST', {'Allow': 'POST'})
+        return await self.handle_calculate(reader, writer, url.query, headers)
+
+    async def handle_calculate(self, reader, writer, query, headers):
+        '''
+        Calculate the DAQ file sent in a request on a worker.
+
+        Parameters
+        ----------
+        reader: asyncio.StreamReader
+            The connection, to read the body and notice the client disconnecting from.
+        writer: asyncio.StreamWriter
+            The connection, to write to.
+        query: str
+            The query string of the request.
+        headers: dict
+            The headers of the request, by lower case name.
+
+        Returns
+        -------
+        tuple:
+            The status, headers and body of the response, or None if the client disconnected.
+        '''
+        from concurrent.futures.process import BrokenProcessPool
+
+        start = time.perf_counter()
+        options, overrides = parse_query(query)
+
+        try:
+            content_length = int(headers['content-length'])
+        except (KeyError, ValueError):
+            raise HTTPError(
+                411, 'the DAQ file must be sent with a Content-Length') from None
+        if content_length > self.max_body_bytes:
+            raise HTTPError(
+                413, f'the DAQ file is larger than {self.max_body_bytes} bytes')
+        # Checked before reading the body, so that a rejected client does not upload it
+        if self.pending >= self.max_pending:
+            self.counters['rejected'] += 1
+            raise HTTPError(503, 'too many requests in progress', {
+                            'Retry-After': '1'})
+
+        if headers.get('expect', '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            await writer.drain()
+        payload = await reader.readexactly(content_length)
+
+        request_id = self.next_request_id
+        self.next_request_id += 1
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            concurrent_future = executor.submit(calculate_payload, payload, overrides,
+                                                **options)
+        except BrokenProcessPool:
+            # A worker died since the last request, so every submission would fail
+            self.restart_workers(executor)
+            self.counters['rejected'] += 1
+            raise HTTPError(503, 'the workers are restarting',
+                            {'Retry-After': '1'}) from None
+        self.pending += 1
+        # Only released once no worker is calculating the request any more, even if it was
+        # cancelled
+        concurrent_future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self.release))
+        future = asyncio.wrap_future(concurrent_future)
+
+        disconnected = asyncio.ensure_future(wait_disconnected(reader, writer))
+        try:
+            done, _ = await asyncio.wait({future, disconnected}, timeout=self.timeout_s,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            disconnected.cancel()
+
+        if future not in done:
+            future.cancel()
+            if disconnected in done:
+                self.counters['cancelled'] += 1
+                return None
+            self.counters['timed_out'] += 1
+            raise HTTPError(
+                504, f'the calculation took longer than {self.timeout_s} s')
+
+        try:
+            output, calculation_s = future.result()
+        except BrokenProcessPool:
+            # A worker died while this request was waiting for it or being calculated
+            self.counters['failed'] += 1
+            self.restart_workers(executor)
+            raise HTTPError(
+                500, 'a worker process died during the calculation') from None
+        except (ValueError, KeyError, IndexError) as error:
+            self.counters['failed'] += 1
+            raise HTTPError(400, f'{type(error).__name__}: {error}') from None
+        except Exception as error:
+            self.counters['failed'] += 1
+            raise HTTPError(500, f'{type(error).__name__}: {error}') from None
+
+        self.counters['completed'] += 1
+        total_s = time.perf_counter() - start
+        content_type = 'application/xml' if options['stop_after'] == 'engine_XML' \
+            else 'text/csv'
+        return 200, {'Content-Type': content_type, 'X-Request-Id': str(request_id),
+                     'Server-Timing': f'calc;dur={calculation_s * 1000:.3f}, '
+                                      f'total;dur={total_s * 1000:.3f}'}, output
+
+    def release(self):
+        '''Free the place of a request that no worker is calculating any more.'''
+        self.pending -= 1
+
+
+def parse_args(argv):
+    '''
+    Parse the command line arguments.
+
+    Parameters
+    ----------
+    argv: list of str
+        The arguments, without the program name.
+
+    Returns
+    -------
+    argparse.Namespace:
+        The parsed arguments.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Serve RSE calculations over HTTP from a pool of warm worker processes. '
+                    'POST a DAQ csv file to /calculate to get its XML back.')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f'address listened on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'port listened on (default: {DEFAULT_PORT})')
+    parser.add_argument(
+        '--unix', help='unix socket listened on instead of a port')
+    parser.add_argument('-c', '--constants', help='constants yaml file (default: '
+                                                  'constant_config.yaml)')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help='requests that can wait for a worker before new ones are '
+                             f'answered 503 (default: {DEFAULT_MAX_QUEUE})')
+    parser.add_argument('--timeout', type=float,
+                        help='seconds after which a request is cancelled and answered 504')
+
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.max_queue < 0:
+        parser.error('--max-queue cannot be negative')
+    return args
+
+
+async def serve(args):
+    '''
+    Run the service until it is interrupted.
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        The parsed command line arguments.
+    '''
+    service = CalculationService(
+        args.constants, args.workers, args.max_queue, args.timeout)
+    try:
+        server = await service.start(args.host, args.port, args.unix)
+        print(f'listening on {args.unix or f"http://{args.host}:{args.port}"} with '
+              f'{service.workers} workers', file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    '''
+    Run the service from the command line.
+
+    Parameters
+    ----------
+    argv: list of str
+        The arguments, without the program name. Default is None, in which case sys.argv
+        is used.
+
+    Returns
+    -------
+    int:
+        The exit status.
+    '''
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parse_args(argv)
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import copy
+import time
+
+import numpy as np
+
+from calculator_main import write_stage_output
+from constants import ConstantsManager
+from csv_extractor import CSVExtractor
+from DAQ_raw import DAQRaw
+from pipeline import Pipeline, STAGES
+
+
+class CalculationSession:
+    '''
+    Keep a DAQ file and every stage calculated from it in memory, to try other constants.
+
+    For example:
+
+        session = CalculationSession('static_fire.csv')
+        print(format_report(session.update(end_of_burn=395.2)))
+        session.save('output.xml')
+
+    Each update only calculates again the stages that read a constant that changed, and
+    those calculated from them.
+    '''
+
+    def __init__(self, data_file_path, constants_file_path=None, downsample=1, t_start=None,
+                 t_end=None, use_cache=False, stage_cache=None):
+        '''
+        Initialize all base values, and calculate every stage.
+
+        Parameters
+        ----------
+        data_file_path: str
+            The path of the DAQ file.
+        constants_file_path: str
+            The path to the constants yaml file. Default is None, in which case the default
+            one is used.
+        downsample: int
+            Only every downsample-th data row is used. Default value is 1 (no downsampling).
+        t_start: float
+            If given, only the data at or after this time is used, in s. Default is None. As
+            in execute_calculation, the time and fuel mass still refer to the whole recording.
+        t_end: float
+            If given, only the data at or before this time is used, in s. Default is None.
+        use_cache: bool
+            Whether the parsed DAQ data is cached next to the data file. Default to false.
+        stage_cache: stage_cache.StageCache
+            The cache the stages are loaded from and saved to. Default is None, in which case
+            every stage is calculated.
+        '''
+        if constants_file_path is None:
+            self.consts_m = ConstantsManager()
+        else:
+            self.consts_m = ConstantsManager(constants_file_path)
+
+        self.data_file_path = data_file_path
+        self.downsample = downsample
+        self.windowed = t_start is not None or t_end is not None
+
+        self.extractor = CSVExtractor()
+        self.extractor.set_cache_mode(use_cache)
+        DAQ_data = self.extractor.extract_data_to_raw_DAQ(data_file_path, downsample, t_start,
+                                                          t_end)
+        if self.windowed:
+            DAQ_data.start_time_s, DAQ_data.end_of_burn_index = \
+                self.extractor.find_time_references(
+                    data_file_path, self.consts_m.test_conditions['end_of_burn'], downsample)
+        if DAQ_data.test_cond is not self.consts_m.test_conditions:
+            DAQ_data = self.DAQ_data_for(DAQ_data, self.consts_m)
+
+        self.pipeline = Pipeline(DAQ_data, self.consts_m, stage_cache)
+        self.last_report = self.calculate([])
+
+    @staticmethod
+    def DAQ_data_for(DAQ_data, consts_m):
+        '''
+        Return the DAQ data adjusted with the test conditions of some constants.
+
+        Parameters
+        ----------
+        DAQ_data: DAQRaw
+            The data, as adjusted with other test conditions.
+        consts_m: constants.ConstantsManager
+            The constants whose test conditions are used.
+
+        Returns
+        -------
+        DAQRaw:
+            The same data if its adjusted columns do not change, new data otherwise.
+        '''
+        adjusted = DAQRaw(DAQ_data.time_s, DAQ_data.tank_pressure_psig,
+                          DAQ_data.recorded_mass_lb, DAQ_data.thrust_lb,
+                          consts_m.test_conditions)
+        adjusted.start_time_s = DAQ_data.start_time_s
+        adjusted.end_of_burn_index = DAQ_data.end_of_burn_index
+        if all(np.array_equal(getattr(adjusted, column), getattr(DAQ_data, column),
+                              equal_nan=True)
+               for column in ('tank_pressure_psia', 'adjusted_mass_lb')):
+            return DAQ_data
+        return adjusted
+
+    def calculate(self, invalidated, stop_after=STAGES[-1]):
+        '''
+        Calculate the stages missing up to a stage, timing each of them.
+
+        Parameters
+        ----------
+        invalidated: list of str
+            The stages that were forgotten before, to be reported.
+        stop_after: str
+            The last stage calculated. Default is engine_XML.
+
+        Returns
+        -------
+        dict:
+            The report: the invalidated stages, the seconds each stage took, by stage name in
+            the order they ran, and the total seconds.
+        '''
+        start = time.perf_counter()
+        stage_seconds = {}
+        for name in self.pipeline.plan(stop_after):
+            stage_start = time.perf_counter()
+            self.pipeline.calculate_stage(name)
+            stage_seconds[name] = time.perf_counter() - stage_start
+
+        return {'invalidated': invalidated, 'stage_seconds': stage_seconds,
+                'seconds': time.perf_counter() - start}
+
+    def update(self, **constant_overrides):
+        '''
+        Replace some constants and calculate again the stages that depend on them.
+
+        In a session on a time window, changing the end of burn looks its index up in the
+        whole file again, which replaces the DAQ data and so calculates every stage again.
+
+        Parameters
+        ----------
+        constant_overrides: dict
+            The new value of each constant, by its key in its field, as in
+            ConstantsManager.with_overrides. For example fuel_grain_final_mass=2.5.
+
+        Returns
+        -------
+        dict:
+            The report of the stages that ran, as returned by calculate.
+        '''
+        consts_m = self.consts_m.with_overrides(**constant_overrides)
+        DAQ_data = self.pipeline.outputs['DAQ_raw']
+        adjusted = self.DAQ_data_for(DAQ_data, consts_m)
+
+        end_of_burn_s = consts_m.test_conditions['end_of_burn']
+        if self.windowed and end_of_burn_s != self.consts_m.test_conditions['end_of_burn']:
+            # Looked up before anything changes, as it fails if the new time is not recorded
+            _, end_of_burn_index = self.extractor.find_time_references(
+                self.data_file_path, end_of_burn_s, self.downsample)
+            if end_of_burn_index != adjusted.end_of_burn_index:
+                if adjusted is DAQ_data:
+                    adjusted = copy.copy(DAQ_data)
+                adjusted.end_of_burn_index = end_of_burn_index
+
+        self.consts_m = consts_m
+        invalidated = self.pipeline.set_constants(self.consts_m)
+        if adjusted is not DAQ_data:
+            # Test conditions such as the water used for heating change the DAQ data itself
+            invalidated = set(invalidated).union(
+                self.pipeline.set_data(adjusted))
+            invalidated = [name for name in STAGES if name in invalidated]
+
+        self.last_report = self.calculate(invalidated)
+        return self.last_report
+
+    def get(self, name):
+        '''
+        Return the object of a stage, or one of its attributes, as in Pipeline.get.
+
+        Parameters
+        ----------
+        name: str
+            The name of the stage, optionally followed by a dot and an attribute name.
+        '''
+        return self.pipeline.get(name)
+
+    def save(self, target_path, stop_after=STAGES[-1]):
+        '''
+        Save the output of a stage with the current constants.
+
+        Parameters
+        ----------
+        target_path: str
+            The path where the output is to be saved to.
+        stop_after: str
+            The stage whose output is saved, as in execute_calculation. Default is engine_XML.
+        '''
+        with open(target_path, 'w') as file:
+            write_stage_output(file, self.pipeline.outputs['DAQ_raw'],
+                               self.get(stop_after), stop_after)
+
+
+def format_report(report):
+    '''
+    Format the report of an update as text, one line per stage that ran.
+
+    Parameters
+    ----------
+    report: dict
+        The report, as returned by CalculationSession.update.
+
+    Returns
+    -------
+    str:
+        The text.
+    '''
+    lines = [f'{name}: {seconds * 1000:.1f} ms'
+             for name, seconds in report['stage_seconds'].items()]
+    lines.append(
+        f'{len(report["stage_seconds"])} stages in {report["seconds"] * 1000:.1f} ms')
+    return '\n'.join(lines)
@@ -0,0 +1,301 @@
+import glob
+import hashlib
+import io
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+from constants import thaw
+
+# Bump whenever the layout of the cache entries changes
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'),
+    'rse_calculator', 'stages')
+DEFAULT_MAX_BYTES = 1 << 30
+
+OBJECT_FILE_NAME = 'object.pickle'
+BUFFER_FILE_PATTERN = 'buffer-{}.npy'
+
+# Digest of the calculation code, computed once per process
+_code_digest = None
+
+
+def code_digest():
+    '''
+    Return a digest of the source of every module of the calculator.
+
+    Any change to the code gives new stage keys, so entries saved by an older version of the
+    calculation are never loaded.
+
+    Returns
+    -------
+    str:
+        The hex digest.
+    '''
+    global _code_digest
+    if _code_digest is None:
+        hasher = hashlib.sha256()
+        source_dir = os.path.dirname(os.path.abspath(__file__))
+        for source_path in sorted(glob.glob(os.path.join(source_dir, '*.py'))):
+            hasher.update(os.path.basename(source_path).encode())
+            with open(source_path, 'rb') as source_file:
+                hasher.update(source_file.read())
+        _code_digest = hasher.hexdigest()
+    return _code_digest
+
+
+def data_digest(DAQ_data):
+    '''
+    Return a digest of every array and number of the DAQ data.
+
+    Parameters
+    ----------
+    DAQ_data: DAQRaw
+        The data the calculation is run on.
+
+    Returns
+    -------
+    str:
+        The hex digest.
+    '''
+    hasher = hashlib.sha256()
+    for name, value in sorted(vars(DAQ_data).items()):
+        if isinstance(value, np.ndarray):
+            hasher.update(f'{name}:{value.dtype.str}:{value.shape};'.encode())
+            hasher.update(np.ascontiguousarray(value).data)
+        elif value is None or isinstance(value, (int, float)):
+            hasher.update(f'{name}={value!r};'.encode())
+    return hasher.hexdigest()
+
+
+def json_default(value):
+    '''
+    Convert the values json cannot serialize while hashing constants.
+
+    Parameters
+    ----------
+    value: object
+        The value json could not serialize.
+    '''
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return repr(value)
+
+
+def stage_key(name, constants_values, input_keys):
+    '''
+    Compute the key of a stage from everything its object depends on.
+
+    Because the key of each input stage is itself computed from its own inputs, a change
+    anywhere upstream changes the keys of every stage after it, and only those.
+
+    Parameters
+    ----------
+    name: str
+        The name of the stage.
+    constants_values: dict
+        The constants fields the stage reads, and any other value it depends on.
+    input_keys: list of str
+        The keys of its input stages, in order.
+
+    Returns
+    -------
+    str:
+        The hex key.
+    '''
+    description = json.dumps([CACHE_VERSION, code_digest(), name, thaw(constants_values),
+                              input_keys], sort_keys=True, default=json_default)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+class StageCache:
+    '''
+    Store the objects of calculation stages on disk, keyed on their inputs.
+
+    Each entry is the pickled object, with its arrays saved as .npy files next to it and
+    memory-mapped when the entry is loaded. Once the entries are larger than max_bytes, the
+    least recently used ones are removed.
+    '''
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        cache_dir: str
+            The directory in which the entries are placed. Default is None, in which case
+            DEFAULT_CACHE_DIR is used.
+        max_bytes: int
+            The size the entries are kept under. Default is DEFAULT_MAX_BYTES.
+        '''
+        self.cache_dir = DEFAULT_CACHE_DIR if cache_dir is None else cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key):
+        '''
+        Return the directory holding the entry of a key.
+
+        Parameters
+        ----------
+        key: str
+            The key of the stage.
+        '''
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key, references):
+        '''
+        Load the object saved for a key.
+
+        Parameters
+        ----------
+        key: str
+            The key of the stage.
+        references: dict
+            The objects the saved object refers to, by the reference they were saved under.
+
+        Returns
+        -------
+        object:
+            The object, with read-only memory-mapped arrays, or None if there is no usable
+            entry for the key.
+        '''
+        entry_path = self.entry_path(key)
+        object_path = os.path.join(entry_path, OBJECT_FILE_NAME)
+        try:
+            with open(object_path, 'rb') as object_file:
+                unpickler = pickle.Unpickler(object_file,
+                                             buffers=self.load_buffers(entry_path))
+                unpickler.persistent_load = references.__getitem__
+                output = unpickler.load()
+            # The modification time of the object file is when the entry was last used
+            os.utime(object_path)
+        except (OSError, ValueError, EOFError, KeyError, AttributeError, ImportError,
+                pickle.UnpicklingError):
+            return None
+        return output
+
+    @staticmethod
+    def load_buffers(entry_path):
+        '''
+        Memory-map the arrays of an entry, in the order they were saved.
+
+        Parameters
+        ----------
+        entry_path: str
+            The directory of the entry.
+
+        Returns
+        -------
+        list of numpy.ndarray:
+            The read-only bytes of each array.
+        '''
+        buffers = []
+        while True:
+            buffer_path = os.path.join(
+                entry_path, BUFFER_FILE_PATTERN.format(len(buffers)))
+            if not os.path.exists(buffer_path):
+                return buffers
+            buffers.append(np.load(buffer_path, mmap_mode='r'))
+
+    def save(self, key, output, references):
+        '''
+        Save the object of a stage, unless it cannot be pickled.
+
+        The entry is written to a temporary directory first and then moved into place, so
+        that concurrent readers never see a partially written entry.
+
+        Parameters
+        ----------
+        key: str
+            The key of the stage.
+        output: object
+            The object calculated by the stage.
+        references: dict
+            The reference to save instead of each object that is kept elsewhere (the objects
+            of other stages, the constants), by the id of the object.
+        '''
+        buffers = []
+        object_file = io.BytesIO()
+        pickler = pickle.Pickler(
+            object_file, protocol=5, buffer_callback=buffers.append)
+        pickler.persistent_id = lambda value: references.get(id(value))
+        try:
+            pickler.dump(output)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+
+        entry_path = self.entry_path(key)
+        tmp_path = f'{entry_path}.tmp-{os.getpid()}'
+        try:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            for index, buffer in enumerate(buffers):
+                np.save(os.path.join(tmp_path, BUFFER_FILE_PATTERN.format(index)),
+                        np.frombuffer(buffer.raw(), dtype=np.uint8))
+            # The object is written last, an entry without one is never loaded
+            with open(os.path.join(tmp_path, OBJECT_FILE_NAME), 'wb') as entry_file:
+                entry_file.write(object_file.getvalue())
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            # The cache is not writable, or another process moved the same entry into place
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+
+        self.evict(keep=key)
+
+    def entries(self):
+        '''
+        List the complete entries of the cache.
+
+        Returns
+        -------
+        list of tuple:
+            The last use time, size in bytes and key of each entry, least recently used
+            first.
+        '''
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+
+        for name in names:
+            entry_path = self.entry_path(name)
+            try:
+                last_used = os.stat(os.path.join(
+                    entry_path, OBJECT_FILE_NAME)).st_mtime_ns
+                size = sum(
+                    entry.stat().st_size for entry in os.scandir(entry_path))
+            except OSError:
+                continue
+            entries.append((last_used, size, name))
+        entries.sort()
+        return entries
+
+    def evict(self, keep=None):
+        '''
+        Remove the least recently used entries until the cache is under max_bytes.
+
+        Parameters
+        ----------
+        keep: str
+            The key of an entry that is never removed. Default is None.
+        '''
+        entries = self.entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total_bytes -= size
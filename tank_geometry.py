@@ -0,0 +1,249 @@
+from math import pi
+import numpy as np
+
+
+class TankGeometry:
+    '''
+    Hold cumulative tables of the tank segments, used to vectorise the tank calculations.
+
+    The segments are numbered from the bottom of the tank. Liquid fills the tank from the
+    bottom segment up, vapour from the top segment down.
+    '''
+
+    def __init__(self, tank_dimensions_m):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        tank_dimensions_m: dict
+            The dimensions of the tank in meters - a dict of constants.
+        '''
+        volume = np.asarray(tank_dimensions_m['volume'])
+        length = np.asarray(tank_dimensions_m['length'])
+        radius = np.asarray(tank_dimensions_m['radius'])
+
+        self.n_segments = len(volume)
+        self.bottom_volume = volume[0]
+        self.top_volume = volume[-1]
+        self.total_length = tank_dimensions_m['total_length']
+        self.liquid_case_bounds = self.liquid_case_boundaries(volume)
+        self.vapour_case_bounds = self.vapour_case_boundaries(volume)
+
+        # Volume and length of the segments filled in each case, indexed by case
+        self.cum_volume_bottom = self.cumulative_from_bottom(volume)
+        self.cum_volume_top = self.cumulative_from_top(volume)
+        self.cum_length_bottom = self.cumulative_from_bottom(length)
+        self.cum_length_top = self.cumulative_from_top(length)
+
+        # Cross-section of each segment
+        self.section_area = pi*radius**2
+
+        # Moment of the segments filled in each case, as used by the CG calculations. The top
+        # moments are accumulated from the top segment down.
+        segment_moment = volume * length / 2
+        self.cum_moment_bottom = self.cumulative_from_bottom(segment_moment)
+        self.cum_moment_top = self.cumulative_from_bottom(segment_moment[::-1])
+
+    @staticmethod
+    def cumulative_from_bottom(values):
+        '''
+        Sum the values of the first k segments, for every k from 0 to the number of segments.
+
+        The sums are accumulated in the same order as the builtin sum, so that they compare
+        exactly with `sum(values[:k])`.
+
+        Parameters
+        ----------
+        values: list of float
+            A value for each tank segment.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The sums, starting with 0.
+        '''
+        return np.array([sum(values[:k]) for k in range(len(values) + 1)], dtype=float)
+
+    @staticmethod
+    def cumulative_from_top(values):
+        '''
+        Sum the values of the last k segments, for every k from 0 to the number of segments.
+
+        The sums are accumulated in the same order as the builtin sum, so that they compare
+        exactly with `sum(values[-k:])`.
+
+        Parameters
+        ----------
+        values: list of float
+            A value for each tank segment.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The sums, starting with 0.
+        '''
+        n_values = len(values)
+        return np.array([sum(values[n_values - k:]) for k in range(n_values + 1)], dtype=float)
+
+    @staticmethod
+    def liquid_case_boundaries(tank_volumes):
+        '''
+        Return the upper volume bound of each liquid case.
+
+        Case k holds the volumes above the first k segments, up to the first k + 1. The last
+        two segments share a case, and volumes above the whole tank fall in the overflow case.
+
+        Parameters
+        ----------
+        tank_volumes: list of float
+            The volumes of the tank sections - constants.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The inclusive upper bound of every case but the overflow one.
+        '''
+        cum_volume = TankGeometry.cumulative_from_bottom(tank_volumes)
+        return np.append(cum_volume[1:-2], cum_volume[-1])
+
+    @staticmethod
+    def vapour_case_boundaries(tank_volumes):
+        '''
+        Return the upper volume bound of each vapour case.
+
+        These mirror the liquid cases, counting segments from the top of the tank.
+
+        Parameters
+        ----------
+        tank_volumes: list of float
+            The volumes of the tank sections - constants.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The inclusive upper bound of every case but the overflow one.
+        '''
+        cum_volume = TankGeometry.cumulative_from_top(tank_volumes)
+        return np.append(cum_volume[1:-2], cum_volume[-1])
+
+    @staticmethod
+    def classify_cases(volumes, case_bounds):
+        '''
+        Find the case of every volume with a single binary search.
+
+        Parameters
+        ----------
+        volumes: list of float
+            The volumes to classify, in m3.
+        case_bounds: numpy.ndarray
+            The inclusive upper bound of each case, as returned by liquid_case_boundaries or
+            vapour_case_boundaries.
+
+        Returns
+        -------
+        numpy.ndarray of int8:
+            The case of every volume. Volumes above the last bound, or NaN, are in the
+            overflow case.
+        '''
+        return np.searchsorted(case_bounds, volumes, side='left').astype(np.int8)
+
+    def liquid_heights(self, liquid_volume_m3, cases, out=None):
+        '''
+        Calculate the liquid height for every sample from its volume and case.
+
+        Parameters
+        ----------
+        liquid_volume_m3: numpy.ndarray
+            The liquid volume of the NOS for each moment in time, in m3.
+        cases: numpy.ndarray of int
+            The liquid case classification for each data point.
+        out: numpy.ndarray
+            Where to write the heights. Default is None, in which case a new array is used.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The liquid height for each moment in time, in m.
+        '''
+        # Filled cylinders plus the height reached in the partially filled cylinder
+        out = np.subtract(liquid_volume_m3,
+                          self.cum_volume_bottom[cases], out=out)
+        out /= self.section_area[cases]
+        out += self.cum_length_bottom[cases]
+        return out
+
+    def liquid_cg(self, cases, liquid_height, liquid_volume_m3, liquid_density_kg_m3, out=None):
+        '''
+        Calculate the liquid centre of gravity for every sample.
+
+        Parameters
+        ----------
+        cases: numpy.ndarray of int
+            The liquid case classification for each data point.
+        liquid_height: numpy.ndarray
+            The height of the liquid at each data point, in m.
+        liquid_volume_m3: numpy.ndarray
+            The liquid volumes for each data points, in m^3.
+        liquid_density_kg_m3: numpy.ndarray
+            The density of the liquid for each data point, in kg per m^3.
+        out: numpy.ndarray
+            Where to write the centres of gravity. Default is None, in which case a new array
+            is used.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The liquid centre of gravity for each moment in time, in m.
+        '''
+        # General case: filled cylinders plus the partially filled cylinder
+        out = np.add(liquid_height, self.cum_length_bottom[cases], out=out)
+        out /= 2
+        out *= liquid_volume_m3 - self.cum_volume_bottom[cases]
+        out += self.cum_moment_bottom[cases]
+
+        # Case 0 is special (no filled cylinders)
+        empty = cases == 0
+        out[empty] = (self.bottom_volume * liquid_density_kg_m3[empty] *
+                      liquid_height[empty] / 2 * liquid_volume_m3[empty])
+
+        out /= liquid_volume_m3
+        return out
+
+    def vapour_cg(self, cases, vapour_height, vapour_volume_m3, gas_density_kg_m3, out=None):
+        '''
+        Calculate the vapour centre of gravity for every sample.
+
+        Parameters
+        ----------
+        cases: numpy.ndarray of int
+            The vapour case classification for each data point.
+        vapour_height: numpy.ndarray
+            The height of the vapour at each data point, in m.
+        vapour_volume_m3: numpy.ndarray
+            The vapour volumes for each data points, in m^3.
+        gas_density_kg_m3: numpy.ndarray
+            The density of the vapour for each data point, in kg per m^3.
+        out: numpy.ndarray
+            Where to write the centres of gravity. Default is None, in which case a new array
+            is used.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The vapour centre of gravity for each moment in time, in m from the bottom.
+        '''
+        # General case: filled cylinders plus the partially filled cylinder
+        out = np.add(vapour_height, self.cum_length_top[cases], out=out)
+        out /= 2
+        out *= vapour_volume_m3 - self.cum_volume_top[cases]
+        out += self.cum_moment_top[cases]
+
+        # Case 0 is special (no filled cylinders)
+        empty = cases == 0
+        out[empty] = (self.top_volume * gas_density_kg_m3[empty] *
+                      vapour_height[empty] / 2 * vapour_volume_m3[empty])
+
+        out /= vapour_volume_m3
+        np.subtract(self.total_length, out, out=out)
+        return out
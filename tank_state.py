@@ -0,0 +1,144 @@
+import numpy as np
+
+from constants import kg_to_pounds
+from constants import metres_to_inches
+from tank_geometry import TankGeometry
+
+# Layout of the combined liquid and vapour tank state of a single sample
+TANK_STATE_DTYPE = np.dtype([
+    ('liquid_case', np.int8),
+    ('vapour_case', np.int8),
+    ('liquid_height_m', np.float64),
+    ('vapour_height_m', np.float64),
+    ('liquid_cg_m', np.float64),
+    ('vapour_cg_m', np.float64),
+    ('liquid_mass_lb', np.float64),
+    ('vapour_mass_lb', np.float64),
+    ('liquid_cg_in', np.float64),
+    ('vapour_cg_in', np.float64),
+])
+
+
+class TankState:
+    '''
+    Calculate the liquid and vapour state of the oxidizer tank together, in a single pass.
+
+    NOSLiquidCG and NOSVapourCG are views over the fields of this state.
+    '''
+
+    @staticmethod
+    def calculate_tank_state(out, geometry, liquid_volume_m3, vapour_volume_m3,
+                             density_liquid_kg_m3, gas_density_kg_m3,
+                             liquid_mass_kg, vapour_mass_kg):
+        '''
+        Fill a tank state array from the NOS volumes, densities and masses.
+
+        Parameters
+        ----------
+        out: numpy.ndarray of TANK_STATE_DTYPE
+            The array that is filled, one element per data point.
+        geometry: tank_geometry.TankGeometry
+            The cumulative tables of the tank.
+        liquid_volume_m3: numpy.ndarray
+            The liquid volume for each data point, in m^3.
+        vapour_volume_m3: numpy.ndarray
+            The vapour volume for each data point, in m^3.
+        density_liquid_kg_m3: numpy.ndarray
+            The density of the liquid for each data point, in kg per m^3.
+        gas_density_kg_m3: numpy.ndarray
+            The density of the vapour for each data point, in kg per m^3.
+        liquid_mass_kg: numpy.ndarray
+            The liquid mass for each data point, in kg.
+        vapour_mass_kg: numpy.ndarray
+            The vapour mass for each data point, in kg.
+
+        Returns
+        -------
+        numpy.ndarray of TANK_STATE_DTYPE:
+            The filled array.
+        '''
+        liquid_case = TankGeometry.classify_cases(
+            liquid_volume_m3, geometry.liquid_case_bounds)
+        vapour_case = TankGeometry.classify_cases(
+            vapour_volume_m3, geometry.vapour_case_bounds)
+        out['liquid_case'] = liquid_case
+        out['vapour_case'] = vapour_case
+
+        # The vapour fills whatever height the liquid does not
+        liquid_height_m = geometry.liquid_heights(liquid_volume_m3, liquid_case,
+                                                  out=out['liquid_height_m'])
+        vapour_height_m = np.subtract(geometry.total_length, liquid_height_m,
+                                      out=out['vapour_height_m'])
+
+        geometry.liquid_cg(liquid_case, liquid_height_m, liquid_volume_m3,
+                           density_liquid_kg_m3, out=out['liquid_cg_m'])
+        geometry.vapour_cg(vapour_case, vapour_height_m, vapour_volume_m3,
+                           gas_density_kg_m3, out=out['vapour_cg_m'])
+
+        out['liquid_mass_lb'] = kg_to_pounds(liquid_mass_kg)
+        out['vapour_mass_lb'] = kg_to_pounds(vapour_mass_kg)
+        out['liquid_cg_in'] = metres_to_inches(out['liquid_cg_m'])
+        out['vapour_cg_in'] = metres_to_inches(out['vapour_cg_m'])
+
+        return out
+
+    def __init__(self, i_NOS_mass_and_volume, i_constants=None):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        i_NOS_mass_and_volume: NOSMassAndVolume object
+            Contains data pertaining to NOS mass,volume and density.
+        i_constants: constants.ConstantsManager
+            Object containing all the constants for the program. Default is None, in which case
+            a default object will be imported and created.
+        '''
+        if i_constants is None:
+            from constants import ConstantsManager as CM
+            self.consts_m = CM()
+        else:
+            self.consts_m = i_constants
+
+        self.NOS_mass_and_volume_data = i_NOS_mass_and_volume
+        self.geometry = TankGeometry(self.consts_m.tank_dimensions_meters)
+
+        nmv = self.NOS_mass_and_volume_data
+        densities = nmv.DAQ_pressure_to_density_data
+
+        self.data = np.empty(len(nmv.liquid_volume_m3), dtype=TANK_STATE_DTYPE)
+        self.calculate_tank_state(self.data, self.geometry,
+                                  np.asarray(
+                                      nmv.liquid_volume_m3, dtype=float),
+                                  np.asarray(
+                                      nmv.vapour_volume_m3, dtype=float),
+                                  np.asarray(
+                                      densities.density_liquid_kg_m3, dtype=float),
+                                  np.asarray(
+                                      densities.gas_density_kg_m3, dtype=float),
+                                  nmv.liquid_mass_kg, nmv.vapour_mass_kg)
+
+    def describes(self, i_NOS_mass_and_volume, i_constants):
+        '''
+        Check whether this state was calculated from the given data and tank dimensions.
+
+        Parameters
+        ----------
+        i_NOS_mass_and_volume: NOSMassAndVolume object
+            Contains data pertaining to NOS mass,volume and density.
+        i_constants: constants.ConstantsManager
+            Object containing all the constants for the program.
+
+        Returns
+        -------
+        bool:
+            Whether the state can be reused for that data.
+        '''
+        if i_NOS_mass_and_volume is not self.NOS_mass_and_volume_data:
+            return False
+
+        own_dims = self.consts_m.tank_dimensions_meters
+        other_dims = i_constants.tank_dimensions_meters
+        return own_dims is other_dims or all(
+            np.array_equal(own_dims[key], other_dims[key])
+            for key in ('volume', 'length', 'radius', 'total_length'))
@@ -0,0 +1,13 @@
+import pytest
+
+from constants import ConstantsManager
+
+
+@pytest.fixture(autouse=True)
+def compiled_cache_dir(tmp_path, monkeypatch):
+    # Configurations compiled by the tests, including in the processes they start, go to a
+    # temporary directory rather than the cache directory of the user
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setenv('XDG_CACHE_HOME', str(cache_dir))
+    monkeypatch.setattr(ConstantsManager, 'compiled_cache_dir',
+                        str(cache_dir / 'rse_calculator' / 'config'))
@@ -0,0 +1,72 @@
+import os
+import shutil
+import numpy as np
+
+from csv_extractor import CSVExtractor
+from DAQ_cache import DAQCache, COLUMN_NAMES
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+
+
+def test_cached_reload(tmp_path):
+    csv_path = str(tmp_path / 'sample.csv')
+    shutil.copyfile(SAMPLE_DAQ_PATH, csv_path)
+
+    reference = CSVExtractor().extract_data_to_raw_DAQ(csv_path, downsample=10)
+
+    ext = CSVExtractor()
+    ext.set_cache_mode(True)
+    first = ext.extract_data_to_raw_DAQ(csv_path, downsample=10)
+    assert os.path.isdir(csv_path + '.daqcache')
+
+    second = ext.extract_data_to_raw_DAQ(csv_path, downsample=10)
+
+    for raw_dat in (first, second):
+        assert np.array_equal(raw_dat.time_s, reference.time_s)
+        assert np.array_equal(raw_dat.tank_pressure_psia,
+                              reference.tank_pressure_psia)
+        assert np.array_equal(raw_dat.adjusted_mass_lb,
+                              reference.adjusted_mass_lb)
+        assert np.array_equal(raw_dat.thrust_lb, reference.thrust_lb)
+
+    # Reloaded columns are read-only views of the memory maps
+    assert not second.time_s.flags.writeable
+    assert isinstance(second.time_s.base, np.memmap)
+
+
+def test_stale_entry_is_ignored(tmp_path):
+    csv_path = str(tmp_path / 'sample.csv')
+    shutil.copyfile(SAMPLE_DAQ_PATH, csv_path)
+
+    cache = DAQCache(str(tmp_path / 'cache'))
+    cache.save(csv_path, [np.arange(3.0)] * len(COLUMN_NAMES))
+    assert np.array_equal(cache.load(csv_path)[0], np.arange(3.0))
+
+    with open(csv_path, 'a') as csv_file:
+        csv_file.write('1000.0,1,2,3\n')
+
+    assert cache.load(csv_path) is None
+
+
+def test_unwritable_cache(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / 'sample.csv')
+    shutil.copyfile(SAMPLE_DAQ_PATH, csv_path)
+    reference = CSVExtractor().extract_data_to_raw_DAQ(csv_path)
+    not_a_dir = tmp_path / 'not_a_dir'
+    not_a_dir.write_text('')
+
+    ext = CSVExtractor()
+    ext.set_cache_mode(True, cache_dir=str(not_a_dir))
+    assert np.array_equal(ext.extract_data_to_raw_DAQ(
+        csv_path).time_s, reference.time_s)
+
+    # As when the disk fills up while the entry is written
+    def no_space_left(*args, **kwargs):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(np, 'save', no_space_left)
+    ext.set_cache_mode(True)
+    assert np.array_equal(ext.extract_data_to_raw_DAQ(
+        csv_path).time_s, reference.time_s)
+    assert not DAQCache().save(
+        csv_path, [reference.time_s] * len(COLUMN_NAMES))
+    assert sorted(os.listdir(tmp_path)) == ['not_a_dir', 'sample.csv']
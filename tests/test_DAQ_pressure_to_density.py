@@ -58,3 +58,75 @@ def test_with_sample_file():
                                rtol=ERROR_TOLERANCE)
             assert np.allclose(dpd_object.gas_density_kg_m3[idx], float(current_line_split[6]),
                                rtol=ERROR_TOLERANCE)
+
+
+def test_newton_temperature_solver():
+    from DAQ_raw import DAQRaw
+
+    consts = ConstsM('tests/test_constants.yaml')
+    pressures_psig = np.linspace(50, 1000, 500)
+    raw_dat = DAQRaw(np.arange(500), pressures_psig, np.zeros(500), np.zeros(500),
+                     consts.test_conditions)
+
+    interp_dpd = dpd(raw_dat, i_constants=consts)
+    consts.solver_options = dict(
+        consts.solver_options, temperature_solver='newton')
+    newton_dpd = dpd(raw_dat, i_constants=consts)
+
+    # The 0.1 degree table is accurate to well within a millikelvin
+    critical_temp = consts.nitrous_oxide_properties['critical_temp']
+    assert np.allclose(newton_dpd.t_reduced*critical_temp, interp_dpd.t_reduced*critical_temp,
+                       atol=1e-3, rtol=0)
+    assert np.allclose(newton_dpd.density_liquid_kg_m3, interp_dpd.density_liquid_kg_m3,
+                       rtol=ERROR_TOLERANCE)
+
+
+def test_calculate_densities():
+    consts = ConstsM('tests/test_constants.yaml')
+    eqn4_2_consts = consts.equation_constants['eqn4_2']
+    eqn4_3_consts = consts.equation_constants['eqn4_3']
+    critical_density = consts.nitrous_oxide_properties['critical_density']
+
+    t_reduced = np.linspace(0.55, 1.0, 1000)
+    one_minus_t_reduced = 1 - t_reduced
+    recip_t_reduced_minus_one = 1 / t_reduced - 1
+
+    liquid_ref = dpd.eqn4_2(one_minus_t_reduced,
+                            eqn4_2_consts, critical_density)
+    gas_ref = dpd.eqn4_3(recip_t_reduced_minus_one,
+                         eqn4_3_consts, critical_density)
+
+    liquid, gas = dpd.calculate_densities(one_minus_t_reduced, recip_t_reduced_minus_one,
+                                          eqn4_2_consts, eqn4_3_consts, critical_density)
+    assert np.allclose(liquid, liquid_ref, rtol=1e-12)
+    assert np.allclose(gas, gas_ref, rtol=1e-12)
+
+    liquid_32, gas_32 = dpd.calculate_densities(one_minus_t_reduced, recip_t_reduced_minus_one,
+                                                eqn4_2_consts, eqn4_3_consts,
+                                                critical_density, dtype=np.float32)
+    assert liquid_32.dtype == np.float32 and gas_32.dtype == np.float32
+    assert np.allclose(liquid_32, liquid_ref, rtol=1e-5)
+    assert np.allclose(gas_32, gas_ref, rtol=1e-5)
+
+
+def test_unique_pressures():
+    from DAQ_raw import DAQRaw
+
+    consts = ConstsM('tests/test_constants.yaml')
+    # Quantised readings: 4000 samples over 40 distinct pressures
+    pressures_psig = np.repeat(np.linspace(300, 700, 40), 100)
+    np.random.default_rng(0).shuffle(pressures_psig)
+    raw_dat = DAQRaw(np.arange(4000), pressures_psig, np.zeros(4000), np.zeros(4000),
+                     consts.test_conditions)
+
+    full = dpd(raw_dat, i_constants=consts)
+    assert full.unique_pressure_stats is None
+
+    consts.solver_options = dict(consts.solver_options, unique_pressures=True)
+    memoised = dpd(raw_dat, i_constants=consts)
+
+    assert memoised.unique_pressure_stats == {'samples': 4000, 'unique_pressures': 40,
+                                              'work_saved': 0.99}
+    for field in ('t_reduced', 'one_minus_t_reduced', 'reciprocal_t_reduced_minus_one',
+                  'density_liquid_kg_m3', 'gas_density_kg_m3'):
+        assert np.array_equal(getattr(memoised, field), getattr(full, field))
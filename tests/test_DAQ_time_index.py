@@ -0,0 +1,118 @@
+import os
+import shutil
+import numpy as np
+import pytest
+
+from calculator_main import find_time_references
+from csv_extractor import CSVExtractor
+from DAQ_time_index import DAQTimeIndex
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+T_START = 390.0
+T_END = 395.1
+
+
+def expected_window(raw_dat, downsample):
+    row_numbers = np.arange(1, raw_dat.data_size + 1)
+    mask = ((raw_dat.time_s >= T_START) & (raw_dat.time_s <= T_END)
+            & (row_numbers % downsample == 0))
+    return raw_dat.time_s[mask], raw_dat.thrust_lb[mask]
+
+
+def test_build_and_locate(tmp_path):
+    csv_path = str(tmp_path / 'sample.csv')
+    shutil.copyfile(SAMPLE_DAQ_PATH, csv_path)
+
+    index = DAQTimeIndex.build(csv_path, 0, stride=16)
+    full = CSVExtractor().extract_data_to_raw_DAQ(csv_path)
+
+    assert np.array_equal(
+        index.row_numbers, np.arange(1, full.data_size + 1, 16))
+    assert np.array_equal(index.times, full.time_s[::16])
+
+    # Every indexed offset points at the start of its row
+    with open(csv_path, 'rb') as csv_file:
+        for offset, time in zip(index.offsets, index.times):
+            csv_file.seek(offset)
+            assert float(csv_file.readline().split(b',')[0]) == time
+
+    row_number, _ = index.locate(T_START)
+    assert full.time_s[row_number - 1] < T_START
+    assert full.time_s[row_number - 1 + 16] >= T_START
+    assert index.locate(0) == (1, index.offsets[0])
+
+
+def test_windowed_extraction(tmp_path):
+    csv_path = str(tmp_path / 'sample.csv')
+    shutil.copyfile(SAMPLE_DAQ_PATH, csv_path)
+    full = CSVExtractor().extract_data_to_raw_DAQ(csv_path)
+
+    cached_ext = CSVExtractor()
+    cached_ext.set_cache_mode(True, cache_dir=str(tmp_path / 'cache'))
+
+    for ext in (CSVExtractor(), cached_ext):
+        for downsample in (1, 3):
+            window = ext.extract_data_to_raw_DAQ(csv_path, downsample=downsample,
+                                                 t_start=T_START, t_end=T_END)
+            times, thrusts = expected_window(full, downsample)
+
+            assert len(times) > 0
+            assert np.array_equal(window.time_s, times)
+            assert np.array_equal(window.thrust_lb, thrusts)
+
+    assert os.path.isfile(DAQTimeIndex.index_path(csv_path))
+
+
+def test_time_references(tmp_path):
+    csv_path = str(tmp_path / 'sample.csv')
+    shutil.copyfile(SAMPLE_DAQ_PATH, csv_path)
+    # A short stride, so that the end of burn is sought to
+    DAQTimeIndex.build(csv_path, 0, stride=16).save(
+        DAQTimeIndex.index_path(csv_path))
+
+    cached_ext = CSVExtractor()
+    cached_ext.set_cache_mode(True, cache_dir=str(tmp_path / 'cache'))
+    cached_ext.extract_data_to_raw_DAQ(csv_path)
+
+    # The same as when the whole time column is scanned
+    for ext in (CSVExtractor(), cached_ext):
+        for downsample, end_of_burn_s in ((1, T_END), (1, 385.05), (2, T_END), (3, 390.1)):
+            assert ext.find_time_references(csv_path, end_of_burn_s, downsample) == \
+                find_time_references(
+                    csv_path, end_of_burn_s, downsample=downsample)
+        with pytest.raises(ValueError, match='end of burn'):
+            ext.find_time_references(csv_path, T_END, downsample=3)
+
+
+def test_blank_lines(tmp_path):
+    with open(SAMPLE_DAQ_PATH) as sample_file:
+        lines = sample_file.readlines()
+    csv_path = str(tmp_path / 'blank.csv')
+    with open(csv_path, 'w') as csv_file:
+        csv_file.write(''.join(lines[:40]) + '\n' + ''.join(lines[40:200]) + '\r\n'
+                       + ''.join(lines[200:]) + '\n')
+    full = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+
+    # Blank lines are not data rows, so they do not shift the indexed row numbers either
+    index = DAQTimeIndex.build(csv_path, 0, stride=16)
+    assert np.array_equal(index.times, full.time_s[::16])
+
+    assert CSVExtractor().extract_data_to_raw_DAQ(
+        csv_path).data_size == full.data_size
+    for downsample in (1, 3):
+        window = CSVExtractor().extract_data_to_raw_DAQ(csv_path, downsample=downsample,
+                                                        t_start=T_START, t_end=T_END)
+        assert np.array_equal(
+            window.time_s, expected_window(full, downsample)[0])
+
+
+def test_unwritable_index_dir(tmp_path):
+    csv_path = str(tmp_path / 'sample.csv')
+    shutil.copyfile(SAMPLE_DAQ_PATH, csv_path)
+    not_a_dir = tmp_path / 'not_a_dir'
+    not_a_dir.write_text('')
+
+    index = DAQTimeIndex.for_file(
+        csv_path, 0, index_dir=str(not_a_dir), stride=16)
+    assert index.locate(T_START)[1] is not None
+    assert sorted(os.listdir(tmp_path)) == ['not_a_dir', 'sample.csv']
@@ -0,0 +1,96 @@
+import os
+import shutil
+
+import pytest
+
+from batch_main import execute_batch, find_DAQ_files, main, pool_context
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+CONSTANTS_PATH = 'tests/test_constants.yaml'
+
+
+def test_execute_batch(tmp_path):
+    for name in ('fire_a.csv', 'fire_b.csv'):
+        shutil.copyfile(SAMPLE_DAQ_PATH, tmp_path / name)
+    with open(tmp_path / 'broken.csv', 'w') as broken_file:
+        broken_file.write(
+            'Time (s),Tank pressure (psig),Recorded mass (lb),Thrust (lb)\n1,x,2,3\n')
+
+    paths = find_DAQ_files([str(tmp_path)])
+    assert [path.rsplit('/', 1)[-1] for path in paths] == ['broken.csv', 'fire_a.csv',
+                                                           'fire_b.csv']
+
+    results = execute_batch(paths, CONSTANTS_PATH, output_dir=str(tmp_path / 'out'), jobs=2,
+                            report=lambda result: None)
+
+    assert [result['status'] for result in results] == ['failed', 'ok', 'ok']
+    assert 'ValueError' in results[0]['error']
+
+    with open(SAMPLE_DAQ_PATH) as sample_file:
+        n_rows = len(sample_file.readlines()) - 1
+    for result in results[1:]:
+        with open(result['target_path']) as xml_file:
+            assert len(xml_file.readlines()) == n_rows
+
+
+def test_worker_crash_calculates_again(tmp_path):
+    import multiprocessing
+
+    for name in ('fire_a.csv', 'fire_b.csv', 'fire_c.csv', 'fire_d.csv'):
+        shutil.copyfile(SAMPLE_DAQ_PATH, tmp_path / name)
+    paths = find_DAQ_files([str(tmp_path)])
+
+    reported = []
+
+    def kill_workers(result):
+        # The workers die once the first file is done, while the others wait for them
+        if not reported:
+            for process in multiprocessing.active_children():
+                process.kill()
+        reported.append(result)
+
+    results = execute_batch(paths, CONSTANTS_PATH, jobs=2, report=kill_workers)
+
+    assert [result['status'] for result in results] == ['ok'] * 4
+    assert sorted(result['data_file_path'] for result in reported) == paths
+    for path in paths:
+        assert os.path.exists(path[:-len('.csv')] + '.xml')
+
+
+def test_main_exit_code(tmp_path):
+    shutil.copyfile(SAMPLE_DAQ_PATH, tmp_path / 'fire.csv')
+
+    assert main([str(tmp_path / '*.csv'), '-c',
+                CONSTANTS_PATH, '-j', '1']) == 0
+    assert (tmp_path / 'fire.xml').exists()
+    assert main([str(tmp_path / 'missing.csv'), '-c',
+                CONSTANTS_PATH, '-j', '1']) == 1
+
+
+def test_output_name_collision(tmp_path):
+    for run in ('a', 'b'):
+        os.makedirs(tmp_path / run)
+        shutil.copyfile(SAMPLE_DAQ_PATH, tmp_path / run / 'test.csv')
+    paths = find_DAQ_files([str(tmp_path / 'a'), str(tmp_path / 'b')])
+
+    with pytest.raises(ValueError, match='same xml'):
+        execute_batch(paths, CONSTANTS_PATH, output_dir=str(tmp_path / 'out'), jobs=1,
+                      report=lambda result: None)
+    assert not (tmp_path / 'out').exists()
+
+    assert main([str(tmp_path / 'a'), str(tmp_path / 'b'), '-c', CONSTANTS_PATH,
+                 '-o', str(tmp_path / 'out'), '-j', '1']) == 1
+    # Saved next to each input, they do not collide
+    assert main([str(tmp_path / 'a'), str(tmp_path / 'b'), '-c', CONSTANTS_PATH,
+                 '-j', '1']) == 0
+
+
+def test_pool_context_without_fork_server(monkeypatch):
+    import multiprocessing
+
+    assert pool_context().get_start_method() in multiprocessing.get_all_start_methods()
+
+    # As on Windows
+    monkeypatch.setattr(
+        multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+    assert pool_context().get_start_method() == 'spawn'
@@ -0,0 +1,136 @@
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pytest
+
+from constants import ConstantsManager as ConstsM
+
+
+def count_parses(monkeypatch):
+    parses = []
+    original = ConstsM.parse_config.__func__
+
+    def counted(cls, path):
+        parses.append(path)
+        return original(cls, path)
+
+    monkeypatch.setattr(ConstsM, 'parse_config', classmethod(counted))
+    ConstsM.clear_cache()
+    return parses
+
+
+def test_shared_and_read_only():
+    first = ConstsM('tests/test_constants.yaml')
+    second = ConstsM('tests/test_constants.yaml')
+
+    assert first is not second
+    assert first.tank_dimensions_meters is second.tank_dimensions_meters
+    with pytest.raises(TypeError):
+        first.nitrous_oxide_properties['critical_temp'] = 0
+    with pytest.raises(ValueError):
+        first.tank_dimensions_meters['volume'][0] = 0
+
+    # Replacing a field only affects that manager
+    first.solver_options = dict(
+        first.solver_options, temperature_solver='newton')
+    assert second.solver_options['temperature_solver'] == 'interp'
+
+
+def test_reloaded_when_modified(tmp_path, monkeypatch):
+    parses = count_parses(monkeypatch)
+    path = os.path.join(tmp_path, 'constants.yaml')
+    shutil.copy('tests/test_constants.yaml', path)
+
+    ConstsM(path)
+    ConstsM(path)
+    assert len(parses) == 1
+
+    with open(path, 'a') as config_file:
+        config_file.write('\n')
+    ConstsM(path)
+    assert len(parses) == 2
+
+
+def test_full_system_parses_once(tmp_path, monkeypatch):
+    from calculator_main import execute_calculation
+
+    parses = count_parses(monkeypatch)
+    execute_calculation('tests/sample_files/sample_DAQ_file.csv',
+                        os.path.join(tmp_path, 'output.xml'), suppress_printout=True)
+    assert parses == [os.path.realpath(ConstsM.DEFAULT_PATH)]
+
+
+def test_pickle():
+    consts = ConstsM('tests/test_constants.yaml')
+    copied = pickle.loads(pickle.dumps(consts))
+
+    assert copied.engine_info == consts.engine_info
+    assert np.array_equal(copied.tank_dimensions_meters['volume'],
+                          consts.tank_dimensions_meters['volume'])
+    with pytest.raises(TypeError):
+        copied.engine_info['initWt'] = 1
+
+
+def test_with_overrides():
+    consts = ConstsM('tests/test_constants.yaml')
+    changed = consts.with_overrides(end_of_burn=400.0, length=[1.0] * 5)
+
+    assert changed.test_conditions['end_of_burn'] == 400.0
+    assert consts.test_conditions['end_of_burn'] != 400.0
+    assert changed.test_conditions['local_atmos_pressure'] == \
+        consts.test_conditions['local_atmos_pressure']
+    assert np.isclose(
+        changed.tank_dimensions_meters['total_length'], 5 / 39.37007874)
+    assert changed.engine_info is consts.engine_info
+    with pytest.raises(TypeError):
+        changed.test_conditions['end_of_burn'] = 1
+
+    # Unchanged values keep the field shared
+    same = consts.with_overrides(
+        end_of_burn=consts.test_conditions['end_of_burn'])
+    assert same.test_conditions is consts.test_conditions
+
+    for key in ('radius', 'no_such_constant'):
+        with pytest.raises(ValueError):
+            consts.with_overrides(**{key: 1})
+
+
+def test_compiled_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(ConstsM, 'compiled_cache_dir',
+                        os.path.join(tmp_path, 'compiled'))
+    path = os.path.join(tmp_path, 'constants.yaml')
+    shutil.copy('tests/test_constants.yaml', path)
+
+    data = ConstsM.read_config_data(path)
+    compiled_path = ConstsM.compiled_path(path)
+    assert os.path.exists(compiled_path) and not os.path.exists(
+        path + '.compiled.json')
+    assert ConstsM.read_config_data(path) == data
+
+    # Data that JSON would change is never compiled, so it is always read as parsed
+    with open(path, 'a') as config_file:
+        config_file.write('\nExtra:\n    1: !!python/tuple [1.0, 2.0]\n')
+    data = ConstsM.read_config_data(path)
+    assert data['Extra'] == {1: (1.0, 2.0)}
+    assert ConstsM.read_config_data(path)['Extra'] == {1: (1.0, 2.0)}
+    with open(compiled_path) as compiled_file:
+        assert 'Extra' not in compiled_file.read()
+
+
+def test_compiled_copies_evicted(tmp_path, monkeypatch):
+    compiled_dir = os.path.join(tmp_path, 'compiled')
+    monkeypatch.setattr(ConstsM, 'compiled_cache_dir', compiled_dir)
+    paths = []
+    for idx in range(3):
+        paths.append(os.path.join(tmp_path, f'constants_{idx}.yaml'))
+        shutil.copy('tests/test_constants.yaml', paths[-1])
+        ConstsM.read_config_data(paths[-1])
+        os.utime(ConstsM.compiled_path(paths[-1]), (idx, idx))
+
+    # Reading a compiled copy makes it the most recently used one
+    ConstsM.read_config_data(paths[0])
+    ConstsM.evict_compiled(compiled_dir, max_files=2)
+    assert sorted(os.listdir(compiled_dir)) == sorted(
+        os.path.basename(ConstsM.compiled_path(path)) for path in (paths[0], paths[2]))
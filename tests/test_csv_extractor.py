@@ -0,0 +1,115 @@
+import csv
+import numpy as np
+
+from csv_extractor import CSVExtractor, CSVTail, ColumnBuffer
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+
+
+def read_reference_columns(file_path, downsample=1):
+    with open(file_path, newline='') as csvfile:
+        rows = list(csv.reader(csvfile))[1:]
+
+    kept = [row for row_idx, row in enumerate(
+        rows, start=1) if row_idx % downsample == 0]
+    return [np.array([row[col] for row in kept], dtype=float) for col in range(4)]
+
+
+def test_find_column_indices():
+    assert CSVExtractor.find_column_indices(
+        ['Time (s)', 'Tank pressure (psig)', 'Recorded mass (lb)', 'Thrust (lb)']) == (0, 1, 2, 3)
+
+    assert CSVExtractor.find_column_indices(
+        [' thrust (LB) ', 'Extra', 'TIME (S)', 'Recorded mass (lb)',
+         'Tank pressure (psig)']) == (2, 4, 3, 0)
+
+    # Missing labels fall back to the first four columns
+    assert CSVExtractor.find_column_indices(
+        ['a', 'b', 'c', 'd']) == (0, 1, 2, 3)
+
+
+def test_column_buffer_growth():
+    buffer = ColumnBuffer(2, initial_capacity=3)
+    for start in range(0, 10, 4):
+        block = np.arange(start, start + 4, dtype=float)
+        buffer.append_block(np.column_stack((block, -block)))
+
+    first, second = buffer.finalize()
+    assert np.array_equal(first, np.arange(12))
+    assert np.array_equal(second, -np.arange(12))
+
+
+def test_parse_rows_across_chunks():
+    rows = [[str(idx), 'skip', str(2*idx)] for idx in range(25)]
+
+    times, doubled = CSVExtractor.parse_rows(iter(rows), (0, 2), chunk_rows=4)
+
+    assert np.array_equal(times, np.arange(25))
+    assert np.array_equal(doubled, 2*np.arange(25))
+
+
+def test_extract_data_to_raw_DAQ():
+    ext = CSVExtractor()
+
+    for downsample in (1, 10):
+        raw_dat = ext.extract_data_to_raw_DAQ(
+            SAMPLE_DAQ_PATH, downsample=downsample)
+        reference = read_reference_columns(SAMPLE_DAQ_PATH, downsample)
+
+        assert raw_dat.data_size == len(reference[0])
+        assert np.array_equal(raw_dat.time_s, reference[0])
+        assert np.array_equal(raw_dat.tank_pressure_psig, reference[1])
+        assert np.array_equal(raw_dat.recorded_mass_lb, reference[2])
+        assert np.array_equal(raw_dat.thrust_lb, reference[3])
+
+
+def test_extract_stream_to_raw_DAQ():
+    reference = read_reference_columns(SAMPLE_DAQ_PATH, downsample=3)
+
+    with open(SAMPLE_DAQ_PATH, newline='') as csvfile:
+        raw_dat = CSVExtractor().extract_stream_to_raw_DAQ(csvfile, downsample=3)
+    assert np.array_equal(raw_dat.time_s, reference[0])
+    assert np.array_equal(raw_dat.thrust_lb, reference[3])
+
+    t_start, t_end = reference[0][10], reference[0][20]
+    with open(SAMPLE_DAQ_PATH, newline='') as csvfile:
+        windowed = CSVExtractor().extract_stream_to_raw_DAQ(csvfile, 3, t_start, t_end)
+    assert np.array_equal(windowed.time_s, reference[0][10:21])
+
+
+def test_iter_stream_chunks():
+    reference = CSVExtractor().read_columns(SAMPLE_DAQ_PATH, downsample=2)
+
+    with open(SAMPLE_DAQ_PATH, newline='') as csvfile:
+        chunks = list(CSVExtractor().iter_stream_chunks(
+            csvfile, chunk_rows=50, downsample=2))
+    assert [len(chunk[0]) for chunk in chunks[:-1]] == [50] * (len(chunks) - 1)
+    for column, reference_column in zip(zip(*chunks), reference):
+        assert np.array_equal(np.concatenate(column), reference_column)
+
+    with open(SAMPLE_DAQ_PATH, newline='') as csvfile:
+        times = [chunk for chunk in CSVExtractor().iter_stream_chunks(
+            csvfile, chunk_rows=50, downsample=2, t_start=386, time_only=True)]
+    assert all(len(chunk) == 1 for chunk in times)
+    assert np.array_equal(np.concatenate([chunk[0] for chunk in times]),
+                          reference[0][reference[0] >= 386])
+
+
+def test_tail_reads_complete_lines(tmp_path):
+    data_path = tmp_path / 'growing.csv'
+    tail = CSVTail(str(data_path), max_rows=2)
+    assert tail.read_new_columns() is None
+
+    data_path.write_bytes(b'Thrust (lb),Time (s),Tank pressure (psig),Recorded mass (lb)\n'
+                          b'1,0.0,700,50\n2,0.1,7')
+    time_s, pressure, _, thrust = tail.read_new_columns()
+    assert time_s.tolist() == [0.0] and thrust.tolist() == [1.0]
+    assert tail.read_new_columns() is None
+
+    with open(data_path, 'ab') as data_file:
+        data_file.write(b'01,49\n3,0.2,702,48\n4,0.3,703,47\n')
+    time_s, pressure, _, _ = tail.read_new_columns()
+    assert time_s.tolist() == [0.1, 0.2] and pressure.tolist() == [
+        701.0, 702.0]
+    assert tail.read_new_columns()[0].tolist() == [0.3]
+    assert tail.read_new_columns() is None
@@ -93,3 +93,12 @@ def test_with_sample_file():
             ecg.propellant_mass_lb[idx], float(current_line_split[9]), rtol=ERROR_TOLERANCE)
         assert np.allclose(
             ecg.propellant_CG_in[idx], float(current_line_split[10]), rtol=ERROR_TOLERANCE)
+
+
+def test_calculate_fuel_mass_between():
+    cm = CM('tests/test_constants.yaml')
+    time = np.linspace(2, 6, 9)
+
+    # A chunk of the data refers to the start and end of burn of the whole recording
+    assert np.array_equal(ECG.calculate_fuel_mass_between(time[4:], cm.engine_info, 2, 5),
+                          ECG.calculate_fuel_mass_values(time, cm.engine_info, 6)[4:])
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pytest
+
+from constants import ConstantsManager as ConstsM
+from equation_of_state import EOS_BACKENDS
+from equation_of_state import SaturationTable
+from equation_of_state import eos_backend_for
+from equation_of_state import register_eos_backend
+
+
+def write_table_from_correlation(path, consts, pressures_psia):
+    correlation = EOS_BACKENDS['correlation'](consts)
+    t_kelvin, liquid, gas = correlation.saturation_properties(pressures_psia)
+    with open(path, 'w') as table_file:
+        # Columns out of order, and rows in decreasing pressure
+        table_file.write('temperature_k,pressure_psia,density_vapour_kg_m3,' +
+                         'density_liquid_kg_m3\n')
+        for row in reversed(list(zip(t_kelvin, pressures_psia, gas, liquid))):
+            table_file.write(','.join(repr(float(value))
+                             for value in row) + '\n')
+
+
+def test_correlation_is_default():
+    consts = ConstsM('tests/test_constants.yaml')
+    assert consts.solver_options['eos_backend'] == 'correlation'
+    assert type(eos_backend_for(consts)) is EOS_BACKENDS['correlation']
+
+
+def test_tabulated_backend(tmp_path):
+    from DAQ_raw import DAQRaw
+    from DAQ_pressure_to_density import DAQPressureToDensity as DPD
+
+    consts = ConstsM('tests/test_constants.yaml')
+    table_path = os.path.join(tmp_path, 'saturation.csv')
+    write_table_from_correlation(
+        table_path, consts, np.linspace(20, 1050, 2000))
+
+    pressures_psig = np.linspace(50, 1000, 500)
+    raw_dat = DAQRaw(np.arange(500), pressures_psig, np.zeros(500), np.zeros(500),
+                     consts.test_conditions)
+    correlation = DPD(raw_dat, i_constants=consts)
+
+    consts.solver_options = dict(consts.solver_options, eos_backend='tabulated',
+                                 eos_table_path=table_path)
+    tabulated = DPD(raw_dat, i_constants=consts)
+
+    for field in ('t_reduced', 'density_liquid_kg_m3', 'gas_density_kg_m3'):
+        assert np.allclose(getattr(tabulated, field),
+                           getattr(correlation, field), rtol=1e-4)
+
+    # The table is loaded once, and shared by every instance
+    assert DPD(raw_dat, i_constants=consts).eos.table is tabulated.eos.table
+    assert not tabulated.eos.table.pressure_psia.flags.writeable
+
+
+def test_saturation_table_reloaded_when_modified(tmp_path):
+    consts = ConstsM('tests/test_constants.yaml')
+    table_path = os.path.join(tmp_path, 'saturation.csv')
+    write_table_from_correlation(table_path, consts, np.linspace(20, 1050, 10))
+    first = SaturationTable.shared(table_path)
+
+    write_table_from_correlation(table_path, consts, np.linspace(20, 1050, 20))
+    os.utime(table_path, ns=(0, 0))
+    second = SaturationTable.shared(table_path)
+    assert second is not first and len(second.pressure_psia) == 20
+
+
+def test_saturation_table_errors(tmp_path):
+    table_path = os.path.join(tmp_path, 'saturation.csv')
+    with open(table_path, 'w') as table_file:
+        table_file.write(
+            'pressure_psia,temperature_k,density_liquid_kg_m3\n100,250,1000\n')
+    with pytest.raises(ValueError):
+        SaturationTable.load(table_path)
+
+    with open(table_path, 'w') as table_file:
+        table_file.write('pressure_psia,temperature_k,density_liquid_kg_m3,' +
+                         'density_vapour_kg_m3\n100,250,1000,10\n100,251,990,11\n')
+    with pytest.raises(ValueError):
+        SaturationTable.load(table_path)
+
+
+def test_backend_registry():
+    consts = ConstsM('tests/test_constants.yaml')
+
+    @register_eos_backend('test_constant')
+    class ConstantEOS:
+        def __init__(self, consts_m):
+            self.consts_m = consts_m
+
+    try:
+        consts.solver_options = dict(
+            consts.solver_options, eos_backend='test_constant')
+        assert type(eos_backend_for(consts)) is ConstantEOS
+
+        consts.solver_options = dict(
+            consts.solver_options, eos_backend='unknown')
+        with pytest.raises(ValueError):
+            eos_backend_for(consts)
+    finally:
+        del EOS_BACKENDS['test_constant']
+
+
+def test_correlation_densities():
+    consts = ConstsM('tests/test_constants.yaml')
+    eos = eos_backend_for(consts)
+    nos_props = consts.nitrous_oxide_properties
+
+    pressures_psia = np.linspace(200, 900, 50)
+    t_kelvin, density_liquid, density_gas = eos.saturation_properties(
+        pressures_psia)
+    t_reduced = t_kelvin / nos_props['critical_temp']
+
+    assert np.allclose(density_liquid,
+                       eos.eqn4_2(1 - t_reduced, consts.equation_constants['eqn4_2'],
+                                  nos_props['critical_density']), rtol=1e-12)
+    assert np.allclose(density_gas,
+                       eos.eqn4_3(1 / t_reduced - 1, consts.equation_constants['eqn4_3'],
+                                  nos_props['critical_density']), rtol=1e-12)
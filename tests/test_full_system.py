@@ -1,3 +1,4 @@
+import shutil
 import xml.etree.ElementTree as ET
 import numpy as np
 
@@ -6,6 +7,13 @@ from calculator_main import execute_calculation
 ERROR_TOLERANCE = 0.001
 
 
+def copy_sample(tmp_path):
+    # Windowed runs save a time index next to the DAQ file, which must not be the fixture
+    data_path = str(tmp_path / 'sample_DAQ_file.csv')
+    shutil.copyfile('tests/sample_files/sample_DAQ_file.csv', data_path)
+    return data_path
+
+
 def test_full_system():
     xml_from_string = ET.fromstring
 
@@ -27,3 +35,62 @@ def test_full_system():
 
     correct_file.close()
     new_file.close()
+
+
+def test_chunked_calculation(tmp_path):
+    from calculator_main import execute_chunked_calculation
+
+    data_path = copy_sample(tmp_path)
+    for options in ({}, {'downsample': 2, 't_start': 386}):
+        execute_calculation(data_path, str(tmp_path / 'full.xml'), suppress_printout=True,
+                            **options)
+        execute_chunked_calculation(data_path, str(tmp_path / 'chunked.xml'),
+                                    suppress_printout=True, chunk_rows=7, **options)
+
+        with open(tmp_path / 'full.xml') as full_file, \
+                open(tmp_path / 'chunked.xml') as chunked_file:
+            assert chunked_file.readlines() == full_file.readlines()
+
+
+def test_window_same_as_full_run(tmp_path):
+    from calculator_main import execute_chunked_calculation
+
+    data_path = copy_sample(tmp_path)
+    execute_calculation(data_path, str(
+        tmp_path / 'full.xml'), suppress_printout=True)
+    with open(tmp_path / 'full.xml') as full_file:
+        full_lines = full_file.readlines()
+
+    # The second window ends before the end of burn, at 395.1 s
+    for t_start, t_end in ((392, 396), (390, 395)):
+        execute_calculation(data_path, str(tmp_path / 'window.xml'), suppress_printout=True,
+                            t_start=t_start, t_end=t_end)
+        execute_chunked_calculation(data_path, str(tmp_path / 'chunked.xml'),
+                                    suppress_printout=True, chunk_rows=7, t_start=t_start,
+                                    t_end=t_end)
+
+        first = round((t_start - 385.05) / 0.05)
+        last = round((t_end - 385.05) / 0.05)
+        with open(tmp_path / 'window.xml') as window_file, \
+                open(tmp_path / 'chunked.xml') as chunked_file:
+            assert window_file.readlines() == full_lines[first:last + 1]
+            assert chunked_file.readlines() == full_lines[first:last + 1]
+
+
+def test_without_end_of_burn(tmp_path):
+    import pytest
+    from calculator_main import execute_chunked_calculation
+
+    # The sample file without its end of burn, at 395.1 s
+    with open('tests/sample_files/sample_DAQ_file.csv') as sample_file:
+        lines = sample_file.readlines()
+    data_path = str(tmp_path / 'no_end_of_burn.csv')
+    with open(data_path, 'w') as data_file:
+        data_file.writelines(lines[:150])
+
+    with pytest.raises(ValueError, match='end of burn'):
+        execute_chunked_calculation(data_path, str(tmp_path / 'chunked.xml'),
+                                    suppress_printout=True)
+    with pytest.raises(ValueError, match='end of burn'):
+        execute_calculation(data_path, str(tmp_path / 'window.xml'), suppress_printout=True,
+                            t_start=386, t_end=390)
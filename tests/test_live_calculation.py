@@ -0,0 +1,77 @@
+import numpy as np
+
+import live_main
+from csv_extractor import CSVExtractor
+from live_calculation import LiveCalculation, LIVE_COLUMNS, write_batch
+from pipeline import Pipeline
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+
+
+def test_rows_appended_in_pieces(tmp_path):
+    with open(SAMPLE_DAQ_PATH, 'rb') as sample_file:
+        lines = sample_file.read().splitlines(keepends=True)
+    data_path = str(tmp_path / 'live.csv')
+    live = LiveCalculation(data_path, max_batch_rows=100)
+    assert live.poll() is None
+
+    batches = []
+    with open(data_path, 'wb') as data_file:
+        # The header, the first 150 rows and half of the next one
+        data_file.write(b''.join(lines[:151]) + lines[151][:5])
+        data_file.flush()
+        while (batch := live.poll()) is not None:
+            batches.append(batch)
+        assert [batch['first_row'] for batch in batches] == [0, 100]
+        assert all(batch['provisional'] for batch in batches)
+
+        data_file.write(lines[151][5:] + b''.join(lines[152:]))
+        data_file.flush()
+        while (batch := live.poll()) is not None:
+            batches.append(batch)
+
+    # The end of burn is in the batch starting at row 200, which is the first final one
+    assert [batch['provisional'] for batch in batches] == [True, True, False] + \
+        [False] * (len(batches) - 3)
+    assert live.burn_closed
+    assert live.n_rows == len(lines) - 1
+
+    reference = Pipeline(
+        CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH))
+    assert np.array_equal(np.concatenate([batch['time_s'] for batch in batches]),
+                          reference['DAQ_raw'].time_s)
+    for stage_name, column in LIVE_COLUMNS:
+        assert np.allclose(np.concatenate([batch[column] for batch in batches]),
+                           getattr(reference[stage_name], column), rtol=1e-12, atol=0)
+
+    stats = live.latency_stats()
+    assert stats['batches'] == len(batches)
+    assert stats['rows'] == live.n_rows
+    assert 0 <= stats['p50_s'] <= stats['p95_s'] <= stats['max_s']
+
+
+def test_write_batch(tmp_path):
+    live = LiveCalculation(SAMPLE_DAQ_PATH, max_batch_rows=10)
+    output_path = tmp_path / 'live.csv'
+    with open(output_path, 'w') as output_file:
+        write_batch(output_file, live.poll(), header=True)
+
+    with open(output_path) as output_file:
+        rows = output_file.read().splitlines()
+    assert rows[0] == ','.join(('time_s',) + tuple(column for _, column in LIVE_COLUMNS)
+                               + ('provisional',))
+    assert len(rows) == 11
+    assert rows[1].endswith(',1')
+
+
+def test_main(tmp_path, capsys):
+    output_path = tmp_path / 'live.csv'
+    assert live_main.main([SAMPLE_DAQ_PATH, str(output_path), '--idle-timeout', '0',
+                           '--max-batch-rows', '64', '--stats']) == 0
+
+    with open(output_path) as output_file:
+        rows = output_file.read().splitlines()
+    with open(SAMPLE_DAQ_PATH) as sample_file:
+        assert len(rows) == len(sample_file.readlines())
+    assert rows[1].endswith(',1') and rows[-1].endswith(',0')
+    assert 'batches: ' in capsys.readouterr().err
@@ -0,0 +1,75 @@
+import io
+
+import numpy as np
+
+from main import main
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+CONSTANTS_PATH = 'constant_config.yaml'
+
+
+def test_xml_output(tmp_path):
+    target_path = tmp_path / 'output.xml'
+    assert main([SAMPLE_DAQ_PATH, str(target_path), '-c', CONSTANTS_PATH, '-q',
+                 '--stage-cache-dir', str(tmp_path / 'cache')]) == 0
+
+    with open(target_path) as xml_file, \
+            open('tests/sample_files/created_correct_xml.txt') as correct_file:
+        assert len(xml_file.readlines()) == len(correct_file.readlines())
+
+
+def test_stop_after_stage(tmp_path):
+    from csv_extractor import CSVExtractor
+    from NOS_mass_and_volume import NOSMassAndVolume
+
+    target_path = tmp_path / 'masses.csv'
+    main([SAMPLE_DAQ_PATH, str(target_path), '--stop-after', 'NOS_mass_and_volume', '-q',
+          '--no-stage-cache'])
+
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+    reference = NOSMassAndVolume(raw_dat)
+    with open(target_path) as csv_file:
+        header = csv_file.readline().strip().split(',')
+        data = np.loadtxt(csv_file, delimiter=',')
+
+    assert header == ['time_s', 'NOS_mass_kg', 'liquid_volume_m3', 'vapour_volume_m3',
+                      'liquid_mass_kg', 'vapour_mass_kg']
+    assert np.array_equal(data[:, 0], raw_dat.time_s)
+    assert np.array_equal(data[:, 5], reference.vapour_mass_kg)
+
+
+def test_chunk_rows(tmp_path):
+    target_path = tmp_path / 'output.csv'
+    reference_path = tmp_path / 'reference.csv'
+    assert main([SAMPLE_DAQ_PATH, str(target_path), '--stop-after', 'engine_CG', '-q',
+                 '--chunk-rows', '64']) == 0
+    main([SAMPLE_DAQ_PATH, str(reference_path), '--stop-after', 'engine_CG', '-q',
+          '--no-stage-cache'])
+
+    with open(target_path) as csv_file, open(reference_path) as reference_file:
+        assert csv_file.readlines() == reference_file.readlines()
+
+
+def test_stdin_to_stdout(monkeypatch, capsys):
+    with open(SAMPLE_DAQ_PATH) as sample_file:
+        monkeypatch.setattr('sys.stdin', io.StringIO(sample_file.read()))
+
+    main(['-', '-', '--stop-after', 'DAQ_raw', '--downsample', '2', '--t-start', '1',
+          '--no-stage-cache'])
+
+    captured = capsys.readouterr()
+    assert captured.err == 'calculation successful\n'
+    lines = captured.out.splitlines()
+    assert lines[0].startswith('time_s,tank_pressure_psig,')
+    times = [float(line.split(',')[0]) for line in lines[1:]]
+    assert times and min(times) >= 1
+
+
+def test_interactive(tmp_path, monkeypatch, capsys):
+    target_path = tmp_path / 'output.xml'
+    answers = iter([SAMPLE_DAQ_PATH, str(target_path)])
+    monkeypatch.setattr('builtins.input', lambda: next(answers))
+
+    assert main([]) == 0
+    assert target_path.exists()
+    assert 'calculation successful' in capsys.readouterr().out
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import pipeline
+from pipeline import Pipeline, STAGES, STAGE_DEFINITIONS
+from csv_extractor import CSVExtractor
+from NOS_mass_and_volume import NOSMassAndVolume
+from NOS_liquid_CG import NOSLiquidCG
+from NOS_vapour_CG import NOSVapourCG
+from engine_CG import EngineCG
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+
+
+def count_builds(monkeypatch):
+    counts = dict.fromkeys(STAGES, 0)
+    for stage in STAGE_DEFINITIONS.values():
+        if stage.build is None:
+            continue
+
+        def counted(*args, build=stage.build, name=stage.name):
+            counts[name] += 1
+            return build(*args)
+        monkeypatch.setattr(stage, 'build', counted)
+    return counts
+
+
+def test_stage_order():
+    for position, name in enumerate(STAGES):
+        for input_name in STAGE_DEFINITIONS[name].inputs:
+            assert STAGES.index(input_name) < position
+
+
+def test_only_needed_stages(monkeypatch):
+    counts = count_builds(monkeypatch)
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+    calculation = Pipeline(raw_dat)
+
+    assert calculation.plan('NOS_vapour_CG') == ['DAQ_pressure_to_density',
+                                                 'NOS_mass_and_volume', 'NOS_liquid_CG',
+                                                 'NOS_vapour_CG']
+
+    propellant_CG_in = calculation.get('engine_CG.propellant_CG_in')
+    assert calculation.calculated == list(STAGES[1:-1])
+    assert counts['engine_XML'] == 0
+    assert all(counts[name] == 1 for name in STAGES[1:-1])
+
+    # Stages shared by several consumers, or asked for again, are not calculated again
+    assert calculation['engine_CG'].propellant_CG_in is propellant_CG_in
+    assert calculation.plan('engine_XML') == ['engine_XML']
+    calculation.get('engine_XML')
+    assert all(counts[name] == 1 for name in STAGES[1:])
+
+    nmv = calculation['NOS_mass_and_volume']
+    assert nmv.DAQ_pressure_to_density_data is calculation['DAQ_pressure_to_density']
+    assert calculation['NOS_vapour_CG'].NOS_mass_and_volume_data is nmv
+
+
+def test_same_as_constructors():
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+    nmv = NOSMassAndVolume(raw_dat)
+    nlc = NOSLiquidCG(nmv)
+    reference = EngineCG(raw_dat, NOSVapourCG(nmv, nlc), nlc)
+
+    calculation = Pipeline(raw_dat)
+    for column in ('NOS_CG_in', 'fuel_mass_lb', 'propellant_mass_lb', 'propellant_CG_in'):
+        assert np.array_equal(calculation.get(f'engine_CG.{column}'),
+                              getattr(reference, column))
+
+
+def test_unknown_stage():
+    with pytest.raises(ValueError):
+        Pipeline(None).get('engine_thrust')
+
+    with pytest.raises(ValueError):
+        pipeline.register_stage('engine_thrust', inputs=('thrust_curve',))
+
+
+def test_set_constants():
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+    calculation = Pipeline(raw_dat)
+    calculation.get('engine_XML')
+    densities = calculation['DAQ_pressure_to_density']
+
+    consts = calculation.consts_m.with_overrides(fuel_grain_final_mass=2.0)
+    assert calculation.set_constants(consts) == ['engine_CG', 'engine_XML']
+    assert calculation.plan('engine_XML') == ['engine_CG', 'engine_XML']
+    engine_CG = calculation['engine_CG']
+    assert engine_CG.fuel_mass_lb[engine_CG.end_of_burn] == 2.0
+    assert calculation['DAQ_pressure_to_density'] is densities
+
+    # engine_XML was not calculated again since the constants changed
+    assert calculation.invalidate(['NOS_liquid_CG']) == ['NOS_liquid_CG', 'NOS_vapour_CG',
+                                                         'engine_CG']
+    assert calculation.set_data(raw_dat) == list(STAGES[1:3])
+    assert calculation['DAQ_raw'] is raw_dat
@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+import pytest
+
+import profiling
+from calculator_main import execute_chunked_calculation
+from main import main
+from pipeline import STAGES
+from profiling import StageProfiler, profile_calculation
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+
+
+def test_disabled_profiler_does_nothing():
+    assert profiling.measure('engine_CG') is profiling.measure('engine_XML')
+    profiling.record_output('engine_CG', np.zeros(3))
+
+
+def test_nested_stages():
+    with StageProfiler() as profiler:
+        with profiling.measure('outer'):
+            with profiling.measure('inner'):
+                inner = np.ones(1 << 17)
+                profiling.record_output('inner', [inner, 'not an array'])
+                del inner
+            small = np.ones(10)
+        with pytest.raises(RuntimeError):
+            StageProfiler().__enter__()
+
+    outer, inner = profiler.report()['stages']
+    assert (outer['name'], outer['depth'], inner['depth']) == ('outer', 0, 1)
+    assert inner['arrays'] == 1 and inner['array_bytes'] == 1 << 20
+    # The inner allocation counts towards the peak of the outer stage too
+    assert inner['peak_bytes'] >= 1 << 20
+    assert outer['peak_bytes'] >= inner['peak_bytes']
+    assert outer['wall_s'] >= inner['wall_s']
+    assert profiler.peak_bytes >= outer['peak_bytes']
+    assert small.sum() == 10
+
+
+def test_profile_calculation(tmp_path):
+    report = profile_calculation(SAMPLE_DAQ_PATH, str(tmp_path / 'output.xml'),
+                                 suppress_printout=True)
+    names = [stage['name']
+             for stage in report['stages'] if stage['depth'] == 0]
+    assert names == ['CSV_extractor'] + list(STAGES[1:]) + ['file_write']
+    assert all(stage['wall_s'] >= 0 and stage['cpu_s'] >= 0 and stage['peak_bytes'] > 0
+               for stage in report['stages'])
+    stages = {stage['name']: stage for stage in report['stages']}
+    assert stages['CSV_extractor']['arrays'] == 7
+    assert report['memory_traced']
+
+    with StageProfiler(trace_memory=False) as profiler:
+        execute_chunked_calculation(SAMPLE_DAQ_PATH, str(tmp_path / 'chunked.xml'),
+                                    suppress_printout=True, chunk_rows=100)
+    stages = {stage['name']: stage for stage in profiler.report()['stages']}
+    # Four chunks, the last extraction finding no rows
+    assert stages['engine_CG']['calls'] == 4
+    assert stages['CSV_extractor']['calls'] == 5
+    assert stages['engine_CG']['peak_bytes'] is None
+
+
+def test_stage_cache_save_measured_apart(tmp_path):
+    options = dict(suppress_printout=True, use_stage_cache=True,
+                   stage_cache_dir=str(tmp_path / 'cache'))
+    report = profile_calculation(SAMPLE_DAQ_PATH, str(tmp_path / 'output.xml'),
+                                 trace_memory=False, **options)
+    stages = {stage['name']: stage for stage in report['stages']}
+    # Saved once for each calculated stage, outside of the measurement of the stage
+    assert stages['stage_cache_save']['calls'] == len(STAGES) - 1
+    assert stages['stage_cache_save']['depth'] == 0
+
+    report = profile_calculation(SAMPLE_DAQ_PATH, str(tmp_path / 'output.xml'),
+                                 trace_memory=False, **options)
+    assert 'stage_cache_save' not in [stage['name']
+                                      for stage in report['stages']]
+
+
+def test_main_profile(tmp_path):
+    profile_path = tmp_path / 'profile.json'
+    assert main([SAMPLE_DAQ_PATH, str(tmp_path / 'output.xml'), '--no-stage-cache', '-q',
+                 '--profile', str(profile_path)]) == 0
+    with open(profile_path) as profile_file:
+        report = json.load(profile_file)
+    assert report['stages'][-1]['name'] == 'file_write'
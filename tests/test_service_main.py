@@ -0,0 +1,186 @@
+import asyncio
+import json
+import os
+import time
+
+from calculator_main import execute_calculation
+from service_main import MAX_LINE_BYTES, CalculationService
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+
+
+async def request(port, method, target, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'{method} {target} HTTP/1.1\r\nHost: localhost\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, chunked_body = response.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode().split('\r\n')
+    headers = dict(line.split(': ', 1) for line in header_lines)
+    body = b''
+    while True:
+        size_line, _, chunked_body = chunked_body.partition(b'\r\n')
+        size = int(size_line, 16)
+        if not size:
+            return int(status_line.split()[1]), headers, body
+        body += chunked_body[:size]
+        chunked_body = chunked_body[size + 2:]
+
+
+def exit_worker(delay_s):
+    time.sleep(delay_s)
+    os._exit(1)
+
+
+def run_service(scenario, **service_options):
+    async def run():
+        service = CalculationService(workers=1, **service_options)
+        server = await service.start(port=0)
+        try:
+            return await scenario(service, server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            service.close()
+    return asyncio.run(run())
+
+
+def test_calculate(tmp_path):
+    execute_calculation(SAMPLE_DAQ_PATH, str(tmp_path / 'reference.xml'),
+                        suppress_printout=True)
+    with open(tmp_path / 'reference.xml', 'rb') as reference_file:
+        reference = reference_file.read()
+    with open(SAMPLE_DAQ_PATH, 'rb') as sample_file:
+        payload = sample_file.read()
+
+    async def scenario(service, port):
+        responses = await asyncio.gather(
+            request(port, 'POST', '/calculate', payload),
+            request(port, 'POST', '/calculate?fuel_grain_final_mass=2.5', payload),
+            request(port, 'POST', '/calculate?stop_after=NOS_mass_and_volume&downsample=2',
+                    payload),
+            request(port, 'POST', '/calculate?t_start=390&t_end=395', payload),
+            request(port, 'POST', '/calculate?fuel_grain_mass=2.5', payload),
+            request(port, 'POST', '/calculate?stop_after=engine_thrust', payload),
+            request(port, 'GET', '/calculate'),
+            request(port, 'GET', '/unknown'))
+        return responses, (await request(port, 'GET', '/stats'))
+
+    responses, (_, _, stats) = run_service(scenario)
+    status, headers, body = responses[0]
+    assert status == 200
+    assert body == reference
+    assert headers['Content-Type'] == 'application/xml'
+    assert headers['Server-Timing'].startswith('calc;dur=')
+
+    status, _, body = responses[1]
+    assert status == 200 and body != reference and body.count(
+        b'\n') == reference.count(b'\n')
+
+    status, headers, body = responses[2]
+    assert status == 200 and headers['Content-Type'] == 'text/csv'
+    assert body.startswith(b'time_s,NOS_mass_kg,')
+
+    # A window refers to the start and end of burn of the whole recording
+    status, _, body = responses[3]
+    first = round((390 - 385.05) / 0.05)
+    assert status == 200
+    assert body.splitlines() == reference.splitlines()[first:first + 101]
+
+    assert [response[0] for response in responses[4:]] == [400, 400, 405, 404]
+    stats = json.loads(stats)
+    assert stats['completed'] == 4 and stats['failed'] == 1 and stats['pending'] == 0
+
+
+def test_queue_limit_and_timeout():
+    async def scenario(service, port):
+        service.pending = service.max_pending
+        rejected = await request(port, 'POST', '/calculate', b'TIME (S)\n')
+        service.pending = 0
+        # The only worker is busy, so the request times out while it waits for it
+        busy = service.executor.submit(time.sleep, 0.5)
+        timed_out = await request(port, 'POST', '/calculate', b'TIME (S)\n')
+        await asyncio.wrap_future(busy)
+        return rejected, timed_out, service.stats()
+
+    rejected, timed_out, stats = run_service(
+        scenario, max_queue=0, timeout_s=0)
+    assert rejected[0] == 503 and rejected[1]['Retry-After'] == '1'
+    assert timed_out[0] == 504
+    assert stats['rejected'] == 1 and stats['timed_out'] == 1
+
+
+def test_disconnected_client_is_cancelled():
+    with open(SAMPLE_DAQ_PATH, 'rb') as sample_file:
+        payload = sample_file.read()
+
+    async def scenario(service, port):
+        # The only worker is busy, so the client disconnects while the request waits for it
+        busy = service.executor.submit(time.sleep, 0.5)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'POST /calculate HTTP/1.1\r\nContent-Length: {len(payload)}\r\n\r\n'
+                     .encode() + payload)
+        await writer.drain()
+        writer.close()
+
+        # The calculation is dropped, or discarded if the worker already took it
+        while not service.counters['cancelled'] + service.counters['completed']:
+            await asyncio.sleep(0.01)
+        while service.pending:
+            await asyncio.sleep(0.01)
+        await asyncio.wrap_future(busy)
+        return service.stats()
+
+    stats = run_service(scenario)
+    assert stats['cancelled'] == 1 and stats['completed'] == 0
+
+
+def test_half_closed_client_is_answered():
+    with open(SAMPLE_DAQ_PATH, 'rb') as sample_file:
+        payload = sample_file.read()
+
+    async def scenario(service, port):
+        # Sends bytes after the request, then only closes its side of the connection
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'POST /calculate HTTP/1.1\r\nContent-Length: {len(payload)}\r\n\r\n'
+                     .encode() + payload + b'GET /stats HTTP/1.1\r\n\r\n')
+        writer.write_eof()
+        response = await reader.read()
+        writer.close()
+
+        too_long = await request(port, 'GET', '/' + 'x' * MAX_LINE_BYTES)
+        return response, too_long, service.stats()
+
+    response, too_long, stats = run_service(scenario)
+    interim = b'HTTP/1.1 100 Continue\r\n\r\n'
+    while response.startswith(interim):
+        response = response[len(interim):]
+    assert response.startswith(b'HTTP/1.1 200 ')
+    assert stats['completed'] == 1 and stats['cancelled'] == 0
+    assert too_long[0] == 400
+
+
+def test_workers_restarted_after_a_crash():
+    with open(SAMPLE_DAQ_PATH, 'rb') as sample_file:
+        payload = sample_file.read()
+
+    async def scenario(service, port):
+        # The request waits for the only worker, which dies while it waits
+        crash = service.executor.submit(exit_worker, 0.5)
+        broken = await request(port, 'POST', '/calculate', payload)
+        restarted = await request(port, 'POST', '/calculate', payload)
+
+        # The pool breaks between two requests, and is only noticed when submitting
+        crash = asyncio.wrap_future(service.executor.submit(exit_worker, 0))
+        await asyncio.wait([crash])
+        assert crash.exception() is not None
+        rejected = await request(port, 'POST', '/calculate', payload)
+        retried = await request(port, 'POST', '/calculate', payload)
+        return [broken[0], restarted[0], rejected[0], retried[0]], service.stats()
+
+    statuses, stats = run_service(scenario)
+    assert statuses == [500, 200, 503, 200]
+    assert stats['failed'] == 1 and stats['rejected'] == 1 and stats['completed'] == 2
+    assert stats['pending'] == 0
@@ -0,0 +1,74 @@
+import shutil
+
+from calculator_main import execute_calculation
+from pipeline import STAGES
+from session import CalculationSession, format_report
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+
+
+def test_update(tmp_path):
+    session = CalculationSession(SAMPLE_DAQ_PATH)
+    assert list(session.last_report['stage_seconds']) == list(STAGES[1:])
+    densities = session.get('DAQ_pressure_to_density')
+
+    report = session.update(fuel_grain_final_mass=2.5, dist_to_tank_start=30)
+    assert report['invalidated'] == ['engine_CG', 'engine_XML']
+    assert list(report['stage_seconds']) == ['engine_CG', 'engine_XML']
+    assert all(seconds >= 0 for seconds in report['stage_seconds'].values())
+    assert format_report(report).endswith(
+        f'2 stages in {report["seconds"] * 1000:.1f} ms')
+    assert session.get('DAQ_pressure_to_density') is densities
+
+    end_of_burn = float(session.get('DAQ_raw.time_s')[-30])
+    report = session.update(end_of_burn=end_of_burn)
+    assert list(report['stage_seconds']) == ['engine_CG', 'engine_XML']
+    assert session.get('engine_CG.end_of_burn') == len(
+        session.get('DAQ_raw.time_s')) - 30
+
+    assert session.update(end_of_burn=end_of_burn)['stage_seconds'] == {}
+
+    # Changing the water used for heating changes the DAQ data
+    report = session.update(water_used_for_heating=10)
+    assert report['invalidated'] == list(STAGES[1:])
+    assert session.get('DAQ_pressure_to_density') is not densities
+
+
+def test_same_output_as_execute_calculation(tmp_path):
+    session = CalculationSession(SAMPLE_DAQ_PATH)
+    fuel_grain_final_mass = session.consts_m.engine_info['fuel_grain_final_mass']
+    session.update(fuel_grain_final_mass=2.5)
+    session.update(fuel_grain_final_mass=fuel_grain_final_mass)
+    assert session.last_report['invalidated'] == ['engine_CG', 'engine_XML']
+
+    session.save(str(tmp_path / 'session.xml'))
+    execute_calculation(SAMPLE_DAQ_PATH, str(tmp_path / 'reference.xml'),
+                        suppress_printout=True)
+    with open(tmp_path / 'session.xml') as session_file, \
+            open(tmp_path / 'reference.xml') as reference_file:
+        assert session_file.readlines() == reference_file.readlines()
+
+
+def test_window_same_as_full_run(tmp_path):
+    # A window saves a time index next to the DAQ file, which must not be the fixture
+    data_path = str(tmp_path / 'sample_DAQ_file.csv')
+    shutil.copyfile(SAMPLE_DAQ_PATH, data_path)
+    full = CalculationSession(data_path)
+    window = CalculationSession(data_path, t_start=390, t_end=395)
+    first = round((390 - 385.05) / 0.05)
+
+    def xml_lines(session, name):
+        session.save(str(tmp_path / name))
+        with open(tmp_path / name) as xml_file:
+            return xml_file.readlines()
+
+    assert xml_lines(window, 'window.xml') == xml_lines(
+        full, 'full.xml')[first:first + 101]
+
+    end_of_burn = float(full.get('DAQ_raw.time_s')[-30])
+    full.update(end_of_burn=end_of_burn)
+    window.update(end_of_burn=end_of_burn)
+    assert window.get('engine_CG.end_of_burn') == full.get(
+        'engine_CG.end_of_burn')
+    assert xml_lines(window, 'window.xml') == xml_lines(
+        full, 'full.xml')[first:first + 101]
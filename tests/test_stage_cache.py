@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+
+from calculator_main import execute_calculation
+from constants import ConstantsManager as CM
+from csv_extractor import CSVExtractor
+from pipeline import Pipeline, STAGES
+from stage_cache import StageCache, OBJECT_FILE_NAME
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+
+
+def test_reload_unchanged_stages(tmp_path):
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+    cache = StageCache(str(tmp_path))
+
+    first = Pipeline(raw_dat, cache=cache)
+    first.get('engine_XML')
+    assert first.calculated == list(STAGES[1:])
+    assert first.loaded == []
+
+    second = Pipeline(raw_dat, cache=cache)
+    second.get('engine_XML')
+    assert second.calculated == []
+    assert second.loaded == list(STAGES[1:])
+
+    assert second['engine_XML'].XML_tags == first['engine_XML'].XML_tags
+    densities = second['DAQ_pressure_to_density']
+    assert np.array_equal(densities.density_liquid_kg_m3,
+                          first['DAQ_pressure_to_density'].density_liquid_kg_m3)
+    assert not densities.density_liquid_kg_m3.flags.writeable
+
+    # Loaded stages refer to the stages and constants of the pipeline that loaded them
+    assert second['NOS_mass_and_volume'].DAQ_pressure_to_density_data is densities
+    assert second['engine_CG'].DAQ_data is raw_dat
+    assert densities.consts_m is second.consts_m
+
+
+def test_only_downstream_stages_recalculated(tmp_path):
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+    cache = StageCache(str(tmp_path))
+    Pipeline(raw_dat, cache=cache).get('engine_XML')
+
+    consts = CM()
+    consts.test_conditions = dict(
+        consts.test_conditions, end_of_burn=float(raw_dat.time_s[-20]))
+    changed = Pipeline(raw_dat, consts, cache=cache)
+    changed.get('engine_XML')
+    assert changed.calculated == ['engine_CG', 'engine_XML']
+    assert changed['engine_CG'].end_of_burn == len(raw_dat.time_s) - 20
+
+    consts = CM()
+    consts.solver_options = dict(
+        consts.solver_options, temperature_solver='newton')
+    changed = Pipeline(raw_dat, consts, cache=cache)
+    changed.get('NOS_mass_and_volume')
+    assert changed.calculated == [
+        'DAQ_pressure_to_density', 'NOS_mass_and_volume']
+
+    downsampled = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH, downsample=2)
+    changed = Pipeline(downsampled, cache=cache)
+    changed.get('DAQ_pressure_to_density')
+    assert changed.calculated == ['DAQ_pressure_to_density']
+
+
+def test_eviction(tmp_path):
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+    cache = StageCache(str(tmp_path))
+    Pipeline(raw_dat, cache=cache).get('engine_XML')
+
+    entries = cache.entries()
+    assert len(entries) == len(STAGES) - 1
+    total_bytes = sum(size for _, size, _ in entries)
+
+    # Using the oldest entry makes it the most recently used one
+    oldest_key = entries[0][2]
+    os.utime(os.path.join(cache.entry_path(oldest_key), OBJECT_FILE_NAME),
+             ns=(entries[-1][0] + 1, entries[-1][0] + 1))
+
+    cache.max_bytes = total_bytes - 1
+    cache.evict()
+    remaining = [key for _, _, key in cache.entries()]
+    assert len(remaining) == len(entries) - 1
+    assert oldest_key in remaining
+    assert entries[1][2] not in remaining
+
+    cache.max_bytes = 0
+    cache.evict(keep=oldest_key)
+    assert [key for _, _, key in cache.entries()] == [oldest_key]
+
+
+def test_broken_entry_is_recalculated(tmp_path):
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(SAMPLE_DAQ_PATH)
+    cache = StageCache(str(tmp_path))
+    first = Pipeline(raw_dat, cache=cache)
+    first.get('DAQ_pressure_to_density')
+
+    key = first.stage_key('DAQ_pressure_to_density')
+    with open(os.path.join(cache.entry_path(key), OBJECT_FILE_NAME), 'wb') as object_file:
+        object_file.write(b'not a pickle')
+
+    second = Pipeline(raw_dat, cache=cache)
+    second.get('DAQ_pressure_to_density')
+    assert second.calculated == ['DAQ_pressure_to_density']
+
+
+def test_execute_calculation(tmp_path):
+    outputs = []
+    for name in ('cold.xml', 'warm.xml'):
+        execute_calculation(SAMPLE_DAQ_PATH, str(tmp_path / name), suppress_printout=True,
+                            use_stage_cache=True, stage_cache_dir=str(tmp_path / 'cache'))
+        with open(tmp_path / name) as xml_file:
+            outputs.append(xml_file.read())
+
+    assert outputs[0] == outputs[1]
+    assert len(StageCache(str(tmp_path / 'cache')
+                          ).entries()) == len(STAGES) - 1
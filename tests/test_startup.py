@@ -0,0 +1,65 @@
+import os
+import shutil
+import subprocess
+import sys
+
+# Largest total import time of the entry point modules, in microseconds. Importing them must
+# not pull in numpy or the pipeline, which take far longer than this on their own.
+IMPORT_TIME_BUDGET_US = 50000
+# Number of interpreters the import time is measured in, the fastest of which is kept, so that
+# a busy machine does not fail the budget
+IMPORT_TIME_RUNS = 3
+
+
+def import_times(code, cwd='.', env=None):
+    '''
+    Run code in a fresh interpreter with -X importtime, and return the cumulative import time
+    of every top-level module it imported, in microseconds.
+    '''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd,
+                            env=dict(os.environ, PYTHONPATH=os.path.abspath(
+                                '.'), **(env or {})),
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Only top-level imports are indented by one space
+        if not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_entry_point_imports():
+    # Importing the entry points must not pull in numpy, yaml or the pipeline
+    times = import_times('import main, calculator_main, batch_main')
+
+    assert 'numpy' not in times and 'yaml' not in times and 'pipeline' not in times
+
+
+def test_entry_point_import_budget():
+    entry_points = ('main', 'calculator_main', 'batch_main')
+    total_us = min(sum(import_times('import ' + ', '.join(entry_points))[name]
+                       for name in entry_points) for _ in range(IMPORT_TIME_RUNS))
+
+    assert total_us < IMPORT_TIME_BUDGET_US
+
+
+def test_compiled_constants_skip_yaml(tmp_path):
+    env = {'XDG_CACHE_HOME': os.path.join(tmp_path, 'cache')}
+    constants_path = os.path.join(tmp_path, 'constants.yaml')
+    shutil.copy('constant_config.yaml', constants_path)
+    output_path = os.path.join(tmp_path, 'output.xml')
+    code = ('from calculator_main import execute_calculation\n' +
+            'execute_calculation("tests/sample_files/sample_DAQ_file.csv", ' +
+            f'{output_path!r}, {constants_path!r}, suppress_printout=True)')
+
+    # The first run parses the YAML file and compiles it into the cache directory, not next to
+    # it, and the second only reads the JSON
+    assert 'yaml' in import_times(code, env=env)
+    compiled = os.listdir(os.path.join(
+        tmp_path, 'cache', 'rse_calculator', 'config'))
+    assert any(name.startswith('constants-') for name in compiled)
+    assert not os.path.exists(constants_path + '.compiled.json')
+    assert 'yaml' not in import_times(code, env=env)
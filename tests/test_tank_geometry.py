@@ -0,0 +1,140 @@
+import numpy as np
+
+from constants import ConstantsManager as CM
+from tank_geometry import TankGeometry
+
+EXAMPLE_COEFFCIENT = 1.01
+
+
+def legacy_liquid_cases(nos_volumes, tank_volumes):
+    cases = []
+    for curr_vol in nos_volumes:
+        if curr_vol <= tank_volumes[0]:
+            cases.append(0)
+        elif tank_volumes[0] < curr_vol <= sum(tank_volumes[:2]):
+            cases.append(1)
+        elif sum(tank_volumes[:2]) < curr_vol <= sum(tank_volumes[:3]):
+            cases.append(2)
+        elif sum(tank_volumes[:3]) < curr_vol <= sum(tank_volumes):
+            cases.append(3)
+        else:
+            cases.append(4)
+    return cases
+
+
+def legacy_vapour_cases(nos_volumes, tank_volumes):
+    cases = []
+    for curr_vol in nos_volumes:
+        if curr_vol <= tank_volumes[4]:
+            cases.append(0)
+        elif tank_volumes[4] < curr_vol <= sum(tank_volumes[3:]):
+            cases.append(1)
+        elif sum(tank_volumes[3:]) < curr_vol <= sum(tank_volumes[2:]):
+            cases.append(2)
+        elif sum(tank_volumes[2:]) < curr_vol <= sum(tank_volumes):
+            cases.append(3)
+        else:
+            cases.append(4)
+    return cases
+
+
+def test_classify_cases_matches_legacy():
+    tank_volumes = CM(
+        'tests/test_constants.yaml').tank_dimensions_meters['volume']
+    total_volume = sum(tank_volumes)
+
+    boundaries = np.concatenate((TankGeometry.cumulative_from_bottom(tank_volumes),
+                                 TankGeometry.cumulative_from_top(tank_volumes)))
+    volumes = np.concatenate((np.linspace(-0.001, total_volume*EXAMPLE_COEFFCIENT, 5000),
+                              boundaries, np.nextafter(boundaries, np.inf),
+                              np.nextafter(boundaries, -np.inf), [np.nan]))
+
+    liquid_cases = TankGeometry.classify_cases(
+        volumes, TankGeometry.liquid_case_boundaries(tank_volumes))
+    vapour_cases = TankGeometry.classify_cases(
+        volumes, TankGeometry.vapour_case_boundaries(tank_volumes))
+
+    assert liquid_cases.dtype == np.int8
+    assert np.array_equal(
+        liquid_cases, legacy_liquid_cases(volumes, tank_volumes))
+    assert np.array_equal(
+        vapour_cases, legacy_vapour_cases(volumes, tank_volumes))
+
+
+def legacy_liquid_cg(cases, liquid_height, tank_dims_m, liquid_volume_m3, liquid_density_kg_m3):
+    liquid_cg_m = []
+    for vol, case, liq_height, density in zip(liquid_volume_m3, cases, liquid_height,
+                                              liquid_density_kg_m3):
+        numerator = 0
+        if case == 0:
+            numerator = tank_dims_m['volume'][0] * \
+                density * liq_height / 2 * vol
+        else:
+            for idx in range(case):
+                numerator += tank_dims_m['volume'][idx] * \
+                    tank_dims_m['length'][idx]/2
+            numerator += (liq_height + sum(tank_dims_m['length'][:case]))/2 *\
+                (vol-sum(tank_dims_m['volume'][:case]))
+        liquid_cg_m.append(numerator/vol)
+    return liquid_cg_m
+
+
+def legacy_vapour_cg(vapour_volume_m3, gas_density_kg_m3, cases, vapour_height, tank_dims_m):
+    vapour_cg_m = []
+    for vol, case, height, density in zip(vapour_volume_m3, cases, vapour_height,
+                                          gas_density_kg_m3):
+        numerator = 0
+        if case == 0:
+            numerator = tank_dims_m['volume'][4] * density * height / 2 * vol
+        else:
+            for idx in range(case):
+                numerator += tank_dims_m['volume'][4 -
+                                                   idx] * tank_dims_m['length'][4 - idx]/2
+            numerator += (height + sum(tank_dims_m['length'][-case:]))/2 *\
+                (vol-sum(tank_dims_m['volume'][-case:]))
+        vapour_cg_m.append(tank_dims_m['total_length'] - numerator/vol)
+    return vapour_cg_m
+
+
+def test_cg_kernels_match_legacy():
+    from NOS_liquid_CG import NOSLiquidCG as NLC
+    from NOS_vapour_CG import NOSVapourCG as NVC
+
+    tank_dims_m = CM('tests/test_constants.yaml').tank_dimensions_meters
+    rng = np.random.default_rng(0)
+
+    volumes = rng.uniform(
+        1e-6, tank_dims_m['total_volume']*EXAMPLE_COEFFCIENT, 2000)
+    heights = rng.uniform(0, tank_dims_m['total_length'], 2000)
+    densities = rng.uniform(10, 1000, 2000)
+    liquid_cases = NLC.calculate_cases(volumes, tank_dims_m['volume'])
+    vapour_cases = NVC.calculate_cases(volumes, tank_dims_m['volume'])
+
+    assert np.allclose(NLC.calculate_liquid_cg(liquid_cases, heights, tank_dims_m, volumes,
+                                               densities),
+                       legacy_liquid_cg(liquid_cases, heights,
+                                        tank_dims_m, volumes, densities),
+                       rtol=1e-12)
+    assert np.allclose(NVC.calculate_vapour_cg(volumes, densities, vapour_cases, heights,
+                                               tank_dims_m),
+                       legacy_vapour_cg(volumes, densities,
+                                        vapour_cases, heights, tank_dims_m),
+                       rtol=1e-12)
+
+
+def test_liquid_heights_match_legacy():
+    from math import pi
+    from NOS_liquid_CG import NOSLiquidCG as NLC
+
+    tank_dims_m = CM('tests/test_constants.yaml').tank_dimensions_meters
+    volumes = np.linspace(
+        0, tank_dims_m['total_volume']*EXAMPLE_COEFFCIENT, 2000)
+    cases = NLC.calculate_cases(volumes, tank_dims_m['volume'])
+
+    legacy_heights = [sum(tank_dims_m['length'][:case]) +
+                      (vol - sum(tank_dims_m['volume'][:case])) /
+                      (pi*tank_dims_m['radius'][case]**2)
+                      for vol, case in zip(volumes, cases)]
+
+    assert np.allclose(NLC.calculate_liquid_heights(volumes, cases, tank_dims_m),
+                       legacy_heights, rtol=1e-12)
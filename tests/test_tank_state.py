@@ -0,0 +1,54 @@
+import numpy as np
+
+from NOS_mass_and_volume import NOSMassAndVolume as NMV
+from NOS_liquid_CG import NOSLiquidCG as NLC
+from NOS_vapour_CG import NOSVapourCG as NVC
+from constants import ConstantsManager as CM
+from csv_extractor import CSVExtractor
+from tank_state import TankState, TANK_STATE_DTYPE
+
+
+def test_views_share_one_state():
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(
+        'tests/sample_files/downsampled_sample_DAQ_file.csv')
+    consts = CM('tests/test_constants.yaml')
+    nmv = NMV(raw_dat, i_constants=consts)
+    nlc = NLC(nmv, i_constants=consts)
+    nvc = NVC(nmv, nlc, i_constants=consts)
+
+    state = nlc.tank_state
+    assert nvc.tank_state is state
+    assert state.data.dtype == TANK_STATE_DTYPE
+    assert len(state.data) == raw_dat.data_size
+
+    for array in (nlc.case, nlc.liquid_height_m, nlc.liquid_cg_in,
+                  nvc.case, nvc.vapour_height_m, nvc.vapour_cg_in):
+        assert np.shares_memory(array, state.data)
+
+    # Per-field results agree with the separate static calculations
+    tank_dims_m = consts.tank_dimensions_meters
+    assert np.array_equal(nvc.case, NVC.calculate_cases(nmv.vapour_volume_m3,
+                                                        tank_dims_m['volume']))
+    assert np.allclose(nvc.vapour_height_m,
+                       tank_dims_m['total_length'] - nlc.liquid_height_m)
+    assert np.allclose(nlc.liquid_cg_m,
+                       NLC.calculate_liquid_cg(nlc.case, nlc.liquid_height_m, tank_dims_m,
+                                               nmv.liquid_volume_m3,
+                                               nmv.DAQ_pressure_to_density_data.
+                                               density_liquid_kg_m3))
+
+
+def test_state_rebuilt_for_other_data():
+    consts = CM('tests/test_constants.yaml')
+    raw_dat = CSVExtractor().extract_data_to_raw_DAQ(
+        'tests/sample_files/downsampled_sample_DAQ_file.csv')
+    nmv = NMV(raw_dat, i_constants=consts)
+    other_nmv = NMV(raw_dat, i_constants=consts)
+    nlc = NLC(nmv, i_constants=consts)
+
+    assert nlc.tank_state.describes(nmv, CM('tests/test_constants.yaml'))
+    assert not nlc.tank_state.describes(other_nmv, consts)
+    assert NVC(other_nmv, nlc,
+               i_constants=consts).tank_state is not nlc.tank_state
+    assert isinstance(
+        NVC(other_nmv, nlc, i_constants=consts).tank_state, TankState)
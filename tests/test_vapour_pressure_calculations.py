@@ -58,3 +58,82 @@ def test_with_sample_file():
                 current_line_split[3])
             assert vpc_object.pressure_kpa[idx] == float(current_line_split[4])
             assert vpc_object.pressure_psi[idx] == float(current_line_split[5])
+
+
+def test_shared_tables(tmp_path):
+    import vapour_pressure_calculations as vpc_module
+
+    consts = ConstsM('tests/test_constants.yaml')
+    shared = VPC.shared(consts)
+
+    assert VPC.shared(ConstsM('tests/test_constants.yaml')) is shared
+    assert not shared.pressure_psi.flags.writeable
+    assert np.array_equal(shared.pressure_psi, VPC(
+        i_constants=consts).pressure_psi)
+
+    coarse = VPC.shared(consts, t_step_deg_c=1)
+    assert coarse is not shared
+    assert len(coarse.t_deg_c) == 126
+
+    # Persisted tables are reloaded by a fresh process-wide cache
+    VPC.table_cache_dir = str(tmp_path)
+    try:
+        vpc_module._shared_tables.clear()
+        built = VPC.shared(consts, t_step_deg_c=0.5)
+        assert len(list(tmp_path.iterdir())) == 1
+
+        vpc_module._shared_tables.clear()
+        loaded = VPC.shared(consts, t_step_deg_c=0.5)
+        assert loaded is not built
+        for field in vpc_module.TABLE_FIELDS:
+            assert np.array_equal(getattr(loaded, field),
+                                  getattr(built, field))
+    finally:
+        VPC.table_cache_dir = None
+        vpc_module._shared_tables.clear()
+
+    # A table that cannot be persisted is still built
+    not_a_dir = tmp_path / 'not_a_dir'
+    not_a_dir.write_text('')
+    VPC.table_cache_dir = str(not_a_dir)
+    try:
+        unsaved = VPC.shared(consts, t_step_deg_c=0.5)
+        assert np.array_equal(unsaved.pressure_psi, built.pressure_psi)
+        assert not VPC.save_table(VPC.table_key(consts, -90, 36, 0.5), unsaved)
+    finally:
+        VPC.table_cache_dir = None
+        vpc_module._shared_tables.clear()
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_solve_temperature_kelvin():
+    consts = ConstsM('tests/test_constants.yaml')
+    table = VPC.shared(consts)
+
+    pressures = np.linspace(
+        table.pressure_psi[0], table.pressure_psi[-1], 1000)
+    t_kelvin = VPC.solve_temperature_kelvin(
+        pressures, consts, tolerance_k=1e-10)
+
+    t_reduced = t_kelvin / consts.nitrous_oxide_properties['critical_temp']
+    recomputed_psi = table.eqn4_1(
+        t_reduced, 1 - t_reduced, consts) * 1000 * 0.00014503773
+    assert np.allclose(recomputed_psi, pressures, rtol=1e-12)
+
+    # Pressures outside of the table are clamped like the interpolation does
+    clamped = VPC.solve_temperature_kelvin(np.array([0.0, 1e5]), consts)
+    assert np.allclose(clamped, table.t_kelvin[[0, -1]], rtol=1e-12)
+
+
+def test_solve_temperature_kelvin_non_finite():
+    consts = ConstsM('tests/test_constants.yaml')
+    table = VPC.shared(consts)
+
+    pressures = np.array([np.nan, table.pressure_psi[100], np.inf, -np.inf])
+    t_kelvin = VPC.solve_temperature_kelvin(pressures, consts)
+
+    # The same as the table interpolation: infinite pressures are clamped, NaN stays NaN
+    interpolated = np.interp(pressures, table.pressure_psi, table.t_kelvin)
+    assert np.isnan(t_kelvin[0]) and np.isnan(interpolated[0])
+    assert np.allclose(t_kelvin[1:], interpolated[1:], rtol=1e-12)
+    assert np.allclose(t_kelvin[2:], table.t_kelvin[[-1, 0]], rtol=1e-12)
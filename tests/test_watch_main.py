@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import time
+
+from watch_main import FolderWatcher, Ledger, LEDGER_FILE_NAME, summary_path_for
+
+SAMPLE_DAQ_PATH = 'tests/sample_files/sample_DAQ_file.csv'
+CONSTANTS_PATH = 'tests/test_constants.yaml'
+
+
+def exit_worker(delay_s):
+    time.sleep(delay_s)
+    os._exit(1)
+
+
+def test_files_processed_once(tmp_path):
+    shutil.copyfile(SAMPLE_DAQ_PATH, tmp_path / 'fire_a.csv')
+    with open(tmp_path / 'broken.csv', 'w') as broken_file:
+        broken_file.write('Time (s),Tank pressure (psig),Recorded mass (lb),Thrust (lb)\n'
+                          '1,x,2,3\n')
+
+    results = []
+    watcher = FolderWatcher(str(tmp_path), CONSTANTS_PATH, jobs=2, settle_s=1.0,
+                            report=results.append)
+    assert watcher.poll(now=0.0) == []
+    assert watcher.poll(now=0.5) == []
+    assert sorted(os.path.basename(path) for path in watcher.poll(now=1.0)) == \
+        ['broken.csv', 'fire_a.csv']
+    # Dispatched files are not dispatched again while they run
+    assert watcher.poll(now=5.0) == []
+    watcher.close()
+
+    assert sorted(result['status'] for result in results) == ['failed', 'ok']
+    assert (tmp_path / 'fire_a.xml').exists()
+    with open(summary_path_for(str(tmp_path / 'fire_a.csv'))) as summary_file:
+        summary = json.load(summary_file)
+    assert summary['status'] == 'ok'
+    assert summary['input_bytes'] == os.path.getsize(SAMPLE_DAQ_PATH)
+
+    with open(tmp_path / LEDGER_FILE_NAME) as ledger_file:
+        assert sorted(json.load(ledger_file)) == ['broken.csv', 'fire_a.csv']
+
+    # After a restart only new or changed files are processed
+    shutil.copyfile(SAMPLE_DAQ_PATH, tmp_path / 'fire_b.csv')
+    with open(tmp_path / 'broken.csv', 'a') as broken_file:
+        broken_file.write('2,3,4,5\n')
+    watcher = FolderWatcher(str(tmp_path), CONSTANTS_PATH, jobs=1, settle_s=0.0,
+                            report=results.append)
+    watcher.poll(now=0.0)
+    assert sorted(os.path.basename(path) for path in watcher.poll(now=0.0)) == \
+        ['broken.csv', 'fire_b.csv']
+    watcher.close()
+
+
+def test_growing_file_waits(tmp_path):
+    data_path = tmp_path / 'fire.csv'
+    with open(SAMPLE_DAQ_PATH) as sample_file:
+        lines = sample_file.readlines()
+    data_path.write_text(''.join(lines[:100]))
+
+    watcher = FolderWatcher(str(tmp_path), jobs=1, settle_s=1.0)
+    watcher.poll(now=0.0)
+    data_path.write_text(''.join(lines))
+    assert watcher.poll(now=1.0) == []
+    assert watcher.poll(now=2.0) == [str(data_path)]
+    watcher.close(wait=False)
+
+
+def test_ledger_retries_failures(tmp_path):
+    ledger = Ledger(str(tmp_path / LEDGER_FILE_NAME))
+    ledger.record('fire.csv', 10, 20, {'status': 'ok'})
+    ledger.record('broken.csv', 10, 20, {'status': 'failed'})
+
+    ledger = Ledger(str(tmp_path / LEDGER_FILE_NAME))
+    assert ledger.is_done('fire.csv', 10, 20)
+    assert not ledger.is_done('fire.csv', 11, 20)
+    assert not ledger.is_done('broken.csv', 10, 20)
+
+
+def test_worker_crash_dispatches_again(tmp_path):
+    shutil.copyfile(SAMPLE_DAQ_PATH, tmp_path / 'fire.csv')
+
+    results = []
+    watcher = FolderWatcher(str(tmp_path), CONSTANTS_PATH, jobs=1, settle_s=0.0,
+                            report=results.append)
+    watcher.start_executor()
+    # The only worker dies while the file waits for it
+    crash = watcher.executor.submit(exit_worker, 0.5)
+    watcher.poll(now=0.0)
+    assert watcher.poll(now=0.0) == [str(tmp_path / 'fire.csv')]
+
+    deadline = time.monotonic() + 30
+    while not results and time.monotonic() < deadline:
+        watcher.poll()
+        time.sleep(0.05)
+    watcher.close()
+
+    # The file was calculated again by a new pool, and only that run is recorded
+    assert crash.exception() is not None
+    assert [result['status'] for result in results] == ['ok']
+    stat = os.stat(tmp_path / 'fire.csv')
+    assert Ledger(str(tmp_path / LEDGER_FILE_NAME)).is_done('fire.csv', stat.st_size,
+                                                            stat.st_mtime_ns)
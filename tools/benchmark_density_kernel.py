@@ -0,0 +1,72 @@
+import sys
+import os
+import time
+
+import numpy as np
+
+
+def best_time(function, repeats=5):
+    '''
+    Return the best wall time of a few calls, in seconds.
+    '''
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes=(10000, 100000, 1000000)):
+    '''
+    Compare the separate Equation 4.2 / 4.3 functions with the fused density kernel.
+
+    Parameters
+    ----------
+    sizes: tuple of int
+        The numbers of samples to evaluate.
+    '''
+    sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+    from constants import ConstantsManager
+    from DAQ_pressure_to_density import DAQPressureToDensity as DPD
+
+    consts = ConstantsManager()
+    eqn4_2_consts = consts.equation_constants['eqn4_2']
+    eqn4_3_consts = consts.equation_constants['eqn4_3']
+    critical_density = consts.nitrous_oxide_properties['critical_density']
+    rng = np.random.default_rng(0)
+
+    print(f'{"samples":>8} {"kernel":>14} {"time (s)":>9} {"speedup":>8} {"max rel. error":>15}')
+    for size in sizes:
+        t_reduced = rng.uniform(0.55, 1.0, size)
+        one_minus = 1 - t_reduced
+        recip_minus_one = 1 / t_reduced - 1
+
+        reference = (DPD.eqn4_2(one_minus, eqn4_2_consts, critical_density),
+                     DPD.eqn4_3(recip_minus_one, eqn4_3_consts, critical_density))
+
+        kernels = {
+            'eqn4_2+eqn4_3': lambda: (DPD.eqn4_2(one_minus, eqn4_2_consts, critical_density),
+                                      DPD.eqn4_3(recip_minus_one, eqn4_3_consts,
+                                                 critical_density)),
+            'fused float64': lambda: DPD.calculate_densities(
+                one_minus, recip_minus_one, eqn4_2_consts, eqn4_3_consts, critical_density),
+            'fused float32': lambda: DPD.calculate_densities(
+                one_minus, recip_minus_one, eqn4_2_consts, eqn4_3_consts, critical_density,
+                dtype=np.float32),
+        }
+
+        base_s = None
+        for name, kernel in kernels.items():
+            seconds = best_time(kernel)
+            base_s = base_s or seconds
+            error = max(np.max(np.abs(result / ref - 1))
+                        for result, ref in zip(kernel(), reference))
+            print(
+                f'{size:>8} {name:>14} {seconds:>9.4f} {base_s/seconds:>8.2f} {error:>15.3e}')
+
+
+if __name__ == "__main__":
+    # Note: run this from the root directory so that the default constants file is found.
+    run_benchmark()
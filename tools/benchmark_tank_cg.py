@@ -0,0 +1,106 @@
+import sys
+import os
+import time
+
+import numpy as np
+
+
+def legacy_liquid_cg(cases, liquid_height, tank_dims_m, liquid_volume_m3, liquid_density_kg_m3):
+    '''
+    The per-sample liquid CG loop that NOSLiquidCG.calculate_liquid_cg used to run.
+    '''
+    liquid_cg_m = []
+    for vol, case, liq_height, density in zip(liquid_volume_m3, cases, liquid_height,
+                                              liquid_density_kg_m3):
+        numerator = 0
+        if case == 0:
+            numerator = tank_dims_m['volume'][0] * \
+                density * liq_height / 2 * vol
+        else:
+            for idx in range(case):
+                numerator += tank_dims_m['volume'][idx] * \
+                    tank_dims_m['length'][idx]/2
+            numerator += (liq_height + sum(tank_dims_m['length'][:case]))/2 *\
+                (vol-sum(tank_dims_m['volume'][:case]))
+        liquid_cg_m = np.append(liquid_cg_m, numerator/(vol))
+    return liquid_cg_m
+
+
+def legacy_vapour_cg(vapour_volume_m3, gas_density_kg_m3, cases, vapour_height, tank_dims_m):
+    '''
+    The per-sample vapour CG loop that NOSVapourCG.calculate_vapour_cg used to run.
+    '''
+    vapour_cg_m = np.array([])
+    for vol, case, height, density in zip(vapour_volume_m3, cases, vapour_height,
+                                          gas_density_kg_m3):
+        numerator = 0
+        if case == 0:
+            numerator = tank_dims_m['volume'][4] * density * height / 2 * vol
+        else:
+            for idx in range(case):
+                numerator += (tank_dims_m['volume'][4 - idx]
+                              * tank_dims_m['length'][4 - idx]/2)
+            numerator += (height + sum(tank_dims_m['length'][-case:]))/2 *\
+                (vol-sum(tank_dims_m['volume'][-case:]))
+        vapour_cg_m = np.append(
+            vapour_cg_m, tank_dims_m['total_length'] - numerator/(vol))
+    return vapour_cg_m
+
+
+def time_call(function, *args):
+    '''
+    Return the wall time of a single call, in seconds.
+    '''
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def run_benchmark(sizes=(1000, 4000, 16000, 64000), legacy_limit=16000):
+    '''
+    Time the legacy and vectorised tank CG kernels on random inputs of increasing size.
+
+    Parameters
+    ----------
+    sizes: tuple of int
+        The numbers of samples to time.
+    legacy_limit: int
+        The largest size the legacy kernels are run on, as they scale quadratically.
+    '''
+    sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+    from constants import ConstantsManager
+    from NOS_liquid_CG import NOSLiquidCG
+    from NOS_vapour_CG import NOSVapourCG
+
+    tank_dims_m = ConstantsManager().tank_dimensions_meters
+    rng = np.random.default_rng(0)
+
+    print(f'{"samples":>8} {"kernel":>7} {"legacy (s)":>11} {"vector (s)":>11} '
+          f'{"legacy us/sample":>17} {"vector us/sample":>17}')
+    for size in sizes:
+        volumes = rng.uniform(1e-6, tank_dims_m['total_volume'], size)
+        heights = rng.uniform(0, tank_dims_m['total_length'], size)
+        densities = rng.uniform(10, 1000, size)
+        liquid_cases = NOSLiquidCG.calculate_cases(
+            volumes, tank_dims_m['volume'])
+        vapour_cases = NOSVapourCG.calculate_cases(
+            volumes, tank_dims_m['volume'])
+
+        kernels = {
+            'liquid': ((legacy_liquid_cg, NOSLiquidCG.calculate_liquid_cg),
+                       (liquid_cases, heights, tank_dims_m, volumes, densities)),
+            'vapour': ((legacy_vapour_cg, NOSVapourCG.calculate_vapour_cg),
+                       (volumes, densities, vapour_cases, heights, tank_dims_m)),
+        }
+        for name, ((legacy, vectorised), args) in kernels.items():
+            legacy_s = time_call(
+                legacy, *args) if size <= legacy_limit else float('nan')
+            vector_s = time_call(vectorised, *args)
+            print(f'{size:>8} {name:>7} {legacy_s:>11.4f} {vector_s:>11.4f} '
+                  f'{1e6*legacy_s/size:>17.3f} {1e6*vector_s/size:>17.3f}')
+
+
+if __name__ == "__main__":
+    # Note: run this from the root directory so that the default constants file is found.
+    run_benchmark()
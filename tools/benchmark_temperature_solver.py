@@ -0,0 +1,62 @@
+import sys
+import os
+import time
+
+import numpy as np
+
+
+def run_benchmark(sizes=(10000, 100000, 1000000)):
+    '''
+    Compare the speed and accuracy of the table interpolation and Newton temperature solvers.
+
+    Accuracy is measured by feeding the solved temperature back into Equation 4.1 and
+    comparing the pressure obtained with the input pressure.
+
+    Parameters
+    ----------
+    sizes: tuple of int
+        The numbers of pressure samples to solve.
+    '''
+    sys.path.insert(1, os.path.join(sys.path[0], '..'))
+
+    from constants import ConstantsManager
+    from constants import pascals_to_psi
+    from vapour_pressure_calculations import VapourPressureCalculations as VPC
+
+    consts = ConstantsManager()
+    critical_temp = consts.nitrous_oxide_properties['critical_temp']
+    table = VPC.shared(consts)
+    # Build the Newton seed table outside of the timing
+    VPC.shared(consts, t_step_deg_c=1)
+    rng = np.random.default_rng(0)
+
+    def pressure_error(t_kelvin, pressure_psi):
+        t_reduced = t_kelvin / critical_temp
+        recomputed = pascals_to_psi(VPC.eqn4_1(
+            t_reduced, 1 - t_reduced, consts) * 1000)
+        return np.max(np.abs(recomputed / pressure_psi - 1))
+
+    print(f'{"samples":>8} {"solver":>7} {"time (s)":>9} {"max rel. P error":>17} '
+          f'{"max |dT| vs newton (K)":>23}')
+    for size in sizes:
+        pressures = rng.uniform(
+            table.pressure_psi[0], table.pressure_psi[-1], size)
+
+        start = time.perf_counter()
+        interp_t = np.interp(pressures, table.pressure_psi, table.t_kelvin)
+        interp_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        newton_t = VPC.solve_temperature_kelvin(pressures, consts)
+        newton_s = time.perf_counter() - start
+
+        for name, seconds, t_kelvin in (('interp', interp_s, interp_t),
+                                        ('newton', newton_s, newton_t)):
+            print(f'{size:>8} {name:>7} {seconds:>9.4f} '
+                  f'{pressure_error(t_kelvin, pressures):>17.3e} '
+                  f'{np.max(np.abs(t_kelvin - newton_t)):>23.3e}')
+
+
+if __name__ == "__main__":
+    # Note: run this from the root directory so that the default constants file is found.
+    run_benchmark()
@@ -1,13 +1,33 @@
+import hashlib
+import os
+
 import numpy as np
 
+import profiling
 from constants import pascals_to_psi
 
+# Default temperature grid of the vapour pressure table, in degrees Celsius
+DEFAULT_T_MIN_DEG_C = -90
+DEFAULT_T_MAX_DEG_C = 36
+DEFAULT_T_STEP_DEG_C = 0.1
+
+# Resolution of the table used to seed the Newton solver for Eq. 4.1, in degrees Celsius
+NEWTON_SEED_T_STEP_DEG_C = 1
+
+# Tables of the arrays filled by VapourPressureCalculations, shared by the whole process
+TABLE_FIELDS = ('t_deg_c', 't_kelvin', 't_reduced', 'one_minus_t_reduced',
+                'pressure_kpa', 'pressure_psi')
+_shared_tables = {}
+
 
 class VapourPressureCalculations:
     '''
     Establish the vapour pressure of NOS between -90 and 36 degrees Celsius.
     '''
 
+    # Directory in which shared tables are persisted, None to only keep them in memory
+    table_cache_dir = None
+
     @staticmethod
     def eqn4_1(curr_t_reduced, curr_one_minus_t_reduced, consts_m):
         '''
@@ -34,7 +54,8 @@ class VapourPressureCalculations:
 
         return result  # Return pressure
 
-    def __init__(self, i_constants=None):
+    def __init__(self, i_constants=None, t_min_deg_c=DEFAULT_T_MIN_DEG_C,
+                 t_max_deg_c=DEFAULT_T_MAX_DEG_C, t_step_deg_c=DEFAULT_T_STEP_DEG_C):
         '''
         Initialize all base values.
 
@@ -43,6 +64,12 @@ class VapourPressureCalculations:
         i_constants: constants.ConstantsManager
             Object containing all the constants for the program. Default is None, in which case
             a default object will be imported and created.
+        t_min_deg_c: float
+            The lowest temperature of the table, in degrees Celsius.
+        t_max_deg_c: float
+            The temperature at which the table stops (excluded), in degrees Celsius.
+        t_step_deg_c: float
+            The temperature resolution of the table, in degrees Celsius.
         '''
 
         if i_constants is None:
@@ -51,7 +78,7 @@ class VapourPressureCalculations:
         else:
             self.consts_m = i_constants
 
-        self.t_deg_c = np.arange(-90, 36, 0.1)
+        self.t_deg_c = np.arange(t_min_deg_c, t_max_deg_c, t_step_deg_c)
         # Converting t_deg_c into Kelvin
         self.t_kelvin = self.t_deg_c + 273.15
         # Reduced temperature for each temperature step
@@ -65,6 +92,238 @@ class VapourPressureCalculations:
         # Pressure at each temperature step converted to psi
         self.pressure_psi = pascals_to_psi(self.pressure_kpa * 1000)
 
+    @classmethod
+    def solve_temperature_kelvin(cls, pressure_psi, consts_m, tolerance_k=1e-9,
+                                 max_iterations=20):
+        '''
+        Invert Equation 4.1 to find the temperature at each vapour pressure.
+
+        All pressures are solved at once with batched Newton iterations on the reduced
+        temperature, seeded by interpolating a 1 degree table. Pressures outside of the
+        default table, infinite ones included, are clamped to it, like the table interpolation
+        does. NaN pressures have no temperature, and are left out of the iterations.
+
+        Parameters
+        ----------
+        pressure_psi: numpy.ndarray
+            The vapour pressures, in psi.
+        consts_m: constants.ConstantsManager
+            The constants manager that contains all of the constants loaded from file.
+        tolerance_k: float
+            The iterations stop once no temperature moved by more than this, in kelvin.
+        max_iterations: int
+            The largest number of Newton iterations.
+
+        Returns
+        -------
+        numpy.ndarray:
+            The temperature at each pressure, in kelvin, or NaN for a NaN pressure.
+        '''
+        critical_temp = consts_m.nitrous_oxide_properties['critical_temp']
+        critical_pressure = consts_m.nitrous_oxide_properties['critical_pressure']
+        eqn_consts = consts_m.equation_constants['eqn4_1']
+
+        table = cls.shared(consts_m)
+        seed = cls.shared(consts_m, t_step_deg_c=NEWTON_SEED_T_STEP_DEG_C)
+
+        pressure_psi = np.asarray(pressure_psi, dtype=float)
+        t_kelvin = np.full(pressure_psi.shape, np.nan)
+        known = ~np.isnan(pressure_psi)
+        pressure_psi = np.clip(pressure_psi[known], table.pressure_psi[0],
+                               table.pressure_psi[-1])
+        t_reduced = np.interp(pressure_psi, seed.pressure_psi, seed.t_reduced)
+
+        # Equation 4.1 as ln(P / Pc) = f(1 - Tr) / Tr
+        log_pressure_ratio = np.log(
+            pressure_psi / pascals_to_psi(1000) / critical_pressure)
+
+        for _ in range(max_iterations):
+            one_minus_t_reduced = 1 - t_reduced
+            sqrt_term = np.sqrt(one_minus_t_reduced)
+
+            f_value = (eqn_consts[0]*one_minus_t_reduced +
+                       eqn_consts[1]*one_minus_t_reduced*sqrt_term +
+                       eqn_consts[2]*one_minus_t_reduced**2*sqrt_term +
+                       eqn_consts[3]*one_minus_t_reduced**5)
+            f_derivative = (eqn_consts[0] +
+                            1.5*eqn_consts[1]*sqrt_term +
+                            2.5*eqn_consts[2]*one_minus_t_reduced*sqrt_term +
+                            5*eqn_consts[3]*one_minus_t_reduced**4)
+
+            residual = f_value/t_reduced - log_pressure_ratio
+            slope = -f_value/t_reduced**2 - f_derivative/t_reduced
+            step = residual / slope
+
+            # The equation is only defined below the critical temperature
+            t_reduced = np.minimum(t_reduced - step, 1)
+
+            if step.size == 0 or np.max(np.abs(step))*critical_temp <= tolerance_k:
+                t_kelvin[known] = t_reduced * critical_temp
+                return t_kelvin
+
+        raise RuntimeError('Equation 4.1 inversion did not reach a tolerance of ' +
+                           f'{tolerance_k} K in {max_iterations} iterations')
+
+    @staticmethod
+    def table_key(consts_m, t_min_deg_c, t_max_deg_c, t_step_deg_c):
+        '''
+        Return the values a vapour pressure table depends on.
+
+        Parameters
+        ----------
+        consts_m: constants.ConstantsManager
+            The constants manager that contains all of the constants loaded from file.
+        t_min_deg_c: float
+            The lowest temperature of the table, in degrees Celsius.
+        t_max_deg_c: float
+            The temperature at which the table stops (excluded), in degrees Celsius.
+        t_step_deg_c: float
+            The temperature resolution of the table, in degrees Celsius.
+
+        Returns
+        -------
+        tuple of float:
+            The key of the table.
+        '''
+        nos_props = consts_m.nitrous_oxide_properties
+        return ((float(nos_props['critical_temp']), float(nos_props['critical_pressure'])) +
+                tuple(float(const) for const in consts_m.equation_constants['eqn4_1']) +
+                (float(t_min_deg_c), float(t_max_deg_c), float(t_step_deg_c)))
+
+    @classmethod
+    def shared(cls, i_constants=None, t_min_deg_c=DEFAULT_T_MIN_DEG_C,
+               t_max_deg_c=DEFAULT_T_MAX_DEG_C, t_step_deg_c=DEFAULT_T_STEP_DEG_C):
+        '''
+        Return a read-only table shared by every caller with the same constants and grid.
+
+        Tables are calculated once per process, and are also persisted to table_cache_dir
+        when it is set, so that later processes load them instead.
+
+        Parameters
+        ----------
+        i_constants: constants.ConstantsManager
+            Object containing all the constants for the program. Default is None, in which case
+            a default object will be imported and created.
+        t_min_deg_c: float
+            The lowest temperature of the table, in degrees Celsius.
+        t_max_deg_c: float
+            The temperature at which the table stops (excluded), in degrees Celsius.
+        t_step_deg_c: float
+            The temperature resolution of the table, in degrees Celsius.
+
+        Returns
+        -------
+        VapourPressureCalculations:
+            The shared table. Its arrays must not be modified.
+        '''
+        if i_constants is None:
+            from constants import ConstantsManager as ConstsM
+            i_constants = ConstsM()
+
+        key = cls.table_key(i_constants, t_min_deg_c,
+                            t_max_deg_c, t_step_deg_c)
+        table = _shared_tables.get(key)
+        if table is not None:
+            return table
+
+        with profiling.measure('vapour_pressure_table'):
+            table = cls.load_table(key, i_constants)
+            if table is None:
+                table = cls(i_constants, t_min_deg_c,
+                            t_max_deg_c, t_step_deg_c)
+                cls.save_table(key, table)
+        profiling.record_output('vapour_pressure_table', table)
+
+        for field in TABLE_FIELDS:
+            getattr(table, field).flags.writeable = False
+
+        _shared_tables[key] = table
+        return table
+
+    @classmethod
+    def table_path(cls, key):
+        '''
+        Return where the table with the given key is persisted, or None if persistence is off.
+
+        Parameters
+        ----------
+        key: tuple of float
+            The key of the table, as returned by table_key.
+        '''
+        if cls.table_cache_dir is None:
+            return None
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return os.path.join(cls.table_cache_dir, f'vapour_pressure_{digest}.npz')
+
+    @classmethod
+    def load_table(cls, key, consts_m):
+        '''
+        Load a persisted table.
+
+        Parameters
+        ----------
+        key: tuple of float
+            The key of the table, as returned by table_key.
+        consts_m: constants.ConstantsManager
+            The constants the table is attached to.
+
+        Returns
+        -------
+        VapourPressureCalculations:
+            The table, or None if it was not persisted.
+        '''
+        path = cls.table_path(key)
+        if path is None:
+            return None
+
+        try:
+            with np.load(path) as data:
+                if tuple(data['key']) != key:
+                    return None
+                table = cls.__new__(cls)
+                table.consts_m = consts_m
+                for field in TABLE_FIELDS:
+                    setattr(table, field, data[field])
+        except (OSError, ValueError, KeyError):
+            return None
+        return table
+
+    @classmethod
+    def save_table(cls, key, table):
+        '''
+        Persist a table, if persistence is on.
+
+        Parameters
+        ----------
+        key: tuple of float
+            The key of the table, as returned by table_key.
+        table: VapourPressureCalculations
+            The table to persist.
+
+        Returns
+        -------
+        bool:
+            Whether the table was persisted. It is not when persistence is off, or when the
+            table cache directory is not writable or the disk is full.
+        '''
+        path = cls.table_path(key)
+        if path is None:
+            return False
+
+        tmp_path = f'{path}.tmp-{os.getpid()}.npz'
+        try:
+            os.makedirs(cls.table_cache_dir, exist_ok=True)
+            np.savez(tmp_path, key=np.array(key),
+                     **{field: getattr(table, field) for field in TABLE_FIELDS})
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
+
 
 def create_output_file(path='vapour_pressure_test.csv', downsample=1):
     '''
@@ -0,0 +1,411 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+
+from batch_main import (find_DAQ_files, pool_context, print_result, process_file,
+                        target_path_for)
+
+# The ledger of the files already processed, kept in the watched directory
+LEDGER_FILE_NAME = '.rse_watch_ledger.json'
+SUMMARY_SUFFIX = '.summary.json'
+
+DEFAULT_POLL_INTERVAL_S = 1.0
+# How long the size and modification time of a file must stay the same before it is
+# considered completely written
+DEFAULT_SETTLE_S = 2.0
+# How many times a file is calculated again after the worker calculating it died, before it
+# is given up until the next start
+MAX_WORKER_CRASHES = 2
+
+
+def summary_path_for(data_file_path):
+    '''
+    Return where the json run summary of a DAQ file is saved, next to it.
+
+    Parameters
+    ----------
+    data_file_path: str
+        The path of the DAQ file.
+    '''
+    return os.path.splitext(data_file_path)[0] + SUMMARY_SUFFIX
+
+
+def write_json(path, value):
+    '''
+    Write a value as json, replacing the file at once so that readers never see half of it.
+
+    Parameters
+    ----------
+    path: str
+        The path of the json file.
+    value: object
+        The value.
+    '''
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as json_file:
+        json.dump(value, json_file, indent=2, sort_keys=True)
+        json_file.write('\n')
+    os.replace(tmp_path, path)
+
+
+def ignore_interrupts():
+    '''Leave Ctrl-C to the dispatcher, which stops the worker processes itself.'''
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class Ledger:
+    '''
+    Remember which DAQ files were processed, across restarts of the watcher.
+
+    A file is identified by its name together with its size and modification time, so that a
+    file replaced by a new recording of the same name is processed again. Only the files
+    processed successfully are done: those that failed are processed again on the next start,
+    as the failure may not come from the file.
+    '''
+
+    def __init__(self, path):
+        '''
+        Initialize all base values, loading the ledger if it exists.
+
+        Parameters
+        ----------
+        path: str
+            The path of the ledger file.
+        '''
+        self.path = path
+        try:
+            with open(path) as ledger_file:
+                self.entries = json.load(ledger_file)
+        except (OSError, ValueError):
+            # A missing or unreadable ledger only means the files are processed again
+            self.entries = {}
+
+    def is_done(self, name, size, mtime_ns):
+        '''
+        Return whether a file was processed successfully in its current state.
+
+        Parameters
+        ----------
+        name: str
+            The name of the file in the watched directory.
+        size: int
+            Its size in bytes.
+        mtime_ns: int
+            Its modification time, in ns.
+        '''
+        entry = self.entries.get(name)
+        return entry is not None and entry['size'] == size and entry['mtime_ns'] == mtime_ns \
+            and entry.get('status') == 'ok'
+
+    def record(self, name, size, mtime_ns, result):
+        '''
+        Record that a file was processed, and save the ledger.
+
+        Parameters
+        ----------
+        name: str
+            The name of the file in the watched directory.
+        size: int
+            Its size in bytes when it was processed.
+        mtime_ns: int
+            Its modification time when it was processed, in ns.
+        result: dict
+            The status of the run, as returned by batch_main.process_file.
+        '''
+        self.entries[name] = {'size': size, 'mtime_ns': mtime_ns, 'status': result['status'],
+                              'finished': time.time()}
+        write_json(self.path, self.entries)
+
+
+class FolderWatcher:
+    '''
+    Watch a directory, and run the full calculation for each DAQ file dropped into it.
+
+    The directory is polled. A file is dispatched once it stopped changing for settle_s, and
+    once it is not in the ledger in its current state. Files are calculated by a pool of
+    worker processes, and the dispatcher only checks whether they are finished, so it never
+    waits for any one of them. For each file the xml and a json run summary are saved next to
+    it, and the file is recorded in the ledger. If a worker dies, the pool is replaced and the
+    files it was calculating are dispatched again, up to MAX_WORKER_CRASHES times.
+    '''
+
+    def __init__(self, watch_dir, constants_file_path=None, jobs=None,
+                 settle_s=DEFAULT_SETTLE_S, ledger_path=None, report=print_result):
+        '''
+        Initialize all base values.
+
+        Parameters
+        ----------
+        watch_dir: str
+            The directory watched for .csv DAQ files.
+        constants_file_path: str
+            The path to the constants yaml file shared by all files. Defaults to None, in
+            which case a default one will be used.
+        jobs: int
+            How many worker processes calculate files at once. Defaults to None, which uses
+            one per CPU.
+        settle_s: float
+            How long a file must stay the same before it is dispatched. Default is
+            DEFAULT_SETTLE_S.
+        ledger_path: str
+            The path of the ledger. Default is None, in which case LEDGER_FILE_NAME in the
+            watched directory is used.
+        report: callable
+            Called with the status of each run as soon as it finishes. Default prints it.
+        '''
+        self.watch_dir = watch_dir
+        self.constants_file_path = constants_file_path
+        self.jobs = jobs
+        self.settle_s = settle_s
+        self.ledger = Ledger(ledger_path or os.path.join(
+            watch_dir, LEDGER_FILE_NAME))
+        self.report = report
+
+        self.executor = None
+        # Size, modification time and when they were first seen, by path of each file that
+        # is waiting to settle
+        self.candidates = {}
+        # Future, pool, size and modification time, by path of each dispatched file
+        self.running = {}
+        # Size and modification time, by path of each file finished since the start, so that
+        # the files that failed are not dispatched again until they change
+        self.finished = {}
+        # Number of times a worker died calculating a file, by path
+        self.crashes = {}
+
+    def start_executor(self):
+        '''Start the pool of worker processes, if it is not running.'''
+        if self.executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self.executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=pool_context(),
+                                                initializer=ignore_interrupts)
+
+    def submit(self, path, size, mtime_ns):
+        '''
+        Dispatch a file to the pool of worker processes.
+
+        Parameters
+        ----------
+        path: str
+            The path of the file.
+        size: int
+            Its size in bytes.
+        mtime_ns: int
+            Its modification time, in ns.
+        '''
+        future = self.executor.submit(process_file, path, target_path_for(path),
+                                      self.constants_file_path)
+        self.running[path] = (future, self.executor, size, mtime_ns)
+
+    def find_ready_files(self, now):
+        '''
+        Scan the directory, and list the files that settled and were not processed yet.
+
+        Parameters
+        ----------
+        now: float
+            The current time, from time.monotonic.
+
+        Returns
+        -------
+        list of tuple:
+            The path, size and modification time of each ready file.
+        '''
+        ready = []
+        seen = set()
+        for path in find_DAQ_files([self.watch_dir]):
+            seen.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed or renamed since it was listed
+                continue
+            state = (stat.st_size, stat.st_mtime_ns)
+            if path in self.running or self.finished.get(path) == state or \
+                    self.ledger.is_done(os.path.basename(path), *state):
+                self.candidates.pop(path, None)
+                continue
+
+            candidate = self.candidates.get(path)
+            if candidate is None or candidate[:2] != state:
+                self.candidates[path] = state + (now,)
+            elif now - candidate[2] >= self.settle_s:
+                del self.candidates[path]
+                ready.append((path,) + state)
+
+        for path in set(self.candidates) - seen:
+            del self.candidates[path]
+        return ready
+
+    def collect_finished(self, resubmit=True):
+        '''
+        Save the summary of every dispatched file whose calculation finished, and record it.
+
+        Files whose worker died are not recorded in the ledger, as the failure does not come
+        from them: they are dispatched again to a new pool, unless a worker already died on
+        them MAX_WORKER_CRASHES times.
+
+        Parameters
+        ----------
+        resubmit: bool
+            Whether the files whose worker died are dispatched again. Otherwise they are
+            processed again on the next start. Default to true.
+
+        Returns
+        -------
+        list of dict:
+            The status of each run that finished.
+        '''
+        from concurrent.futures.process import BrokenProcessPool
+
+        results = []
+        for path, (future, executor, size, mtime_ns) in list(self.running.items()):
+            if not future.done():
+                continue
+            del self.running[path]
+            if future.cancelled():
+                # Dropped while stopping, so it is processed again on the next start
+                continue
+
+            crashed = False
+            try:
+                result = future.result()
+            except Exception as error:
+                result = {'data_file_path': path, 'target_path': target_path_for(path),
+                          'status': 'failed', 'error': traceback.format_exc(),
+                          'seconds': 0.0}
+                crashed = isinstance(error, BrokenProcessPool)
+
+            if crashed:
+                # The worker itself died, e.g. it ran out of memory, and the pool with it
+                if executor is self.executor:
+                    self.executor.shutdown(wait=False)
+                    self.executor = None
+                if not resubmit:
+                    continue
+                self.crashes[path] = self.crashes.get(path, 0) + 1
+                if self.crashes[path] <= MAX_WORKER_CRASHES:
+                    self.start_executor()
+                    self.submit(path, size, mtime_ns)
+                    continue
+
+            self.crashes.pop(path, None)
+            self.finished[path] = (size, mtime_ns)
+            write_json(summary_path_for(path), dict(result, input_bytes=size,
+                                                    constants_file_path=self.constants_file_path,
+                                                    finished=time.time()))
+            if not crashed:
+                self.ledger.record(os.path.basename(path),
+                                   size, mtime_ns, result)
+            self.report(result)
+            results.append(result)
+        return results
+
+    def poll(self, now=None):
+        '''
+        Collect the finished calculations, and dispatch the files that are ready.
+
+        Parameters
+        ----------
+        now: float
+            The current time, from time.monotonic. Default is None, in which case it is read.
+
+        Returns
+        -------
+        list of str:
+            The paths of the files dispatched.
+        '''
+        self.collect_finished()
+        self.start_executor()
+
+        dispatched = []
+        for path, size, mtime_ns in self.find_ready_files(
+                time.monotonic() if now is None else now):
+            self.submit(path, size, mtime_ns)
+            dispatched.append(path)
+        return dispatched
+
+    def run(self, poll_interval_s=DEFAULT_POLL_INTERVAL_S):
+        '''
+        Poll the directory until interrupted.
+
+        Parameters
+        ----------
+        poll_interval_s: float
+            How long to wait between polls. Default is DEFAULT_POLL_INTERVAL_S.
+        '''
+        while True:
+            self.poll()
+            time.sleep(poll_interval_s)
+
+    def close(self, wait=True):
+        '''
+        Stop the worker processes.
+
+        Parameters
+        ----------
+        wait: bool
+            Whether the dispatched files are calculated and recorded first. Otherwise those
+            not started yet are dropped, and processed again on the next start. Default to true.
+        '''
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+        self.collect_finished(resubmit=False)
+        self.executor = None
+        self.running.clear()
+
+
+def main(argv=None):
+    '''
+    Run the watch folder command line interface.
+
+    Parameters
+    ----------
+    argv: list of str
+        The command line arguments. Defaults to None, in which case sys.argv is used.
+
+    Returns
+    -------
+    int:
+        The exit code.
+    '''
+    parser = argparse.ArgumentParser(
+        description='Watch a directory, and run the RSE calculation for each DAQ .csv file '
+                    'written into it. The xml and a json run summary are saved next to it.')
+    parser.add_argument('watch_dir', help='directory to watch')
+    parser.add_argument('-c', '--constants', default=None,
+                        help='constants yaml file shared by all files')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL_S,
+                        help=f'seconds between scans (default: {DEFAULT_POLL_INTERVAL_S})')
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_S,
+                        help='seconds a file must stay unchanged before it is processed '
+                             f'(default: {DEFAULT_SETTLE_S})')
+    parser.add_argument('--ledger', default=None,
+                        help=f'ledger file (default: {LEDGER_FILE_NAME} in the watched '
+                             'directory)')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.watch_dir):
+        print(f'not a directory: {args.watch_dir}', file=sys.stderr)
+        return 1
+
+    watcher = FolderWatcher(args.watch_dir, args.constants, args.jobs, args.settle,
+                            args.ledger)
+    print(f'watching {args.watch_dir}', file=sys.stderr)
+    try:
+        watcher.run(args.poll_interval)
+    except KeyboardInterrupt:
+        # Files not started yet are not in the ledger, and are processed on the next start
+        watcher.close(wait=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())